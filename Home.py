@@ -60,6 +60,7 @@ pg_profile = st.Page(test_page_func, title="Mijn Profiel", icon="👤")
 pg_kvk = st.Page("views/11_🔴_KV_Kortrijk.py", title="KV Kortrijk", icon="🔴")
 pg_player_analysis = st.Page("views/1_⚽_Spelers.py", title="Spelers Analyse", icon="⚽")
 pg_team_analysis = st.Page("views/10_🛡️_Teams.py", title="Team Analyse", icon="🛡️")
+pg_compare = st.Page("views/14_⚖️_Vergelijken.py", title="Speler Vergelijking", icon="⚖️")
 
 # C. Scouting Modules
 pg_scout = st.Page("views/4_📝_Scouting.py", title="Scout Rapport Maken", icon="📝")
@@ -108,7 +109,7 @@ else:
 
     elif lvl >= 3:
         # Niveau 3+: Volledige toegang
-        pages["Hoofd Analyse"] = [pg_kvk, pg_player_analysis, pg_team_analysis]
+        pages["Hoofd Analyse"] = [pg_kvk, pg_player_analysis, pg_compare, pg_team_analysis]
         
         pages["Scouting & Markt"] = [
             pg_dashboard, 
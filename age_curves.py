@@ -0,0 +1,202 @@
+import time
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils import run_uncached_query, KVK_PROFILES, season_start_year
+from store import store_path, save_arrays, load_arrays, read_manifest, write_manifest, file_version
+
+# -----------------------------------------------------------------------------
+# LEEFTIJDSCURVES PER POSITIE (KVK profielen + metrieken)
+# -----------------------------------------------------------------------------
+# Batch: uit alle spelers met meerdere seizoenen halen we de jaarlijkse evolutie
+# (delta score per seizoen) en fitten per (positie, item) een kwadratische curve
+# in functie van de leeftijd. Het resultaat is een rooster:
+#   deltas (float32, n_posities x n_items x n_leeftijden)  = verwachte delta per seizoen
+#   counts (int32,   n_posities x n_items)                 = aantal waarnemingen
+# Serving is een pure lookup in dit rooster (geen fit, geen query).
+
+CURVES_PATH = store_path("age_curves", "curves.npz")
+MANIFEST = store_path("age_curves", "manifest.json")
+
+AGES = np.arange(15, 41)          # roosterleeftijden
+AGE_MIN, AGE_MAX = 18, 35         # buiten dit bereik extrapoleren we niet
+AGE_CENTER = 26.0
+MIN_OBS = 30                      # minder waarnemingen -> curve over alle posities
+MAX_DELTA = 15.0                  # begrenzing van de verwachte evolutie per seizoen
+ALL_POSITIONS = "ALLE"
+
+# -----------------------------------------------------------------------------
+# 1. DATA (BATCH)
+# -----------------------------------------------------------------------------
+def _load_history():
+    """Long DataFrame (playerId, position, year, age, item, score) over alle iteraties."""
+    kvk_cols = ", ".join(f'a."{c}"' for c in KVK_PROFILES)
+    df_kvk = run_uncached_query(f"""
+        SELECT a."playerId", a.position, i.season, p.birthdate, {kvk_cols}
+        FROM analysis.final_impect_scores a
+        JOIN public.iterations i ON a."iterationId" = i.id
+        JOIN public.players p ON a."playerId" = p.id
+        WHERE p.birthdate IS NOT NULL
+    """)
+    if df_kvk.empty: return pd.DataFrame()
+
+    df_met = run_uncached_query("""
+        SELECT s."playerId", s.position, i.season, CAST(s.metric_id AS TEXT) as metric_id, s.final_score_1_to_100 as score
+        FROM analysis.player_final_scores s
+        JOIN public.iterations i ON s."iterationId" = i.id
+    """)
+
+    df_kvk['playerId'] = df_kvk['playerId'].astype('int64')
+    birth_year = pd.to_datetime(df_kvk['birthdate'], errors='coerce').dt.year
+    births = pd.Series(birth_year.to_numpy(), index=df_kvk['playerId']).groupby(level=0).first()
+
+    long_kvk = df_kvk.melt(id_vars=['playerId', 'position', 'season'], value_vars=list(KVK_PROFILES), var_name='item', value_name='score')
+    long_kvk = long_kvk[long_kvk['score'].astype(float) > 0]  # 0 = profiel niet actief, anders telt 0 -> 70 als +70
+    frames = [long_kvk]
+    if not df_met.empty:
+        df_met['playerId'] = df_met['playerId'].astype('int64')
+        df_met['item'] = "m" + df_met['metric_id']
+        frames.append(df_met[['playerId', 'position', 'season', 'item', 'score']])
+
+    df = pd.concat(frames, ignore_index=True).dropna(subset=['score'])
+    years = {s: season_start_year(s) for s in df['season'].unique()}
+    df['year'] = df['season'].map(years)
+    df['age'] = df['year'] - df['playerId'].map(births)
+    df = df.dropna(subset=['year', 'age'])
+    df['position'] = df['position'].fillna('ONBEKEND').astype(str)
+    return df[['playerId', 'position', 'year', 'age', 'item', 'score']]
+
+def _season_deltas(df):
+    """
+    Jaarlijkse delta per (speler, item): verschil met het vorige seizoen (max 2 jaar
+    ertussen), gedeeld door het aantal jaren. Alles met shift/vergelijkingen, geen loops.
+    """
+    g = df.groupby(['playerId', 'item', 'year'], as_index=False).agg(score=('score', 'mean'), age=('age', 'first'), position=('position', 'first'))
+    g = g.sort_values(['playerId', 'item', 'year']).reset_index(drop=True)
+
+    same = (g['playerId'].to_numpy()[1:] == g['playerId'].to_numpy()[:-1]) & (g['item'].to_numpy()[1:] == g['item'].to_numpy()[:-1])
+    dy = g['year'].to_numpy()[1:] - g['year'].to_numpy()[:-1]
+    ok = same & (dy >= 1) & (dy <= 2)
+
+    prev, curr = g.iloc[:-1][ok], g.iloc[1:][ok]
+    return pd.DataFrame({
+        'position': prev['position'].to_numpy(),
+        'item': prev['item'].to_numpy(),
+        'age': prev['age'].to_numpy() + dy[ok] / 2.0,
+        'delta': (curr['score'].to_numpy() - prev['score'].to_numpy()) / dy[ok],
+    })
+
+# -----------------------------------------------------------------------------
+# 2. FIT (BATCH, VECTORISED)
+# -----------------------------------------------------------------------------
+def _fit_quadratic(d, keys):
+    """
+    Kleinste kwadraten delta ~ b0 + b1*x + b2*x^2 (x = leeftijd - 26) voor elke groep tegelijk:
+    de normaalvergelijkingen worden met één groupby-som opgebouwd en batchgewijs opgelost.
+    """
+    x = d['age'].clip(AGE_MIN, AGE_MAX).to_numpy() - AGE_CENTER
+    y = d['delta'].to_numpy()
+    sums = pd.DataFrame({k: d[k].to_numpy() for k in keys})
+    for p in range(5): sums[f"x{p}"] = x ** p
+    for p in range(3): sums[f"y{p}"] = y * x ** p
+    s = sums.groupby(keys).sum()
+
+    xtx = np.stack([s[[f"x{i + j}" for j in range(3)]].to_numpy() for i in range(3)], axis=1)   # (g, 3, 3)
+    xty = s[[f"y{i}" for i in range(3)]].to_numpy()[:, :, None]                                  # (g, 3, 1)
+    xtx = xtx + np.eye(3)[None] * 1e-3 * s[["x0"]].to_numpy()[:, :, None]                         # lichte ridge
+    coefs = np.linalg.solve(xtx, xty)[:, :, 0]
+    return pd.DataFrame(coefs, index=s.index, columns=['b0', 'b1', 'b2']).assign(n=s['x0'].to_numpy().astype('int64'))
+
+def fit_curves(progress=None):
+    """Fit alle curves en schrijf het rooster weg. Geeft (n_posities, n_items, n_waarnemingen) terug."""
+    if progress: progress("Historiek ophalen...")
+    df = _load_history()
+    if df.empty: return (0, 0, 0)
+
+    if progress: progress("Seizoensevoluties berekenen...")
+    d = _season_deltas(df)
+    if d.empty: return (0, 0, 0)
+
+    if progress: progress("Curves fitten...")
+    fit_pos = _fit_quadratic(d, ['position', 'item'])
+    fit_all = _fit_quadratic(d, ['item']).reset_index()
+    fit_all['position'] = ALL_POSITIONS
+    fit_all = fit_all.set_index(['position', 'item'])
+
+    # Te weinig waarnemingen voor een positie -> curve over alle posities
+    fit_pos = fit_pos.reset_index()
+    fallback = fit_all.reset_index().set_index('item').loc[fit_pos['item'], ['b0', 'b1', 'b2']].to_numpy()
+    thin = fit_pos['n'].to_numpy() < MIN_OBS
+    fit_pos.loc[thin, ['b0', 'b1', 'b2']] = fallback[thin]
+    fits = pd.concat([fit_pos.set_index(['position', 'item']), fit_all])
+
+    positions, pos_codes = np.unique(fits.index.get_level_values(0).astype(str), return_inverse=True)
+    items, item_codes = np.unique(fits.index.get_level_values(1).astype(str), return_inverse=True)
+
+    x = np.clip(AGES, AGE_MIN, AGE_MAX) - AGE_CENTER
+    grid = fits['b0'].to_numpy()[:, None] + fits['b1'].to_numpy()[:, None] * x[None] + fits['b2'].to_numpy()[:, None] * x[None] ** 2
+    deltas = np.full((len(positions), len(items), len(AGES)), np.nan, dtype='float32')
+    counts = np.zeros((len(positions), len(items)), dtype='int32')
+    deltas[pos_codes, item_codes] = np.clip(grid, -MAX_DELTA, MAX_DELTA)
+    counts[pos_codes, item_codes] = fits['n'].to_numpy()
+
+    # Combinaties zonder eigen fit krijgen ook de curve over alle posities
+    pi, ji = np.nonzero(np.isnan(deltas[:, :, 0]))
+    deltas[pi, ji] = deltas[list(positions).index(ALL_POSITIONS), ji]
+
+    save_arrays(CURVES_PATH, positions=positions.astype(str), items=items.astype(str), ages=AGES, deltas=deltas, counts=counts)
+    write_manifest(MANIFEST, {"fitted_at": time.strftime("%Y-%m-%d %H:%M"), "observations": int(len(d))})
+    return (len(positions) - 1, len(items), len(d))
+
+def curves_info():
+    return read_manifest(MANIFEST)
+
+# -----------------------------------------------------------------------------
+# 3. LOOKUP API (SERVING)
+# -----------------------------------------------------------------------------
+@st.cache_resource(max_entries=2)
+def _load_curves(version):
+    data = load_arrays(CURVES_PATH)
+    if data is None: return None
+    data['pos_index'] = {str(p): k for k, p in enumerate(data['positions'])}
+    data['item_index'] = {str(it): j for j, it in enumerate(data['items'])}
+    return data
+
+def get_curves():
+    return _load_curves(file_version(CURVES_PATH))
+
+def project_scores(positions, item, scores, ages, seasons=1):
+    """
+    Geprojecteerde score na `seasons` seizoenen (vectorised, NaN waar onbekend).
+    positions/scores/ages: even lange reeksen; item: KVK kolomnaam of 'm<metric_id>'.
+    """
+    scores = np.asarray(scores, dtype=float)
+    out = np.full(len(scores), np.nan)
+    curves = get_curves()
+    if curves is None: return out
+    j = curves['item_index'].get(str(item))
+    if j is None: return out
+
+    fallback = curves['pos_index'].get(ALL_POSITIONS, -1)
+    pos = np.array([curves['pos_index'].get(str(p), fallback) for p in positions], dtype='int64')
+    ages = np.asarray(pd.to_numeric(pd.Series(list(ages)), errors='coerce'), dtype=float)
+    ok = (pos >= 0) & ~np.isnan(ages) & ~np.isnan(scores)
+    if not ok.any(): return out
+
+    age0 = np.clip(np.round(ages[ok]).astype('int64'), AGES[0], AGES[-1]) - AGES[0]
+    total = np.zeros(ok.sum())
+    for k in range(seasons):
+        total += curves['deltas'][pos[ok], j, np.minimum(age0 + k, len(AGES) - 1)]
+    out[ok] = np.clip(scores[ok] + total, 0, 100)
+    return out
+
+def project_score(position, item, score, age, seasons=1):
+    """Eén speler: geprojecteerde score of None."""
+    v = project_scores([position], item, [score], [age], seasons)[0]
+    return None if np.isnan(v) else float(v)
+
+def age_from_birthdate(birthdate):
+    """Leeftijd in jaren (op vandaag), of None."""
+    bd = pd.to_datetime(birthdate, errors='coerce')
+    if pd.isna(bd): return None
+    return (pd.Timestamp.today() - bd).days / 365.25
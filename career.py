@@ -0,0 +1,145 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils import run_uncached_query, KVK_PROFILES, season_start_year
+from percentiles import iteration_fingerprints
+
+# -----------------------------------------------------------------------------
+# CARRIÈRE TIJDLIJN: alle iteraties van één speler
+# -----------------------------------------------------------------------------
+# Eén UNION ALL query haalt KVK profielen, metrieken en KPIs op over alle
+# iteraties. Het resultaat wordt gepivot naar compacte tijdreeksen:
+#   iterations: DataFrame (iterationId, season, competitionName, label), chronologisch
+#   items:      DataFrame (item, bron, naam)  met item = kolomnaam | m<id> | k<id>
+#   values:     float32 array (n_items x n_iteraties), NaN = geen score
+#   fetched:    {iteratie: fingerprint} van alle al opgevraagde iteraties (ook zonder score)
+# Per speler blijft dit in het geheugen (LRU, max CAREER_CACHE_SIZE spelers); nieuwe
+# iteraties worden er incrementeel bijgezet, iteraties waarvan de fingerprint (zie
+# percentiles.iteration_fingerprints) veranderde worden opnieuw opgehaald.
+
+CAREER_CACHE_SIZE = 256
+
+_kvk_values = ", ".join(f"('{c}', a.\"{c}\")" for c in KVK_PROFILES)
+
+CAREER_QUERY = f"""
+    SELECT u.it as "iterationId", i.season, i."competitionName", u.bron, u.item, u.naam, u.score
+    FROM (
+        SELECT CAST(a."iterationId" AS TEXT) as it, 'kvk' as bron, v.item, v.item as naam, CAST(v.score AS FLOAT) as score
+        FROM analysis.final_impect_scores a
+        CROSS JOIN LATERAL (VALUES {_kvk_values}) as v(item, score)
+        WHERE a."playerId" = %(pid)s AND a."iterationId" NOT IN %(known)s
+        UNION ALL
+        SELECT CAST(s."iterationId" AS TEXT), 'metriek', 'm' || CAST(s.metric_id AS TEXT), d.name, s.final_score_1_to_100
+        FROM analysis.player_final_scores s
+        JOIN public.player_score_definitions d ON CAST(s.metric_id AS TEXT) = d.id
+        WHERE s."playerId" = %(pid)s AND s."iterationId" NOT IN %(known)s
+        UNION ALL
+        SELECT CAST(s."iterationId" AS TEXT), 'kpi', 'k' || CAST(s.metric_id AS TEXT), d.name, s.final_score_1_to_100
+        FROM analysis.kpis_final_scores s
+        JOIN analysis.kpi_definitions d ON CAST(s.metric_id AS TEXT) = d.id
+        WHERE s."playerId" = %(pid)s AND s."iterationId" NOT IN %(known)s
+    ) u
+    JOIN public.iterations i ON u.it = CAST(i.id AS TEXT)
+"""
+
+# Goedkope check (enkel de hoofdtabel): in welke iteraties komt de speler voor?
+ITERATIONS_QUERY = 'SELECT DISTINCT CAST("iterationId" AS TEXT) as it FROM analysis.final_impect_scores WHERE "playerId" = %s'
+
+def _empty_career():
+    return {
+        "iterations": pd.DataFrame(columns=['iterationId', 'season', 'competitionName', 'label']),
+        "items": pd.DataFrame(columns=['item', 'bron', 'naam']),
+        "values": np.empty((0, 0), dtype='float32'),
+        "fetched": {},
+    }
+
+def _drop_iterations(career, iteration_ids):
+    """Carrière zonder de gegeven iteraties (die daarna opnieuw opgehaald worden)."""
+    keep = ~career["iterations"]['iterationId'].isin(iteration_ids).to_numpy()
+    return {**career, "iterations": career["iterations"][keep].reset_index(drop=True), "values": career["values"][:, keep]}
+
+def _pivot(df_long, career):
+    """Voegt long-format rijen toe aan een bestaande carrière (nieuwe iteraties en/of items)."""
+    iters = pd.concat([
+        career["iterations"][['iterationId', 'season', 'competitionName']],
+        df_long[['iterationId', 'season', 'competitionName']].drop_duplicates('iterationId'),
+    ]).drop_duplicates('iterationId')
+    iters['_year'] = iters['season'].map(season_start_year)
+    iters = iters.sort_values(['_year', 'season', 'competitionName'], na_position='first').drop(columns='_year').reset_index(drop=True)
+    iters['label'] = iters['season'].astype(str) + " " + iters['competitionName'].astype(str)
+
+    items = pd.concat([career["items"], df_long[['item', 'bron', 'naam']].drop_duplicates('item')]).drop_duplicates('item').reset_index(drop=True)
+    items.loc[items['bron'] == 'kvk', 'naam'] = items.loc[items['bron'] == 'kvk', 'item'].map(KVK_PROFILES)
+
+    values = np.full((len(items), len(iters)), np.nan, dtype='float32')
+    item_pos = pd.Series(np.arange(len(items)), index=items['item'])
+    iter_pos = pd.Series(np.arange(len(iters)), index=iters['iterationId'])
+
+    # Bestaande waarden overzetten naar de nieuwe (uitgebreide) matrix
+    old = career["values"]
+    if old.size:
+        values[np.ix_(item_pos.loc[career["items"]['item']].to_numpy(), iter_pos.loc[career["iterations"]['iterationId']].to_numpy())] = old
+
+    if not df_long.empty:
+        values[item_pos.loc[df_long['item']].to_numpy(), iter_pos.loc[df_long['iterationId']].to_numpy()] = df_long['score'].astype('float32').to_numpy()
+    return {"iterations": iters, "items": items, "values": values, "fetched": career["fetched"]}
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _fingerprints(iteration_ids):
+    return iteration_fingerprints(iteration_ids)
+
+@st.cache_resource
+def _career_cache():
+    """Proces-brede LRU cache: {player_id: carrière dict}, beschermd met een lock."""
+    return OrderedDict(), threading.Lock()
+
+def get_career(player_id):
+    """
+    Carrière tijdlijn van een speler. De eerste keer één query over alle iteraties;
+    daarna enkel een goedkope check en het ophalen van nieuwe of gewijzigde iteraties.
+    """
+    player_id = str(player_id)
+    cache, lock = _career_cache()
+    with lock:
+        career = cache.get(player_id)
+        if career is not None: cache.move_to_end(player_id)
+
+    df_its = run_uncached_query(ITERATIONS_QUERY, params=(player_id,))
+    checked = sorted(set(df_its['it'])) if not df_its.empty else []
+    fps = _fingerprints(tuple(checked)) if checked else {}
+    if career is None:
+        career = _empty_career()
+    else:
+        changed = [it for it, fp in career["fetched"].items() if it in fps and fps[it] != fp]
+        if not changed and set(checked) <= set(career["fetched"]):
+            return career
+        career = _drop_iterations(career, changed)
+        career = {**career, "fetched": {it: fp for it, fp in career["fetched"].items() if it not in changed}}
+
+    # '-1' houdt de NOT IN geldig zolang er nog niets opgehaald is
+    known = tuple(sorted(career["fetched"])) or ('-1',)
+    df_long = run_uncached_query(CAREER_QUERY, params={"pid": player_id, "known": known})
+    fetched = {**career["fetched"], **{it: fps.get(it, '') for it in checked}}
+    if not df_long.empty:
+        df_long['iterationId'] = df_long['iterationId'].astype(str)
+        fetched.update({it: fps.get(it, '') for it in df_long['iterationId'].unique() if it not in fetched})
+        df_long = df_long.dropna(subset=['score'])
+        if not df_long.empty: career = _pivot(df_long, career)
+    career = {**career, "fetched": fetched}
+
+    with lock:
+        cache[player_id] = career
+        cache.move_to_end(player_id)
+        while len(cache) > CAREER_CACHE_SIZE: cache.popitem(last=False)
+    return career
+
+def career_frame(career, items):
+    """Long DataFrame (Iteratie, Item, Score) voor een selectie items, klaar voor een lijngrafiek."""
+    if not items or career["values"].size == 0: return pd.DataFrame(columns=['Iteratie', 'Item', 'Score'])
+    idx = career["items"].reset_index(drop=True)
+    sel = idx[idx['item'].isin(items)]
+    df = pd.DataFrame(career["values"][sel.index.to_numpy()].T, columns=sel['naam'].fillna(sel['item']).tolist())
+    df['Iteratie'] = career["iterations"]['label'].to_numpy()
+    return df.melt(id_vars='Iteratie', var_name='Item', value_name='Score').dropna(subset=['Score'])
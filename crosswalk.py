@@ -0,0 +1,136 @@
+import streamlit as st
+from utils import run_uncached_query, init_connection
+
+# -----------------------------------------------------------------------------
+# SPELER ID CROSSWALK (Impect <-> SkillCorner <-> Legacy namen)
+# -----------------------------------------------------------------------------
+# player_id = public.players.id (de Impect ID die ook in match_events en de
+# analysis tabellen gebruikt wordt). SkillCorner ID en legacy namen worden hier
+# getypeerd en geïndexeerd opgeslagen, zodat we niet meer via
+# CAST(... AS TEXT) = CAST(... AS TEXT) over alle spelers moeten joinen.
+
+DDL_STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS scouting.player_id_crosswalk (
+        player_id BIGINT PRIMARY KEY,
+        skillcorner_id BIGINT,
+        legacy_names TEXT[] NOT NULL DEFAULT '{}',
+        bijgewerkt_op TIMESTAMP NOT NULL DEFAULT NOW()
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_crosswalk_skillcorner ON scouting.player_id_crosswalk (skillcorner_id)",
+    "CREATE INDEX IF NOT EXISTS idx_crosswalk_legacy ON scouting.player_id_crosswalk USING GIN (legacy_names)",
+]
+
+# Enkel nieuwe spelers of gewijzigde SkillCorner koppelingen worden geschreven
+UPSERT_PLAYERS = """
+    WITH src AS (
+        SELECT CAST(p.id AS BIGINT) as player_id,
+               CASE WHEN CAST(p."idMappings_2_skill_corner_0" AS TEXT) ~ '^[0-9]+(\\.0+)?$'
+                    THEN CAST(CAST(CAST(p."idMappings_2_skill_corner_0" AS TEXT) AS NUMERIC) AS BIGINT)
+               END as skillcorner_id
+        FROM public.players p
+        WHERE CAST(p.id AS TEXT) ~ '^[0-9]+$'
+    )
+    INSERT INTO scouting.player_id_crosswalk (player_id, skillcorner_id)
+    SELECT src.player_id, src.skillcorner_id
+    FROM src
+    LEFT JOIN scouting.player_id_crosswalk cw ON cw.player_id = src.player_id
+    WHERE cw.player_id IS NULL OR cw.skillcorner_id IS DISTINCT FROM src.skillcorner_id
+    ON CONFLICT (player_id) DO UPDATE
+        SET skillcorner_id = EXCLUDED.skillcorner_id, bijgewerkt_op = NOW()
+"""
+
+# Legacy namen komen uit het geheugen van de import tool
+SYNC_LEGACY_NAMES = """
+    UPDATE scouting.player_id_crosswalk cw
+    SET legacy_names = l.names, bijgewerkt_op = NOW()
+    FROM (
+        SELECT CAST(CAST(speler_id AS TEXT) AS BIGINT) as player_id,
+               ARRAY_AGG(legacy_name ORDER BY legacy_name) as names
+        FROM scouting.legacy_names_map
+        WHERE CAST(speler_id AS TEXT) ~ '^[0-9]+$'
+        GROUP BY 1
+    ) l
+    WHERE cw.player_id = l.player_id AND cw.legacy_names IS DISTINCT FROM l.names
+"""
+
+ADD_LEGACY_NAME = """
+    UPDATE scouting.player_id_crosswalk
+    SET legacy_names = ARRAY_APPEND(legacy_names, %s), bijgewerkt_op = NOW()
+    WHERE player_id = %s AND NOT (%s = ANY(legacy_names))
+"""
+
+def refresh_crosswalk():
+    """
+    Maakt de crosswalk tabel aan (indien nodig) en werkt ze incrementeel bij.
+    Geeft het aantal gewijzigde rijen terug: {'spelers': x, 'legacy': y}.
+    """
+    conn = init_connection()
+    try:
+        with conn.cursor() as cur:
+            for ddl in DDL_STATEMENTS:
+                cur.execute(ddl)
+            cur.execute(UPSERT_PLAYERS)
+            n_players = cur.rowcount
+            cur.execute(SYNC_LEGACY_NAMES)
+            n_legacy = cur.rowcount
+        conn.commit()
+        load_crosswalk.clear()
+        return {"spelers": n_players, "legacy": n_legacy}
+    except Exception as e:
+        conn.rollback()
+        st.error(f"Crosswalk Fout: {e}")
+        return None
+    finally:
+        conn.close()
+
+def add_legacy_name(cur, legacy_name, player_id):
+    """
+    Voegt één legacy naam toe binnen een bestaande transactie (import tool).
+    Een savepoint zorgt dat een ontbrekende crosswalk tabel de transactie niet breekt.
+    """
+    if not str(player_id).isdigit(): return
+    cur.execute("SAVEPOINT crosswalk_legacy")
+    try:
+        cur.execute(ADD_LEGACY_NAME, (legacy_name, int(player_id), legacy_name))
+    except Exception as e:
+        cur.execute("ROLLBACK TO SAVEPOINT crosswalk_legacy")
+        print(f"Crosswalk niet bijgewerkt: {e}")
+
+# -----------------------------------------------------------------------------
+# IN-MEMORY MAP
+# -----------------------------------------------------------------------------
+@st.cache_resource(ttl=3600)
+def load_crosswalk():
+    """
+    Laadt de crosswalk één keer per proces als dictionaries (O(1) lookups):
+    'skillcorner' (player_id -> skillcorner_id), 'from_skillcorner' (omgekeerd)
+    en 'legacy' (legacy naam -> player_id). Alle sleutels zijn strings.
+    Ongecachete query: refresh_crosswalk() wist deze cache en moet meteen verse
+    data zien. Bestaat de tabel nog niet, dan is er gewoon geen crosswalk.
+    """
+    maps = {"skillcorner": {}, "from_skillcorner": {}, "legacy": {}}
+    exists = run_uncached_query("SELECT to_regclass('scouting.player_id_crosswalk') IS NOT NULL as ok")
+    if exists.empty or not bool(exists['ok'].iloc[0]): return maps
+    df = run_uncached_query("SELECT player_id, skillcorner_id, legacy_names FROM scouting.player_id_crosswalk")
+    if df.empty: return maps
+
+    has_sc = df[df['skillcorner_id'].notna()]
+    pids = has_sc['player_id'].astype('int64').astype(str)
+    scs = has_sc['skillcorner_id'].astype('int64').astype(str)
+    maps["skillcorner"] = dict(zip(pids, scs))
+    maps["from_skillcorner"] = dict(zip(scs, pids))
+
+    legacy = df[['player_id', 'legacy_names']].explode('legacy_names').dropna(subset=['legacy_names'])
+    maps["legacy"] = dict(zip(legacy['legacy_names'], legacy['player_id'].astype('int64').astype(str)))
+    return maps
+
+def skillcorner_id_for(player_id):
+    """SkillCorner ID voor een (Impect) speler ID, of None als er geen koppeling is."""
+    return load_crosswalk()["skillcorner"].get(str(player_id))
+
+def crosswalk_available():
+    """True als de crosswalk tabel gevuld is (anders vallen pagina's terug op de oude joins)."""
+    maps = load_crosswalk()
+    return bool(maps["skillcorner"] or maps["legacy"])
@@ -0,0 +1,268 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+import plotly.express as px
+import plotly.graph_objects as go
+from utils import run_uncached_query
+from store import store_path, save_arrays, load_arrays, read_manifest, write_manifest, file_version
+from percentiles import iteration_fingerprints
+from season_profiles import weight_column
+from query_builder import build_where
+
+# -----------------------------------------------------------------------------
+# DISCOVER DATA: DUNNE BASIS + SCORES PER KOLOM
+# -----------------------------------------------------------------------------
+# In plaats van SELECT a.* (elke scorekolom van elke speler) haalt Discover eerst
+# een dunne frame op (ids, naam, team, competitie, positie) en daarna enkel de
+# scorekolommen die als as gekozen worden, elk apart gecachet. Een extra as = één
+# extra kolom. Positie/team filters gaan als predicaat mee naar de database
+# (query_builder); de cache-sleutel is de genormaliseerde filtertuple. Kolomnamen
+# komen uitsluitend uit de (gecachete) schema-lijst. De functies cachen zelf (met
+# max_entries) en gebruiken daarom run_uncached_query: geen tweede kopie in run_query.
+
+KEY_COLS = ['playerId', 'iterationId', 'squadId', 'position']
+NUMERIC_TYPES = ('double precision', 'real', 'numeric', 'integer', 'bigint', 'smallint')
+NON_SCORE_COLS = {'playerId', 'squadId', 'iterationId', 'position', 'birthdate'}
+
+@st.cache_data(ttl=3600)
+def score_columns():
+    """Numerieke scorekolommen van analysis.final_impect_scores (schema, geen data)."""
+    df = run_uncached_query("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = 'analysis' AND table_name = 'final_impect_scores' AND data_type IN %s
+    """, params=(NUMERIC_TYPES,))
+    return sorted(c for c in df['column_name'] if c not in NON_SCORE_COLS) if not df.empty else []
+
+def _where(filters):
+    return build_where(filters, score_columns(), alias='a', birthdate='p.birthdate', minutes_column=weight_column())
+
+@st.cache_data(ttl=3600)
+def filter_options(ids_tuple):
+    """Posities en teams (squadId, naam) van de gegeven iteraties, voor de filterwidgets."""
+    return run_uncached_query("""
+        SELECT DISTINCT a.position, CAST(a."squadId" AS TEXT) as "squadId", sq.name as "Team"
+        FROM analysis.final_impect_scores a
+        LEFT JOIN public.squads sq ON a."squadId" = sq.id
+        WHERE a."iterationId" IN %s
+    """, params=(ids_tuple,))
+
+@st.cache_data(ttl=3600, max_entries=64)
+def base_frame(filters):
+    """Eén rij per scorerij die aan de (genormaliseerde) filters voldoet: sleutels + naam, team en competitie."""
+    where, params = _where(filters)
+    df = run_uncached_query(f"""
+        SELECT a."playerId", a."iterationId", a."squadId", a.position,
+               p.commonname as "Naam", sq.name as "Team", i."competitionName" as "Competitie"
+        FROM analysis.final_impect_scores a
+        JOIN public.players p ON a."playerId" = p.id
+        LEFT JOIN public.squads sq ON a."squadId" = sq.id
+        JOIN public.iterations i ON a."iterationId" = i.id
+        WHERE {where}
+    """, params=params)
+    return df.drop_duplicates(KEY_COLS).reset_index(drop=True) if not df.empty else df
+
+@st.cache_data(ttl=3600, max_entries=256)
+def score_column(filters, col):
+    """Eén scorekolom (met sleutels) voor de rijen die aan de filters voldoen."""
+    if col not in score_columns(): raise ValueError(f"Onbekende scorekolom: {col}")
+    where, params = _where(filters)
+    # public.players enkel nodig voor de geboortedatum (leeftijdsfilter)
+    keys = dict(filters)
+    join = 'JOIN public.players p ON a."playerId" = p.id' if 'min_age' in keys or 'max_age' in keys else ''
+    df = run_uncached_query(f"""
+        SELECT a."playerId", a."iterationId", a."squadId", a.position, a."{col}"
+        FROM analysis.final_impect_scores a
+        {join}
+        WHERE {where}
+    """, params=params)
+    return df.drop_duplicates(KEY_COLS) if not df.empty else pd.DataFrame(columns=KEY_COLS + [col])
+
+def discover_frame(filters, cols):
+    """Basis frame met enkel de gevraagde scorekolommen erbij (elke kolom uit zijn eigen cache)."""
+    df = base_frame(filters)
+    if df.empty: return df
+    key = pd.MultiIndex.from_frame(df[KEY_COLS].astype(str))
+    df = df.copy()
+    for col in dict.fromkeys(cols):
+        part = score_column(filters, col)
+        values = pd.Series(part[col].to_numpy(), index=pd.MultiIndex.from_frame(part[KEY_COLS].astype(str)))
+        df[col] = pd.to_numeric(values.reindex(key), errors='coerce').to_numpy()
+    return df
+
+# -----------------------------------------------------------------------------
+# FIGUUR: SVG VOOR KLEINE SELECTIES, WEBGL + STEEKPROEF VOOR GROTE
+# -----------------------------------------------------------------------------
+# Boven WEBGL_THRESHOLD punten: één Scattergl trace met een kleurenarray per team
+# (in plaats van één trace per team), hover enkel naam/team/assen/percentielen via
+# customdata, en boven MAX_POINTS een vaste steekproef. 'Dichtheid' legt een
+# contour van alle punten (gebind als rooster) onder de (kleinere) markers.
+
+WEBGL_THRESHOLD = 1000
+MAX_POINTS = 20000
+DENSITY_BINS = 60
+RENDER_MODES = ["Automatisch", "Punten (WebGL)", "Dichtheid"]
+PALETTE = px.colors.qualitative.Dark24
+# numerieke kleur (teamcode modulo palet) + discrete schaal: veel sneller dan een array kleurnamen
+TEAM_SCALE = [[i / (len(PALETTE) - 1), c] for i, c in enumerate(PALETTE)]
+
+def scatter_figure(df, x, y, title, pct_cols=(), mode="Automatisch", max_points=MAX_POINTS, color='Team'):
+    """Scatter van x vs y, gekleurd op `color` (Team, Seizoen, ...). Geeft (figuur, aantal getekende punten) terug."""
+    if mode == "Automatisch" and len(df) < WEBGL_THRESHOLD:
+        fig = px.scatter(df, x=x, y=y, color=color, hover_data=['Naam', 'Team', 'Competitie', 'position', *pct_cols],
+                         title=title, height=700, template="plotly_white",
+                         text='Naam' if len(df) < 50 else None)  # namen tonen bij kleine selecties
+        fig.update_traces(marker=dict(size=12, line=dict(width=1, color='DarkSlateGrey')), textposition='top center')
+        return fig, len(df)
+
+    d = df.dropna(subset=[x, y])
+    if len(d) > max_points: d = d.sample(max_points, random_state=0)
+    codes, _ = pd.factorize(d[color].fillna('-'), sort=True)
+    custom = np.column_stack([d['Naam'].astype(str), d['Team'].fillna('-').astype(str)] + [d[c].round(0).to_numpy() for c in pct_cols])
+    hover = "<b>%{customdata[0]}</b> (%{customdata[1]})<br>" + f"{x}: %{{x:.1f}}<br>{y}: %{{y:.1f}}" \
+        + "".join(f"<br>{c}: %{{customdata[{i + 2}]}}" for i, c in enumerate(pct_cols)) + "<extra></extra>"
+
+    fig = go.Figure()
+    if mode == "Dichtheid":
+        # dichtheid van alle punten server-side gebind: enkel een rooster naar de browser
+        full = df[[x, y]].dropna().to_numpy(dtype=float)
+        z, xe, ye = np.histogram2d(full[:, 0], full[:, 1], bins=DENSITY_BINS)
+        fig.add_trace(go.Contour(x=(xe[:-1] + xe[1:]) / 2, y=(ye[:-1] + ye[1:]) / 2, z=z.T, colorscale='Blues', ncontours=20,
+                                 showscale=False, contours=dict(coloring='fill', showlines=False), hoverinfo='skip'))
+    fig.add_trace(go.Scattergl(x=d[x], y=d[y], mode='markers', customdata=custom, hovertemplate=hover, showlegend=False,
+                               marker=dict(color=codes % len(PALETTE), colorscale=TEAM_SCALE, cmin=0, cmax=len(PALETTE) - 1, size=4 if mode == "Dichtheid" else 7, opacity=0.75)))
+    fig.update_layout(title=title, height=700, template="plotly_white", xaxis_title=x, yaxis_title=y)
+    return fig, len(d)
+
+# -----------------------------------------------------------------------------
+# SEIZOENSOVERSCHRIJDENDE CUBE (float32)
+# -----------------------------------------------------------------------------
+# Alle scorerijen van alle iteraties in één .npz: values (rijen x kolommen, float32)
+# en per rij gecodeerde dimensies (speler, iteratie, team, positie) met de
+# woordenboeken ernaast; seizoen/competitie hangen aan de iteratie. Selecties zijn
+# index-maskers. Bij een refresh worden enkel iteraties met een gewijzigde
+# fingerprint opnieuw opgehaald; de rest wordt uit de bestaande cube overgenomen.
+
+CUBE_FILE = store_path("discover_cube", "cube.npz")
+CUBE_MANIFEST = store_path("discover_cube", "manifest.json")
+CUBE_BATCH = 10   # iteraties per query
+META_COLS = ['playerId', 'Naam', 'iterationId', 'Seizoen', 'Competitie', 'Team', 'position']
+
+def _encode(values):
+    uniques, codes = np.unique(pd.Series(values, dtype=object).fillna('').to_numpy(dtype=str), return_inverse=True)
+    return uniques, codes
+
+def _fetch_rows(iteration_ids, cols):
+    col_sql = ", ".join(f'a."{c}"' for c in cols)
+    df = run_uncached_query(f"""
+        SELECT a."playerId", CAST(a."iterationId" AS TEXT) as "iterationId", a.position,
+               p.commonname as "Naam", sq.name as "Team", i.season as "Seizoen", i."competitionName" as "Competitie", {col_sql}
+        FROM analysis.final_impect_scores a
+        JOIN public.players p ON a."playerId" = p.id
+        LEFT JOIN public.squads sq ON a."squadId" = sq.id
+        JOIN public.iterations i ON a."iterationId" = i.id
+        WHERE a."iterationId" IN %s
+    """, params=(tuple(iteration_ids),))
+    return df.drop_duplicates(['playerId', 'iterationId', 'position']) if not df.empty else df
+
+def _save_cube(df, cols):
+    players, player_code = np.unique(df['playerId'].astype('int64').to_numpy(), return_inverse=True)
+    names = df.groupby(player_code)['Naam'].last().fillna('Onbekend').to_numpy(dtype=str)
+    its, iter_code = _encode(df['iterationId'])
+    first = pd.Series(np.arange(len(df))).groupby(iter_code).first().to_numpy()
+    teams, team_code = _encode(df['Team'])
+    positions, pos_code = _encode(df['position'])
+    save_arrays(CUBE_FILE, columns=np.array(cols, dtype=str),
+                values=df[cols].apply(pd.to_numeric, errors='coerce').to_numpy(dtype='float32'),
+                player_ids=players, player_names=names, player_code=player_code.astype('int32'),
+                iterations=its, iter_season=df['Seizoen'].to_numpy(dtype=str)[first],
+                iter_comp=df['Competitie'].to_numpy(dtype=str)[first], iter_code=iter_code.astype('int16'),
+                teams=teams, team_code=team_code.astype('int32'), positions=positions, pos_code=pos_code.astype('int16'))
+
+def refresh_discover_cube(progress=None):
+    """Cube bijwerken (enkel gewijzigde iteraties). Geeft de lijst opnieuw opgehaalde iteraties terug."""
+    cols = score_columns()
+    fps = iteration_fingerprints()
+    manifest = read_manifest(CUBE_MANIFEST)
+    cube = load_arrays(CUBE_FILE)
+    known = manifest.get("iterations", {}) if cube is not None and manifest.get("columns") == cols else {}
+    todo = [it for it, fp in fps.items() if known.get(it) != fp]
+    if not todo and set(known) == set(fps): return []
+
+    keep = [it for it in known if it in fps and it not in todo]
+    parts = [cube_frame(_with_index(cube), cube_mask(cube, iterations=keep), cols)] if keep else []
+    for start in range(0, len(todo), CUBE_BATCH):
+        if progress: progress(start, len(todo))
+        parts.append(_fetch_rows(todo[start:start + CUBE_BATCH], cols))
+    df = pd.concat([p for p in parts if not p.empty], ignore_index=True) if parts else pd.DataFrame()
+    if df.empty: return []
+    _save_cube(df, cols)
+    write_manifest(CUBE_MANIFEST, {"columns": cols, "iterations": {it: fps[it] for it in keep + todo}})
+    return todo
+
+def _with_index(data):
+    data['col_index'] = {str(c): j for j, c in enumerate(data['columns'])}
+    return data
+
+@st.cache_resource(max_entries=2)
+def _load_cube(version):
+    data = load_arrays(CUBE_FILE)
+    return _with_index(data) if data is not None else None
+
+def get_discover_cube():
+    """De cube uit het geheugen (één keer per refresh ingelezen), of None als ze nog niet gebouwd is."""
+    version = file_version(CUBE_FILE)
+    return _load_cube(version) if version else None
+
+def cube_mask(cube, seasons=None, competitions=None, iterations=None):
+    """Boolean masker over de rijen: lege/None selectie = geen filter op die dimensie."""
+    ok = np.ones(len(cube['iterations']), dtype=bool)
+    if seasons: ok &= np.isin(cube['iter_season'], list(seasons))
+    if competitions: ok &= np.isin(cube['iter_comp'], list(competitions))
+    if iterations is not None: ok &= np.isin(cube['iterations'], [str(i) for i in iterations])
+    return ok[cube['iter_code']]
+
+def cube_frame(cube, mask, cols):
+    """Kleine DataFrame van de gemaskeerde rijen met enkel de gevraagde scorekolommen."""
+    rows = np.flatnonzero(mask)
+    it = cube['iter_code'][rows]
+    df = pd.DataFrame({
+        'playerId': cube['player_ids'][cube['player_code'][rows]], 'Naam': cube['player_names'][cube['player_code'][rows]],
+        'iterationId': cube['iterations'][it], 'Seizoen': cube['iter_season'][it], 'Competitie': cube['iter_comp'][it],
+        'Team': cube['teams'][cube['team_code'][rows]], 'position': cube['positions'][cube['pos_code'][rows]],
+    })
+    df[['Team', 'position']] = df[['Team', 'position']].replace('', np.nan)
+    for c in cols:
+        df[c] = cube['values'][rows, cube['col_index'][c]]
+    return df
+
+def season_delta(cube, mask, cols, season_from, season_to):
+    """
+    Per speler: gemiddelde (over zijn iteraties) in season_to min dat in season_from,
+    enkel voor spelers met een waarde in beide. Kolommen heten 'Δ <kolom>'; naam,
+    team, competitie en positie komen uit season_to.
+    """
+    season = cube['iter_season'][cube['iter_code']]
+    n_players = len(cube['player_ids'])
+    means = {}
+    for s in (season_from, season_to):
+        rows = np.flatnonzero(mask & (season == s))
+        pc = cube['player_code'][rows]
+        vals = cube['values'][rows][:, [cube['col_index'][c] for c in cols]].astype('float64')
+        ok = ~np.isnan(vals)
+        sums = np.zeros((n_players, len(cols))); cnts = np.zeros((n_players, len(cols)))
+        np.add.at(sums, pc, np.where(ok, vals, 0.0)); np.add.at(cnts, pc, ok)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means[s] = np.where(cnts > 0, sums / cnts, np.nan)
+    delta = means[season_to] - means[season_from]
+    both = ~np.isnan(delta).all(axis=1)
+
+    to_rows = np.flatnonzero(mask & (season == season_to))
+    _, first = np.unique(cube['player_code'][to_rows], return_index=True)
+    sel = np.zeros(len(mask), dtype=bool); sel[to_rows[first]] = True
+    sel &= both[cube['player_code']]
+    df = cube_frame(cube, sel, [])
+    pc = cube['player_code'][sel]
+    df['Seizoen'] = f"{season_from} → {season_to}"
+    for j, c in enumerate(cols):
+        df[f"Δ {c}"] = delta[pc, j].astype('float32')
+    return df
@@ -0,0 +1,291 @@
+import io
+import os
+import json
+import hashlib
+import zipfile
+import textwrap
+import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_pdf import PdfPages
+import matplotlib.image as mpimg
+
+from utils import run_query, KVK_PROFILES
+from player_data import fetch_players_data
+from crosswalk import crosswalk_available, load_crosswalk
+from store import store_path
+
+# -----------------------------------------------------------------------------
+# SERVER-SIDE PDF EXPORT VAN SPELER DOSSIERS
+# -----------------------------------------------------------------------------
+# 1. Alle data voor de hele lijst spelers wordt set-based opgehaald (één query per tabel).
+# 2. Per speler wordt een PDF gerenderd in een process pool (renderen is CPU-werk; matplotlib OO API).
+# 3. Grafieken worden gecached op basis van een hash van hun data.
+# 4. Alles wordt in één zip gebundeld.
+
+A4 = (8.27, 11.69)
+KVK_RED = '#d71920'
+PHYS_COLS = {"total_matches": "Wedstrijden", "psv99_score": "PSV 99", "timetosprint_score": "TTS",
+             "sprint_distance_full_all_score": "Sprint Dis", "sprint_count_full_all_score": "Sprint Cnt",
+             "total_distance_full_all_score": "Tot. Dis"}
+
+# -----------------------------------------------------------------------------
+# 1. DATA OPHALEN (SET-BASED)
+# -----------------------------------------------------------------------------
+def fetch_dossier_data(player_ids):
+    """Haalt alle dossier secties op voor een lijst speler ID's. Geeft {player_id: dict} terug."""
+    ids = tuple(sorted({str(p) for p in player_ids}))
+    if not ids: return {}
+
+    # Header + meest recente iteratie per speler (op seizoen; iterationId enkel bij gelijk seizoen)
+    q_head = """
+        SELECT DISTINCT ON (a."playerId") a."playerId", a."iterationId", a.position,
+               i.season, i."competitionName", p.commonname, p.birthdate, p.birthplace, p.leg,
+               sq.name as current_team_name
+        FROM analysis.final_impect_scores a
+        JOIN public.players p ON a."playerId" = p.id
+        LEFT JOIN public.squads sq ON p."currentSquadId" = sq.id
+        JOIN public.iterations i ON a."iterationId" = i.id
+        WHERE a."playerId" IN %s
+        ORDER BY a."playerId", i.season DESC, a."iterationId" DESC
+    """
+    df_head = run_query(q_head, params=(ids,))
+    if df_head.empty: return {}
+    df_head['playerId'] = df_head['playerId'].astype(str)
+    df_head['iterationId'] = df_head['iterationId'].astype(str)
+
+    pairs = list(zip(df_head['iterationId'], df_head['playerId']))
+    scores = fetch_players_data(pairs)
+
+    # Fysiek: via de crosswalk op SkillCorner ID; spelers zonder koppeling via de oude join
+    phys_parts = []
+    phys_cols = ", ".join(f"f.{c}" for c in PHYS_COLS)
+    cw = load_crosswalk() if crosswalk_available() else {"skillcorner": {}, "from_skillcorner": {}}
+    sc_ids = tuple(cw["skillcorner"][p] for p in ids if p in cw["skillcorner"])
+    legacy_ids = tuple(p for p in ids if p not in cw["skillcorner"])
+    if sc_ids:
+        df_sc = run_query(f"SELECT CAST(f.player_id AS TEXT) as sc_id, {phys_cols} FROM analysis.player_physical_group_scores f WHERE f.player_id IN %s", params=(sc_ids,))
+        if not df_sc.empty:
+            df_sc['playerId'] = df_sc['sc_id'].map(lambda x: cw["from_skillcorner"].get(str(x).split('.')[0]))
+            phys_parts.append(df_sc.drop(columns='sc_id'))
+    if legacy_ids:
+        phys_parts.append(run_query(f"""
+            SELECT CAST(p.id AS TEXT) as "playerId", {phys_cols}
+            FROM analysis.player_physical_group_scores f
+            JOIN public.players p ON CAST(f.player_id AS TEXT) = CAST(p."idMappings_2_skill_corner_0" AS TEXT)
+            WHERE p.id IN %s
+        """, params=(legacy_ids,)))
+    phys_parts = [d for d in phys_parts if not d.empty]
+    df_phys = pd.concat(phys_parts, ignore_index=True) if phys_parts else pd.DataFrame()
+
+    df_int = run_query("""
+        SELECT CAST(r.speler_id AS TEXT) as "playerId", s.naam as "Scout", r.aangemaakt_op as "Datum",
+               r.beoordeling as "Rating", r.advies as "Advies", r.rapport_tekst
+        FROM scouting.rapporten r
+        LEFT JOIN scouting.gebruikers s ON r.scout_id = s.id
+        WHERE r.speler_id IN %s
+        ORDER BY r.aangemaakt_op DESC
+    """, params=(ids,))
+
+    df_ext = run_query("""
+        SELECT CAST(r."playerId" AS TEXT) as "playerId", CAST(r."iterationId" AS TEXT) as "iterationId", r.label as "Verdict"
+        FROM analysis.scouting_reports r
+        JOIN public.matches m ON r."matchId" = m.id
+        WHERE r."playerId" IN %s AND r."iterationId" IN %s AND m.available = true
+    """, params=(ids, tuple(sorted(set(df_head['iterationId'])))))
+
+    df_intel = run_query("""
+        SELECT DISTINCT ON (speler_id) CAST(speler_id AS TEXT) as "playerId", club_informatie, familie_achtergrond,
+               persoonlijkheid, makelaar_details, toegevoegd_door, laatst_bijgewerkt
+        FROM scouting.speler_intelligence
+        WHERE speler_id IN %s
+        ORDER BY speler_id, laatst_bijgewerkt DESC
+    """, params=(ids,))
+
+    def rows_for(df, pid, **extra):
+        if df.empty or 'playerId' not in df.columns: return pd.DataFrame()
+        mask = df['playerId'].astype(str) == pid
+        for col, val in extra.items(): mask &= df[col].astype(str) == val
+        return df[mask]
+
+    result = {}
+    for _, h in df_head.iterrows():
+        pid, it = h['playerId'], h['iterationId']
+        result[pid] = {
+            "header": h.to_dict(),
+            **scores.get((it, pid), {}),
+            "physical": rows_for(df_phys, pid).head(1),
+            "internal": rows_for(df_int, pid),
+            "external": rows_for(df_ext, pid, iterationId=it),
+            "intel": rows_for(df_intel, pid).head(1),
+        }
+    return result
+
+# -----------------------------------------------------------------------------
+# 2. GRAFIEKEN (GECACHED OP DATA HASH)
+# -----------------------------------------------------------------------------
+def _chart_key(kind, title, labels, values, color):
+    payload = json.dumps([kind, title, list(labels), [round(float(v), 2) for v in values], color])
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+def polar_chart_png(title, series, color):
+    """Radar chart als PNG bytes. Identieke data wordt niet opnieuw gerenderd."""
+    labels, values = series.index.tolist(), series.fillna(0).tolist()
+    path = store_path("exports", "charts", f"{_chart_key('polar', title, labels, values, color)}.png")
+    if os.path.exists(path):
+        with open(path, "rb") as f: return f.read()
+
+    fig = Figure(figsize=(5, 5))
+    ax = fig.add_subplot(projection='polar')
+    angles = np.linspace(0, 2 * np.pi, len(values), endpoint=False).tolist()
+    ax.plot(angles + angles[:1], values + values[:1], color=color, linewidth=2)
+    ax.fill(angles + angles[:1], values + values[:1], color=color, alpha=0.25)
+    ax.set_xticks(angles)
+    ax.set_xticklabels([textwrap.shorten(str(l), 22, placeholder='…') for l in labels], fontsize=7)
+    ax.set_ylim(0, 100)
+    ax.set_title(title, fontsize=11, pad=18)
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=110, bbox_inches='tight')
+
+    tmp = f"{path}.tmp{os.getpid()}_{id(buf)}"
+    with open(tmp, "wb") as f: f.write(buf.getvalue())
+    os.replace(tmp, path)
+    return buf.getvalue()
+
+# -----------------------------------------------------------------------------
+# 3. PDF RENDERING (PER SPELER)
+# -----------------------------------------------------------------------------
+def _fmt_date(val):
+    try: return pd.to_datetime(val).strftime('%d-%m-%Y')
+    except Exception: return "-"
+
+def _text_block(fig, y, title, text, width=95, size=9):
+    """Schrijft een titel + gewrapte tekst; geeft de nieuwe y-positie terug."""
+    fig.text(0.06, y, title, fontsize=11, weight='bold', color=KVK_RED)
+    y -= 0.022
+    lines = textwrap.wrap(str(text) if text else "Geen informatie beschikbaar.", width) or ["-"]
+    for line in lines[:14]:
+        fig.text(0.06, y, line, fontsize=size)
+        y -= 0.016
+    return y - 0.01
+
+def _table(fig, rect, df, title=None):
+    ax = fig.add_axes(rect); ax.axis('off')
+    if title: ax.set_title(title, fontsize=10, loc='left', weight='bold')
+    if df.empty:
+        ax.text(0, 0.9, "Geen data.", fontsize=9); return
+    cells = df.astype(object).where(df.notna(), "-").astype(str).values.tolist()
+    tbl = ax.table(cellText=cells, colLabels=df.columns.tolist(), loc='upper left', cellLoc='left')
+    tbl.auto_set_font_size(False); tbl.set_fontsize(7.5); tbl.scale(1, 1.2)
+
+def _image(fig, rect, png_bytes):
+    ax = fig.add_axes(rect); ax.axis('off')
+    ax.imshow(mpimg.imread(io.BytesIO(png_bytes), format='png'))
+
+def _score_table(series, label):
+    if series is None or series.empty: return pd.DataFrame()
+    df = series.sort_values(ascending=False).round(1).reset_index()
+    df.columns = [label, "Score"]
+    return df
+
+def render_dossier_pdf(data):
+    """Rendert één dossier als PDF bytes."""
+    h = data["header"]
+    buf = io.BytesIO()
+    with PdfPages(buf) as pdf:
+        # PAGINA 1: Header + profiel
+        fig = Figure(figsize=A4)
+        fig.text(0.06, 0.95, f"{h['commonname']}", fontsize=20, weight='bold', color=KVK_RED)
+        fig.text(0.06, 0.925, f"{h.get('season')} - {h.get('competitionName')} | Positie: {h.get('position') or '-'}", fontsize=10)
+        info = [("Huidig Team", h.get('current_team_name') or "Onbekend"), ("Geboortedatum", str(h.get('birthdate') or "-")),
+                ("Geboorteplaats", h.get('birthplace') or "-"), ("Voet", h.get('leg') or "-")]
+        for i, (k, v) in enumerate(info):
+            fig.text(0.06 + i * 0.23, 0.885, k, fontsize=8, color='gray')
+            fig.text(0.06 + i * 0.23, 0.868, str(v), fontsize=10, weight='bold')
+
+        profiles = data.get("profiles", pd.Series(dtype=float))
+        profiles = profiles[profiles.fillna(0) > 0] if not profiles.empty else profiles
+        if not profiles.empty:
+            profiles.index = [KVK_PROFILES.get(c, c) for c in profiles.index]
+            _image(fig, [0.05, 0.42, 0.9, 0.42], polar_chart_png("KVK Profiel Spider Chart", profiles, KVK_RED))
+        _table(fig, [0.06, 0.04, 0.88, 0.34], _score_table(profiles, "Profiel"), "KVK Profielen")
+        pdf.savefig(fig)
+
+        # PAGINA 2: Metrieken + KPIs
+        fig = Figure(figsize=A4)
+        metrics, kpis = data.get("metrics", pd.Series(dtype=float)), data.get("kpis", pd.Series(dtype=float))
+        if metrics is not None and not metrics.empty:
+            _image(fig, [0.0, 0.62, 0.5, 0.34], polar_chart_png("Metrieken", metrics, '#2980b9'))
+        _table(fig, [0.52, 0.62, 0.44, 0.34], _score_table(metrics, "Metriek"), "Metrieken (Impect)")
+        if kpis is not None and not kpis.empty:
+            _image(fig, [0.0, 0.22, 0.5, 0.34], polar_chart_png("KPIs", kpis, '#8e44ad'))
+        _table(fig, [0.52, 0.22, 0.44, 0.34], _score_table(kpis, "KPI"), "KPIs")
+        phys = data.get("physical", pd.DataFrame())
+        if not phys.empty:
+            phys = phys[[c for c in PHYS_COLS if c in phys.columns]].rename(columns=PHYS_COLS)
+        _table(fig, [0.06, 0.04, 0.88, 0.12], phys, "Fysieke Data (SkillCorner)")
+        pdf.savefig(fig)
+
+        # PAGINA 3: Rapporten + Intelligence
+        fig = Figure(figsize=A4)
+        internal = data.get("internal", pd.DataFrame())
+        df_int = pd.DataFrame()
+        if not internal.empty:
+            df_int = internal[["Datum", "Scout", "Rating", "Advies"]].head(12).copy()
+            df_int['Datum'] = df_int['Datum'].map(_fmt_date)
+        _table(fig, [0.06, 0.66, 0.88, 0.30], df_int, "Scouting Rapporten (Intern)")
+
+        external = data.get("external", pd.DataFrame())
+        ext_summary = external['Verdict'].value_counts().rename_axis('Verdict').reset_index(name='Aantal') if not external.empty else pd.DataFrame()
+        _table(fig, [0.06, 0.50, 0.88, 0.13], ext_summary, "Data Scout Rapporten (Extern)")
+
+        intel = data.get("intel", pd.DataFrame())
+        y = 0.45
+        fig.text(0.06, y, "Strategisch Dossier (Intelligence)", fontsize=12, weight='bold'); y -= 0.03
+        if intel.empty:
+            fig.text(0.06, y, "Er is nog geen strategisch dossier aangemaakt voor deze speler.", fontsize=9)
+        else:
+            r = intel.iloc[0]
+            for title, col in [("Club & Netwerk", 'club_informatie'), ("Familie & Achtergrond", 'familie_achtergrond'),
+                               ("Persoonlijkheid & Mentaliteit", 'persoonlijkheid'), ("Makelaar & Contract", 'makelaar_details')]:
+                y = _text_block(fig, y, title, r[col])
+                if y < 0.05: break
+        fig.text(0.06, 0.015, f"KVK Platform - gegenereerd op {datetime.date.today().strftime('%d-%m-%Y')}", fontsize=7, color='gray')
+        pdf.savefig(fig)
+    return buf.getvalue()
+
+# -----------------------------------------------------------------------------
+# 4. BATCH EXPORT (WORKER POOL + ZIP)
+# -----------------------------------------------------------------------------
+def _safe_filename(name):
+    keep = "".join(c if c.isalnum() or c in " -_" else "_" for c in str(name))
+    return keep.strip().replace(" ", "_") or "speler"
+
+def export_dossiers_zip(player_ids, max_workers=None, progress=None):
+    """
+    Exporteert de dossiers van een lijst spelers naar één zip (bytes).
+    progress(done, total, naam) wordt opgeroepen vanuit de hoofdthread.
+    De workers krijgen enkel kant-en-klare data mee (geen DB connecties).
+    Geeft (zip_bytes, lijst van mislukte spelers) terug.
+    """
+    data = fetch_dossier_data(player_ids)
+    max_workers = max_workers or min(4, os.cpu_count() or 1)
+    total, failed = len(data), []
+    zip_buf = io.BytesIO()
+    with zipfile.ZipFile(zip_buf, "w", zipfile.ZIP_DEFLATED) as zf, ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(render_dossier_pdf, d): pid for pid, d in data.items()}
+        for done, fut in enumerate(as_completed(futures), start=1):
+            pid = futures[fut]
+            name = data[pid]["header"]["commonname"]
+            try:
+                zf.writestr(f"{_safe_filename(name)}_{pid}.pdf", fut.result())
+            except Exception as e:
+                failed.append(f"{name}: {e}")
+            if progress: progress(done, total, name)
+    missing = [p for p in {str(x) for x in player_ids} if p not in data]
+    failed += [f"{p}: geen data" for p in missing]
+    return zip_buf.getvalue(), failed
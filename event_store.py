@@ -0,0 +1,194 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from utils import run_query, run_uncached_query
+from store import store_path, file_version
+
+# -----------------------------------------------------------------------------
+# EVENT STORE: één Feather (Arrow IPC) bestand per wedstrijd
+# -----------------------------------------------------------------------------
+# Getypte kolommen: float32 coördinaten/xT/minuten, int64 ids, int8 periode en
+# dictionary-geëncodeerde tekst (acties, resultaten, fases, namen). Bestanden zijn
+# ongecomprimeerd en worden memory-mapped gelezen: de Arrow tabel (read_event_table,
+# load_many) is zonder kopie. Bij de omzetting naar pandas gaan numerieke kolommen
+# zonder nulls ook zonder kopie mee; tekstkolommen worden wél gedecodeerd (kopie) tot
+# gewone strings, omdat de views er stringbewerkingen op doen (geen categoricals).
+# Wedstrijden die al gematerialiseerd zijn worden nooit opnieuw uit Postgres gehaald.
+# Predicaten vergelijken de kolom zelf (geen CAST): de ids gaan als literals mee en
+# krijgen het type van de kolom, zodat de indexen op matchId/id/iterationId werken.
+
+EVENTS_QUERY = """
+    SELECT
+        CAST(e."matchId" AS TEXT) as "matchId",
+        e.index as "Volgorde",
+        e."squadId", e.action, e."actionType", e.result,
+        (e.player ->> 'id') as player_id_raw,
+        (e."gameTime" ->> 'gameTime') as "TijdString",
+        e."distanceToOpponent", e."phase", e."pressure", e."periodId", e."pressingPlayerId",
+        CAST(e."start" -> 'coordinates' ->> 'x' AS FLOAT) as x_start,
+        CAST(e."start" -> 'coordinates' ->> 'y' AS FLOAT) as y_start,
+        CAST(e."end" -> 'coordinates' ->> 'x' AS FLOAT) as x_end,
+        CAST(e."end" -> 'coordinates' ->> 'y' AS FLOAT) as y_end,
+        CAST(e."pxT" ->> 'team' AS FLOAT) as "xT_Team_Raw",
+        CAST(e."pxT" ->> 'opponent' AS FLOAT) as "xT_Opp_Raw"
+    FROM public.match_events e
+    WHERE e."matchId" IN %s
+    ORDER BY e."matchId", e.index ASC
+"""
+
+FLOAT_COLS = ['x_start', 'y_start', 'x_end', 'y_end', 'xT_Team_Raw', 'xT_Opp_Raw', 'Minuut']
+ID_COLS = ['squadId', 'player_id_raw', 'pressingPlayerId']
+TEXT_COLS = ['action', 'actionType', 'result', 'phase', 'TijdString', 'Team', 'Speler', 'PressingSpeler']
+BATCH_SIZE = 20            # wedstrijden per query
+FINAL_AFTER_HOURS = 24   # pas daarna beschouwen we de events van een wedstrijd als definitief
+
+def _match_file(match_id):
+    return store_path("events", f"{match_id}.feather")
+
+def is_materialized(match_id):
+    return bool(file_version(_match_file(match_id)))
+
+def _name_map(table, name_col, ids):
+    ids = sorted({str(x) for x in ids if str(x).isdigit()})
+    if not ids: return {}
+    df = run_query(f"SELECT CAST(id AS TEXT) as id, {name_col} FROM {table} WHERE id IN %s", params=(tuple(ids),))
+    return dict(zip(df['id'], df[name_col])) if not df.empty else {}
+
+def _to_id(values):
+    return pd.to_numeric(pd.Series(values), errors='coerce').astype('Int64')
+
+# -----------------------------------------------------------------------------
+# 1. MATERIALISEREN (INCREMENTEEL)
+# -----------------------------------------------------------------------------
+def _typed_table(df):
+    """Pandas events -> Arrow tabel met compacte types."""
+    from match_engine import gametime_to_minutes
+    df = df.copy()
+    df['Minuut'] = gametime_to_minutes(df['TijdString'])
+    df['Volgorde'] = pd.to_numeric(df['Volgorde'], errors='coerce').astype('Int32')
+    df['periodId'] = pd.to_numeric(df['periodId'], errors='coerce').astype('Int8')
+    for c in ID_COLS: df[c] = _to_id(df[c])
+    for c in FLOAT_COLS: df[c] = pd.to_numeric(df[c], errors='coerce').astype('float32')
+    for c in TEXT_COLS: df[c] = df[c].astype('category')
+    for c in ('distanceToOpponent', 'pressure'):
+        df[c] = df[c].astype('float32') if pd.api.types.is_numeric_dtype(df[c]) else df[c].astype('category')
+    return pa.Table.from_pandas(df.drop(columns=['matchId']).reset_index(drop=True), preserve_index=False)
+
+def _fetch_tables(match_ids):
+    """Eén query voor een reeks wedstrijden -> {matchId: Arrow tabel}."""
+    df = run_uncached_query(EVENTS_QUERY, params=(tuple(str(m) for m in match_ids),))
+    if df.empty: return {}
+
+    squad_map = _name_map("public.squads", "name", df['squadId'].dropna().unique())
+    player_map = _name_map("public.players", "commonname", set(df['player_id_raw'].dropna().unique()) | set(df['pressingPlayerId'].dropna().unique()))
+    df['Team'] = df['squadId'].astype(str).map(squad_map).fillna('Onbekend')
+    df['Speler'] = df['player_id_raw'].astype(str).map(player_map).fillna('Onbekend')
+    df['PressingSpeler'] = df['pressingPlayerId'].astype(str).map(player_map).fillna('-')
+    return {match_id: _typed_table(part) for match_id, part in df.groupby('matchId', sort=False)}
+
+def materialize_matches(match_ids, progress=None):
+    """
+    Haalt events op voor wedstrijden die nog niet in de store zitten (per batch van
+    BATCH_SIZE wedstrijden één query) en schrijft één bestand per wedstrijd.
+    Geeft de lijst weggeschreven wedstrijden terug.
+    """
+    todo = [str(m) for m in match_ids if not is_materialized(m)]
+    written = []
+    for start in range(0, len(todo), BATCH_SIZE):
+        if progress: progress(start, len(todo))
+        for match_id, table in _fetch_tables(todo[start:start + BATCH_SIZE]).items():
+            path = _match_file(match_id)
+            tmp = f"{path}.tmp{os.getpid()}"
+            feather.write_feather(table, tmp, compression='uncompressed')
+            os.replace(tmp, path)
+            written.append(match_id)
+    return written
+
+def played_matches(iteration_ids=None):
+    """Gespeelde wedstrijden (id, iterationId, thuis/uit) van de gegeven iteraties (of alles)."""
+    where, params = "", None
+    if iteration_ids is not None:
+        where, params = 'AND m."iterationId" IN %s', (tuple(str(i) for i in iteration_ids),)
+    return run_uncached_query(f"""
+        SELECT CAST(m.id AS TEXT) as id, CAST(m."iterationId" AS TEXT) as "iterationId",
+               CAST(m."homeSquadId" AS TEXT) as "homeSquadId", CAST(m."awaySquadId" AS TEXT) as "awaySquadId", m."scheduledDate"
+        FROM public.matches m
+        WHERE m."scheduledDate" <= NOW() - INTERVAL '{FINAL_AFTER_HOURS} hours' {where}
+        ORDER BY m."scheduledDate"
+    """, params=params)
+
+def refresh_event_store(iteration_ids=None, progress=None):
+    """Materialiseert alle gespeelde wedstrijden die nog ontbreken. Geeft het aantal nieuwe wedstrijden terug."""
+    df_m = played_matches(iteration_ids)
+    if df_m.empty: return 0
+    return len(materialize_matches(df_m['id'].tolist(), progress=progress))
+
+# -----------------------------------------------------------------------------
+# 2. LEZEN (MEMORY-MAPPED)
+# -----------------------------------------------------------------------------
+def read_event_table(match_id, columns=None):
+    """Arrow tabel van een wedstrijd, memory-mapped (geen kopie), of None."""
+    path = _match_file(match_id)
+    if not os.path.exists(path): return None
+    return feather.read_table(path, columns=columns, memory_map=True)
+
+def _table_to_frame(table):
+    """Arrow -> pandas: tekst-dictionaries in Arrow decoderen (sneller dan via categoricals)."""
+    cols, fields = [], []
+    for f, col in zip(table.schema, table.columns):
+        if pa.types.is_dictionary(f.type) and (pa.types.is_string(f.type.value_type) or pa.types.is_large_string(f.type.value_type)):
+            col = col.cast(f.type.value_type); f = pa.field(f.name, col.type)
+        cols.append(col); fields.append(f)
+    table = pa.table(cols, schema=pa.schema(fields, metadata=table.schema.metadata))
+    df = table.to_pandas(split_blocks=True)
+    for c in df.columns:
+        if isinstance(df[c].dtype, pd.CategoricalDtype): df[c] = df[c].astype(str).where(df[c].notna())
+    return df
+
+def load_events(match_id, columns=None, persist=True):
+    """
+    Events van één wedstrijd als DataFrame. Ontbreekt de wedstrijd nog in de store, dan
+    wordt ze eerst gematerialiseerd; met persist=False (bv. een wedstrijd van vandaag)
+    wordt ze enkel opgehaald en niet weggeschreven.
+    """
+    match_id = str(match_id)
+    if not is_materialized(match_id):
+        if not persist:
+            table = _fetch_tables([match_id]).get(match_id)
+            if table is None: return pd.DataFrame()
+            return _table_to_frame(table.select(columns) if columns else table)
+        materialize_matches([match_id])
+    table = read_event_table(match_id, columns)
+    return _table_to_frame(table) if table is not None else pd.DataFrame()
+
+# -----------------------------------------------------------------------------
+# 3. TEAM-SEIZOEN (BULK)
+# -----------------------------------------------------------------------------
+def team_matches(iteration_id, squad_id):
+    """Gespeelde wedstrijden van een ploeg in een iteratie (id, thuis/uit, datum)."""
+    df_m = played_matches([iteration_id])
+    if df_m.empty: return df_m
+    sq = str(squad_id)
+    return df_m[(df_m['homeSquadId'] == sq) | (df_m['awaySquadId'] == sq)].reset_index(drop=True)
+
+def load_many(match_ids, columns=None, progress=None):
+    """
+    Events van meerdere wedstrijden als één DataFrame (met matchId). Ontbrekende
+    wedstrijden worden eerst in batches gematerialiseerd; daarna enkel lokale
+    memory-mapped reads en één concat op Arrow niveau. Volgorde: per wedstrijd, op index.
+    """
+    match_ids = [str(m) for m in match_ids]
+    materialize_matches(match_ids, progress=progress)
+    tables = []
+    for m in match_ids:
+        t = read_event_table(m, columns)
+        if t is None or t.num_rows == 0: continue
+        tables.append(t.append_column('matchId', pa.array([m] * t.num_rows, pa.string())))
+    if not tables: return pd.DataFrame()
+    try:
+        return _table_to_frame(pa.concat_tables(tables, promote_options='permissive'))
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        # kolom die in de ene wedstrijd numeriek en in de andere tekst is: per wedstrijd omzetten
+        return pd.concat([_table_to_frame(t) for t in tables], ignore_index=True)
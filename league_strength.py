@@ -0,0 +1,112 @@
+import time
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils import run_uncached_query, KVK_PROFILES, season_start_year
+from store import store_path, save_arrays, load_arrays, read_manifest, write_manifest, file_version
+
+# -----------------------------------------------------------------------------
+# COMPETITIESTERKTE (NORMALISATIE OVER COMPETITIES HEEN)
+# -----------------------------------------------------------------------------
+# Scores zijn genormaliseerd binnen een iteratie: een speler die naar een sterkere
+# competitie gaat, zakt in score. Elke speler die in twee iteraties voorkomt (zelfde
+# of volgend seizoen) levert per KVK profiel één vergelijking op:
+#     score_2 - score_1 = sterkte_2 - sterkte_1   (met teken: sterk = lagere ruwe score)
+# Dat is een ijl kleinste-kwadratenprobleem A·s = y met per rij +1/-1. We lossen de
+# normaalvergelijkingen (A^T A is een graaf-Laplaciaan) op met een kleine ridge,
+# zodat zwak verbonden competities naar 0 krimpen. Gecorrigeerd = score + sterkte.
+
+STRENGTH_PATH = store_path("league_strength", "strength.npz")
+MANIFEST = store_path("league_strength", "manifest.json")
+RIDGE = 5.0            # regularisatie in 'aantal vergelijkingen'
+MAX_YEAR_GAP = 1       # enkel overgangen binnen hetzelfde of het volgende seizoen
+
+# -----------------------------------------------------------------------------
+# 1. FIT (BATCH)
+# -----------------------------------------------------------------------------
+def _load_pairs():
+    """Vergelijkingen (it_1, it_2, delta) uit opeenvolgende iteraties van dezelfde speler."""
+    kvk_cols = ", ".join(f'a."{c}"' for c in KVK_PROFILES)
+    df = run_uncached_query(f"""
+        SELECT a."playerId", CAST(a."iterationId" AS TEXT) as it, i.season, {kvk_cols}
+        FROM analysis.final_impect_scores a
+        JOIN public.iterations i ON CAST(a."iterationId" AS TEXT) = CAST(i.id AS TEXT)
+    """)
+    if df.empty: return df
+    years = {s: season_start_year(s) for s in df['season'].unique()}
+    df['year'] = df['season'].map(years)
+    df = df.dropna(subset=['year'])
+
+    long = df.melt(id_vars=['playerId', 'it', 'year'], value_vars=list(KVK_PROFILES), var_name='item', value_name='score')
+    long = long[long['score'].astype(float) > 0]  # 0 = profiel niet actief voor deze positie
+    long = long.sort_values(['playerId', 'item', 'year', 'it']).reset_index(drop=True)
+
+    pid, item = long['playerId'].to_numpy(), long['item'].to_numpy()
+    year, it = long['year'].to_numpy(), long['it'].to_numpy()
+    score = long['score'].astype(float).to_numpy()
+    ok = (pid[1:] == pid[:-1]) & (item[1:] == item[:-1]) & (year[1:] - year[:-1] <= MAX_YEAR_GAP) & (it[1:] != it[:-1])
+    return pd.DataFrame({'it_1': it[:-1][ok], 'it_2': it[1:][ok], 'delta': score[1:][ok] - score[:-1][ok]})
+
+def solve_strength(pairs, iteration_ids):
+    """
+    Kleinste kwadraten voor de sterkte per iteratie. pairs: DataFrame (it_1, it_2, delta).
+    Geeft (sterkte, aantal vergelijkingen) terug als arrays in de volgorde van iteration_ids.
+    """
+    n = len(iteration_ids)
+    index = pd.Series(np.arange(n), index=iteration_ids)
+    a = index.loc[pairs['it_1']].to_numpy(); b = index.loc[pairs['it_2']].to_numpy()
+    y = pairs['delta'].to_numpy(dtype=float)
+
+    # Rij r van A: -1 op a[r], +1 op b[r]  ->  A^T A = Laplaciaan, A^T y = bincount
+    lap = np.zeros((n, n))
+    np.add.at(lap, (a, a), 1.0); np.add.at(lap, (b, b), 1.0)
+    np.add.at(lap, (a, b), -1.0); np.add.at(lap, (b, a), -1.0)
+    rhs = np.bincount(b, weights=y, minlength=n) - np.bincount(a, weights=y, minlength=n)
+
+    # Stijgt de ruwe score bij de overgang, dan was de nieuwe competitie zwakker: sterkte = -oplossing
+    sol = np.linalg.solve(lap + RIDGE * np.eye(n), rhs)
+    links = np.bincount(a, minlength=n) + np.bincount(b, minlength=n)
+    strength = -(sol - sol[links > 0].mean()) if (links > 0).any() else np.zeros(n)
+    return strength, links
+
+def fit_strength(progress=None):
+    """Schat de sterkte van alle iteraties en schrijf ze weg. Geeft (n_iteraties, n_vergelijkingen) terug."""
+    if progress: progress("Spelers in meerdere iteraties zoeken...")
+    pairs = _load_pairs()
+    if pairs.empty: return (0, 0)
+
+    if progress: progress("Kleinste kwadraten oplossen...")
+    iteration_ids = np.unique(np.concatenate([pairs['it_1'].to_numpy(), pairs['it_2'].to_numpy()])).astype(str)
+    strength, links = solve_strength(pairs, iteration_ids)
+
+    save_arrays(STRENGTH_PATH, iteration_ids=iteration_ids, strength=strength.astype('float32'), links=links.astype('int32'))
+    write_manifest(MANIFEST, {"fitted_at": time.strftime("%Y-%m-%d %H:%M"), "pairs": int(len(pairs))})
+    return (len(iteration_ids), len(pairs))
+
+def strength_info():
+    return read_manifest(MANIFEST)
+
+# -----------------------------------------------------------------------------
+# 2. LOOKUP API (SERVING)
+# -----------------------------------------------------------------------------
+@st.cache_resource(max_entries=2)
+def _load_strength(version):
+    data = load_arrays(STRENGTH_PATH)
+    if data is None: return {}
+    return dict(zip(data['iteration_ids'].astype(str).tolist(), data['strength'].astype(float).tolist()))
+
+def strength_map():
+    """{iterationId: sterkte} (leeg als de batch nog niet gedraaid heeft)."""
+    return _load_strength(file_version(STRENGTH_PATH))
+
+def get_strength(iteration_id):
+    return strength_map().get(str(iteration_id), 0.0)
+
+def adjust_scores(df, cols, iteration_col='iterationId'):
+    """Kopie van df met competitie-gecorrigeerde scores in `cols` (score + sterkte, begrensd op 0-100)."""
+    df = df.copy()
+    offset = df[iteration_col].astype(str).map(strength_map()).fillna(0.0).to_numpy()
+    for c in cols:
+        vals = pd.to_numeric(df[c], errors='coerce')
+        df[c] = np.where(vals > 0, np.clip(vals + offset, 0, 100), vals)
+    return df
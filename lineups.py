@@ -0,0 +1,278 @@
+import json
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils import run_query, run_uncached_query
+from store import store_path, save_frame, load_frame, read_manifest, write_manifest, file_version
+from event_store import played_matches, BATCH_SIZE, _name_map
+
+# -----------------------------------------------------------------------------
+# OPSTELLINGEN: genormaliseerde tabel per iteratie
+# -----------------------------------------------------------------------------
+# De lineup JSON (squadHome/squadAway in public.match_details_full) wordt één keer
+# per wedstrijd uitgeplat tot één rij per speler:
+#   matchId, squadId, side, playerId, shirt, starter, position, positionSide, coachId,
+#   min_on, min_off, minutes
+# Speelminuten komen uit de SUBSTITUTION events (elke wissel-event van een speler
+# schakelt hem aan/af, beginnend bij basis of bank; ontbreekt één kant van een wissel,
+# dan wordt die afgeleid uit de eerste/laatste actie) en het einde van de laatste periode.
+# Per iteratie één Feather bestand; nieuwe wedstrijden worden er enkel aan toegevoegd.
+
+LINEUP_COLS = ['matchId', 'squadId', 'side', 'playerId', 'shirt', 'starter', 'position', 'positionSide',
+               'coachId', 'min_on', 'min_off', 'minutes']
+
+DETAILS_QUERY = """
+    SELECT CAST(id AS TEXT) as "matchId", "squadHome", "squadAway"
+    FROM public.match_details_full WHERE id IN %s
+"""
+
+# Wissels, het laatste event per periode (einde van de wedstrijd) en het eerste/laatste
+# event van elke speler (om wissels zonder event van één van beide spelers te koppelen)
+TIMING_QUERY = """
+    SELECT CAST(e."matchId" AS TEXT) as "matchId", 'SUB' as kind, (e.player ->> 'id') as "playerId",
+           (e."gameTime" ->> 'gameTime') as "TijdString", e.index
+    FROM public.match_events e
+    WHERE e."matchId" IN %s AND UPPER(e.action) = 'SUBSTITUTION'
+    UNION ALL
+    (SELECT DISTINCT ON (e."matchId", e."periodId")
+            CAST(e."matchId" AS TEXT), 'END', NULL, (e."gameTime" ->> 'gameTime'), e.index
+     FROM public.match_events e
+     WHERE e."matchId" IN %s
+     ORDER BY e."matchId", e."periodId", e.index DESC)
+    UNION ALL
+    (SELECT DISTINCT ON (e."matchId", e.player ->> 'id')
+            CAST(e."matchId" AS TEXT), 'FIRST', (e.player ->> 'id'), (e."gameTime" ->> 'gameTime'), e.index
+     FROM public.match_events e
+     WHERE e."matchId" IN %s AND e.player ->> 'id' IS NOT NULL AND UPPER(e.action) <> 'SUBSTITUTION'
+     ORDER BY e."matchId", e.player ->> 'id', e.index)
+    UNION ALL
+    (SELECT DISTINCT ON (e."matchId", e.player ->> 'id')
+            CAST(e."matchId" AS TEXT), 'LAST', (e.player ->> 'id'), (e."gameTime" ->> 'gameTime'), e.index
+     FROM public.match_events e
+     WHERE e."matchId" IN %s AND e.player ->> 'id' IS NOT NULL AND UPPER(e.action) <> 'SUBSTITUTION'
+     ORDER BY e."matchId", e.player ->> 'id', e.index DESC)
+"""
+SUB_PAIR_MINUTES = 1.0
+LINEUP_VERSION = 2       # ophogen als de minutenberekening verandert -> alle wedstrijden opnieuw   # wissel-events van dezelfde ploeg binnen deze marge horen bij dezelfde wissel
+
+def _lineup_file(iteration_id):
+    return store_path("lineups", f"{iteration_id}.feather")
+
+def _manifest_file(iteration_id):
+    return store_path("lineups", f"{iteration_id}.json")
+
+def _as_dict(raw):
+    if raw is None or (isinstance(raw, float) and np.isnan(raw)): return {}
+    data = json.loads(raw) if isinstance(raw, str) else raw
+    return data if isinstance(data, dict) else {}
+
+# -----------------------------------------------------------------------------
+# 1. UITPLATTEN
+# -----------------------------------------------------------------------------
+def parse_lineups(df_details, df_matches):
+    """
+    match_details_full rijen -> één rij per speler (zonder minuten).
+    df_matches levert homeSquadId/awaySquadId per wedstrijd (kolom id).
+    """
+    players, starts, coaches = [], [], []
+    for mid, side, raw in zip(np.repeat(df_details['matchId'].to_numpy(), 2), ['home', 'away'] * len(df_details),
+                              df_details[['squadHome', 'squadAway']].to_numpy().ravel()):
+        data = _as_dict(raw)
+        coaches.append((mid, side, data.get('coachId')))
+        players += [(mid, side, p.get('id'), p.get('shirtNumber')) for p in data.get('players', []) or []]
+        starts += [(mid, side, p.get('playerId'), p.get('position'), p.get('positionSide')) for p in data.get('startingPositions', []) or []]
+    if not players: return pd.DataFrame(columns=LINEUP_COLS[:9])
+
+    df = pd.DataFrame(players, columns=['matchId', 'side', 'playerId', 'shirt'])
+    df_s = pd.DataFrame(starts, columns=['matchId', 'side', 'playerId', 'position', 'positionSide'])
+    df_c = pd.DataFrame(coaches, columns=['matchId', 'side', 'coachId'])
+    for d in (df, df_s):
+        d['playerId'] = pd.to_numeric(d['playerId'], errors='coerce').astype('Int64')
+    df = df.dropna(subset=['playerId']).drop_duplicates(['matchId', 'playerId'])
+    df_s = df_s.dropna(subset=['playerId']).drop_duplicates(['matchId', 'playerId'])
+
+    df = df.merge(df_s, on=['matchId', 'side', 'playerId'], how='left', indicator=True)
+    df['starter'] = df.pop('_merge').eq('both')
+    df['position'] = df['position'].where(df['starter'], 'Bank')
+    df['positionSide'] = df['positionSide'].fillna('')
+    df = df.merge(df_c, on=['matchId', 'side'], how='left')
+    df['coachId'] = pd.to_numeric(df['coachId'], errors='coerce').astype('Int64')
+
+    squads = df_matches.set_index('id')[['homeSquadId', 'awaySquadId']]
+    home = df['matchId'].map(squads['homeSquadId']); away = df['matchId'].map(squads['awaySquadId'])
+    df['squadId'] = pd.to_numeric(np.where(df['side'] == 'home', home, away), errors='coerce')
+    df['squadId'] = df['squadId'].astype('Int64')
+    df['shirt'] = pd.to_numeric(df['shirt'], errors='coerce').astype('Int16')
+    return df[LINEUP_COLS[:9]]
+
+def _unpaired(subs):
+    """
+    Wissel-events per (wedstrijd, ploeg) koppelen op tijd: elke wissel heeft normaal een
+    'erin' en een 'eruit' event. Geeft {(matchId, squadId): (losse erin-tijden, losse eruit-tijden)}.
+    """
+    out = {}
+    for key, g in subs.groupby(['matchId', 'squadId'], sort=False):
+        ons, offs = sorted(g.loc[g['on'], 'Minuut']), sorted(g.loc[~g['on'], 'Minuut'])
+        i = j = 0; u_on, u_off = [], []
+        while i < len(ons) and j < len(offs):
+            if abs(ons[i] - offs[j]) <= SUB_PAIR_MINUTES: i += 1; j += 1
+            elif ons[i] < offs[j]: u_on.append(ons[i]); i += 1
+            else: u_off.append(offs[j]); j += 1
+        out[key] = (u_on + ons[i:], u_off + offs[j:])
+    return out
+
+def add_minutes(df, df_timing):
+    """
+    Voegt min_on / min_off / minutes toe. Per speler schakelt elk SUBSTITUTION event
+    de status om (basisspeler: 1e = eruit; bankspeler: 1e = erin, 2e = eruit).
+    Bevat een wissel maar één van beide spelers (los event), dan wordt de andere kant
+    afgeleid: een invaller zonder event komt erin op de losse eruit-tijd van zijn ploeg
+    (of anders op zijn eerste actie), een basisspeler zonder event gaat eruit op de
+    losse erin-tijd als zijn laatste actie daarvoor ligt.
+    """
+    from match_engine import gametime_to_minutes
+    df = df.reset_index(drop=True).copy()
+    t = df_timing.copy()
+    t['Minuut'] = gametime_to_minutes(t['TijdString']).to_numpy()
+    t['playerId'] = pd.to_numeric(t['playerId'], errors='coerce').astype('Int64')
+    end = t[t['kind'] == 'END'].groupby('matchId')['Minuut'].max()
+    match_end = df['matchId'].map(end).fillna(90.0).to_numpy(dtype=float)
+
+    subs = t[t['kind'] == 'SUB'].dropna(subset=['playerId'])
+    subs = subs.merge(df[['matchId', 'playerId', 'squadId', 'starter']], on=['matchId', 'playerId'], how='inner')
+    subs = subs.sort_values(['matchId', 'index']).reset_index(drop=True)
+    k = subs.groupby(['matchId', 'playerId']).cumcount().to_numpy()
+    subs['on'] = np.where(subs['starter'].to_numpy(dtype=bool), k % 2 == 1, k % 2 == 0)
+
+    key = pd.MultiIndex.from_arrays([df['matchId'], df['playerId']])
+    first_of = lambda d: d.groupby(['matchId', 'playerId'])['Minuut'].first().reindex(key).to_numpy(dtype=float)
+    t_on, t_off = first_of(subs[subs['on']]), first_of(subs[~subs['on']])
+    seen = t[t['kind'] == 'FIRST'].dropna(subset=['playerId'])
+    last = t[t['kind'] == 'LAST'].dropna(subset=['playerId'])
+    first_seen, last_seen = first_of(seen), first_of(last)
+    starter = df['starter'].to_numpy(dtype=bool)
+
+    on = np.where(starter, 0.0, t_on)                        # bank zonder wissel: NaN (niet gespeeld)
+    off = t_off.copy()
+
+    # Losse wissel-events: de ontbrekende kant afleiden
+    loose = _unpaired(subs)
+    squads = df['squadId'].to_numpy(dtype=object); matches = df['matchId'].to_numpy(dtype=object)
+    for (m, sq), (u_on, u_off) in loose.items():
+        rows = np.flatnonzero((matches == m) & (squads == sq))
+        for i in sorted(rows[~starter[rows] & np.isnan(on[rows]) & ~np.isnan(first_seen[rows])], key=lambda r: first_seen[r]):
+            cands = [x for x in u_off if x <= first_seen[i] + SUB_PAIR_MINUTES]
+            if cands: on[i] = max(cands); u_off.remove(on[i])
+        for u in u_on:
+            cands = [r for r in rows[starter[rows] & np.isnan(off[rows])] if last_seen[r] <= u + SUB_PAIR_MINUTES]
+            if cands: off[max(cands, key=lambda r: last_seen[r])] = u
+    # Invaller met acties maar zonder (afleidbare) wissel: erin op zijn eerste actie
+    on = np.where(~starter & np.isnan(on), first_seen, on)
+
+    off = np.where(np.isnan(off), match_end, off)
+    off = np.where(np.isnan(on), np.nan, np.minimum(off, match_end))
+    df['min_on'] = on.astype('float32')
+    df['min_off'] = off.astype('float32')
+    df['minutes'] = np.nan_to_num(np.clip(off - on, 0, None), nan=0.0).astype('float32')
+    return df[LINEUP_COLS]
+
+def build_lineups(match_ids, df_matches):
+    """Lineups (met minuten) voor een lijst wedstrijden, in batches van BATCH_SIZE."""
+    parts = []
+    for start in range(0, len(match_ids), BATCH_SIZE):
+        ids = tuple(str(m) for m in match_ids[start:start + BATCH_SIZE])
+        df_details = run_uncached_query(DETAILS_QUERY, params=(ids,))
+        if df_details.empty: continue
+        df = parse_lineups(df_details, df_matches)
+        if df.empty: continue
+        df_timing = run_uncached_query(TIMING_QUERY, params=(ids, ids, ids, ids))
+        if df_timing.empty: df_timing = pd.DataFrame(columns=['matchId', 'kind', 'playerId', 'TijdString', 'index'])
+        parts.append(add_minutes(df, df_timing))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=LINEUP_COLS)
+
+# -----------------------------------------------------------------------------
+# 2. INCREMENTELE UPDATE (PER COMPETITIE)
+# -----------------------------------------------------------------------------
+def update_lineups(iteration_id, df_matches=None):
+    """Voegt de lineups van nog niet verwerkte gespeelde wedstrijden toe. Geeft het aantal nieuwe wedstrijden terug."""
+    iteration_id = str(iteration_id)
+    if df_matches is None: df_matches = played_matches([iteration_id])
+    if df_matches.empty: return 0
+    manifest = read_manifest(_manifest_file(iteration_id))
+    done = set(manifest.get("matches", [])) if manifest.get("version") == LINEUP_VERSION else set()
+    todo = [m for m in df_matches['id'] if m not in done]
+    if not todo: return 0
+
+    new = build_lineups(todo, df_matches)
+    if not new.empty:
+        existing = load_frame(_lineup_file(iteration_id))
+        # Idempotent: rijen van deze wedstrijden eerst weg (bv. na een afgebroken vorige run)
+        if existing is not None: existing = existing[~existing['matchId'].isin(set(new['matchId']))]
+        frames = ([existing] if existing is not None else []) + [new]
+        save_frame(pd.concat(frames, ignore_index=True), _lineup_file(iteration_id))
+    # Wedstrijden zonder lineup JSON niet als verwerkt markeren (kan later nog binnenkomen)
+    done |= set(new['matchId'])
+    write_manifest(_manifest_file(iteration_id), {"matches": sorted(done), "version": LINEUP_VERSION})
+    return new['matchId'].nunique()
+
+def refresh_lineups(iteration_ids=None, progress=None):
+    """Alle (of de gegeven) iteraties bijwerken. Geeft het totaal aantal nieuwe wedstrijden terug."""
+    df_m = played_matches(iteration_ids)
+    if df_m.empty: return 0
+    total, groups = 0, list(df_m.groupby('iterationId', sort=False))
+    for i, (it, part) in enumerate(groups):
+        if progress: progress(i, len(groups), it)
+        total += update_lineups(it, part)
+    return total
+
+def lineups_version(iteration_ids):
+    """Som van de bestandsversies; verandert zodra een lineup bestand bijgewerkt wordt."""
+    return sum(file_version(_lineup_file(i)) for i in iteration_ids)
+
+# -----------------------------------------------------------------------------
+# 3. SERVING
+# -----------------------------------------------------------------------------
+@st.cache_resource(max_entries=32)
+def _load_lineups(iteration_id, version):
+    return load_frame(_lineup_file(iteration_id))
+
+def load_lineups(iteration_id):
+    """Alle lineups van een iteratie, of None als ze nog niet opgebouwd zijn."""
+    path = _lineup_file(iteration_id)
+    return _load_lineups(str(iteration_id), file_version(path)) if file_version(path) else None
+
+@st.cache_data(ttl=3600)
+def _single_match(match_id):
+    df_m = run_query('SELECT CAST(id AS TEXT) as id, CAST("homeSquadId" AS TEXT) as "homeSquadId", CAST("awaySquadId" AS TEXT) as "awaySquadId" FROM public.matches WHERE id = %s', params=(str(match_id),))
+    return build_lineups([str(match_id)], df_m) if not df_m.empty else pd.DataFrame(columns=LINEUP_COLS)
+
+def match_lineup(match_id, iteration_id=None):
+    """
+    Lineup van één wedstrijd met spelers- en coachnamen. Uit de store als de wedstrijd
+    al verwerkt is, anders rechtstreeks (bv. een wedstrijd van vandaag).
+    """
+    match_id = str(match_id)
+    df = load_lineups(iteration_id) if iteration_id is not None else None
+    df = df[df['matchId'] == match_id] if df is not None else None
+    if df is None or df.empty: df = _single_match(match_id)
+    if df.empty: return df
+    df = df.copy()
+    p_map = _name_map("public.players", "commonname", df['playerId'].dropna().unique())
+    c_map = _name_map("public.coaches", "name", df['coachId'].dropna().unique())
+    df['name'] = df['playerId'].astype(str).map(p_map).fillna('Onbekend')
+    df['coachName'] = df['coachId'].astype(str).map(c_map).fillna('Onbekend')
+    return df
+
+def player_minutes(iteration_ids):
+    """Per (playerId, iterationId): wedstrijden in de selectie, basisplaatsen en gespeelde minuten."""
+    parts = []
+    for it in iteration_ids:
+        df = load_lineups(it)
+        if df is None or df.empty: continue
+        g = df.groupby('playerId').agg(selecties=('matchId', 'nunique'), basis=('starter', 'sum'), minutes=('minutes', 'sum')).reset_index()
+        g['iterationId'] = str(it)
+        parts.append(g)
+    if not parts: return pd.DataFrame(columns=['playerId', 'iterationId', 'selecties', 'basis', 'minutes'])
+    out = pd.concat(parts, ignore_index=True)
+    out['playerId'] = out['playerId'].astype('int64')
+    return out
@@ -0,0 +1,319 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from event_store import load_events, load_many, team_matches, played_matches, BATCH_SIZE
+
+# -----------------------------------------------------------------------------
+# MATCH EVENT ENGINE (GEVECTORISEERD)
+# -----------------------------------------------------------------------------
+# Alle transformaties op de events van één wedstrijd, zonder apply(axis=1):
+# id-normalisatie, speeltijd -> minuten, opgeschoonde acties/resultaten,
+# herschaling van de coördinaten, de xT-berekening (thuisperspectief) en de
+# opdeling in balbezit-ketens. get_match_events() doet dit één keer per wedstrijd
+# en cachet het resultaat.
+
+EVENT_COLUMNS = [
+    "action", "result", "squadId", "xT_Team_Raw", "xT_Opp_Raw",
+    "periodId", "distanceToOpponent", "pressure", "phase",
+    "Team", "Speler", "PressingSpeler", "TijdString", "Minuut",
+    "x_start", "y_start", "x_end", "y_end"
+]
+
+def normalize_id(val):
+    try:
+        if pd.isna(val) or val == 'nan' or val == 'None': return None
+        return str(int(float(val)))
+    except: return str(val).strip()
+
+def normalize_ids(values):
+    """normalize_id voor een hele kolom: enkel de unieke waarden worden omgezet."""
+    s = pd.Series(values)
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    mapped = np.array([normalize_id(u) for u in uniques] + [None], dtype=object)
+    return pd.Series(mapped[codes], index=s.index, dtype=object)
+
+def gametime_to_minutes(values):
+    """'mm:ss.fff' -> minuten (float); alles wat niet te parsen is wordt 0.0."""
+    s = pd.Series(values, dtype=object)
+    if s.empty: return pd.Series(dtype=float, index=s.index)
+    txt = s.where(s.map(type).eq(str), '').astype(str)
+    parts = txt.str.split('.', n=1).str[0].str.split(':', n=2, expand=True)
+    mins = pd.to_numeric(parts[0].str.strip(), errors='coerce')
+    if parts.shape[1] > 1:
+        secs = pd.to_numeric(parts[1].str.strip(), errors='coerce')
+        has_secs = parts[1].notna()
+        out = np.where(has_secs, mins + secs / 60.0, mins)
+    else:
+        out = mins.to_numpy(dtype=float)
+    return pd.Series(np.nan_to_num(out.astype(float), nan=0.0), index=s.index)
+
+def rescale_coordinates(df):
+    """Bron 0-100 (0 = eigen doellijn) -> meters rond de middenstip (-52.5..52.5 x -34..34)."""
+    if df.empty: return df
+    max_x, min_x = df['x_start'].max(), df['x_start'].min()
+    if max_x > 55 and min_x >= 0:
+        for c in ('x_start', 'x_end'): df[c] = (df[c] - 50) * (105 / 100)
+        for c in ('y_start', 'y_end'): df[c] = (df[c] - 50) * (68 / 100)
+    return df
+
+def _match_boundaries(df):
+    """True op het laatste event van elke wedstrijd (enkel relevant bij meerdere wedstrijden)."""
+    last = np.zeros(len(df), dtype=bool)
+    if len(df): last[-1] = True
+    if 'matchId' in df.columns and len(df) > 1:
+        m = df['matchId'].to_numpy()
+        last[:-1] |= m[1:] != m[:-1]
+    return last
+
+def add_threat_columns(df, home_id_str):
+    """
+    Home_Net_Threat_State: xT-toestand vanuit het perspectief van de thuisploeg.
+    xT_Generated_Player: verschil met het volgende event, terug naar het perspectief van de eigen ploeg.
+    home_id_str mag ook een array zijn (één thuisploeg per event, bij meerdere wedstrijden).
+    """
+    team = df['xT_Team_Raw'].to_numpy(dtype=float)
+    opp = df['xT_Opp_Raw'].to_numpy(dtype=float)
+    is_home = (df['squadId_clean'].to_numpy() == home_id_str) & df['squadId_clean'].notna().to_numpy()
+
+    state = np.where(is_home, team - opp, opp - team)
+    generated = np.empty_like(state)
+    generated[:-1] = state[1:] - state[:-1]
+    generated[_match_boundaries(df)] = np.nan
+
+    df['Home_Net_Threat_State'] = state
+    df['xT_Generated_Raw'] = generated
+    df['xT_Generated_Player'] = np.where(np.isnan(generated), 0.0, np.where(is_home, generated, -generated))
+    return df
+
+# -----------------------------------------------------------------------------
+# BALBEZIT KETENS
+# -----------------------------------------------------------------------------
+# Balbezit = opeenvolgende balacties van dezelfde ploeg binnen dezelfde periode;
+# een schot/goal sluit het balbezit af. Een sequentie is een aaneengesloten stuk
+# spel binnen een balbezit: een mislukte actie die de ploeg toch behoudt of een
+# onderbreking (> SEQUENCE_GAP_SECONDS tussen twee events) start een nieuwe.
+# Coördinaten zijn per ploeg genormaliseerd (aanval richting +x).
+
+NON_BALL_ACTIONS = {'SUBSTITUTION', 'CARD', 'YELLOW_CARD', 'RED_CARD', 'OWN_GOAL', 'NAN', 'NONE', ''}
+POSSESSION_END_ACTIONS = {'SHOT', 'GOAL'}
+SEQUENCE_GAP_SECONDS = 8
+ZONES = ['Eigen derde', 'Middenveld', 'Laatste derde']
+CHAIN_COLUMNS = ['chain_duration', 'chain_events', 'chain_xt', 'chain_start_zone', 'chain_end_zone', 'chain_end_action', 'chain_end_result']
+
+def zone_of(x):
+    """x (meters, aanval richting +x) -> derde van het veld."""
+    codes = np.digitize(np.asarray(x, dtype=float), [-17.5, 17.5])
+    out = np.array(ZONES, dtype=object)[np.minimum(codes, 2)]
+    out[np.isnan(np.asarray(x, dtype=float))] = None
+    return out
+
+def add_possession_columns(df):
+    """possession_id / sequence_id per event (-1 voor events zonder balbezit, bv. wissels)."""
+    n = len(df)
+    pos = np.full(n, -1, dtype='int32'); seq = np.full(n, -1, dtype='int32')
+    ball = ~df['action_clean'].isin(NON_BALL_ACTIONS).to_numpy() & df['squadId_clean'].notna().to_numpy()
+    idx = np.flatnonzero(ball)
+    if len(idx):
+        squad = df['squadId_clean'].to_numpy()[idx]
+        period = df['periodId'].astype(str).to_numpy()[idx]
+        action = df['action_clean'].to_numpy()[idx]
+        ok = df['result_clean'].to_numpy()[idx] == 'SUCCESS'
+        minute = pd.to_numeric(df['Minuut'], errors='coerce').to_numpy(dtype=float)[idx]
+
+        new_pos = np.ones(len(idx), dtype=bool)
+        new_pos[1:] = (squad[1:] != squad[:-1]) | (period[1:] != period[:-1]) | np.isin(action[:-1], list(POSSESSION_END_ACTIONS))
+        if 'matchId' in df.columns:
+            match = df['matchId'].to_numpy()[idx]
+            new_pos[1:] |= match[1:] != match[:-1]
+        gap = np.zeros(len(idx), dtype=bool)
+        gap[1:] = (~ok[:-1]) | (np.abs(minute[1:] - minute[:-1]) * 60 > SEQUENCE_GAP_SECONDS)
+        pos[idx] = np.cumsum(new_pos) - 1
+        seq[idx] = np.cumsum(new_pos | gap) - 1
+    df['possession_id'] = pos; df['sequence_id'] = seq
+    return df
+
+def possession_chains(df):
+    """Eén rij per balbezit: ploeg, periode, start/einde, duur, xT winst, zones en afsluitende actie."""
+    d = df[df['possession_id'] >= 0]
+    if d.empty:
+        return pd.DataFrame(columns=['possession_id', 'squadId', 'Team', 'periodId', 'start', 'end', 'sequences'] + CHAIN_COLUMNS)
+    # xT-toestand vanuit de ploeg aan de bal (= Home_Net_Threat_State voor thuis, gespiegeld voor uit)
+    d = d.assign(_own_state=d['xT_Team_Raw'] - d['xT_Opp_Raw'], _x_last=d['x_end'].fillna(d['x_start']))
+    g = d.groupby('possession_id', sort=True)
+    first, last = g.head(1).set_index('possession_id'), g.tail(1).set_index('possession_id')
+    out = pd.DataFrame({
+        'squadId': first['squadId_clean'], 'Team': first['Team'], 'periodId': first['periodId'],
+        'start': first['Minuut'], 'end': last['Minuut'],
+        'sequences': g['sequence_id'].nunique(),
+        'chain_events': g.size(),
+        'chain_xt': last['_own_state'] - first['_own_state'],
+        'chain_start_zone': zone_of(first['x_start']),
+        'chain_end_zone': zone_of(last['_x_last']),
+        'chain_end_action': last['action_clean'], 'chain_end_result': last['result_clean'],
+    })
+    out['chain_duration'] = ((out['end'] - out['start']) * 60).clip(lower=0)
+    return out.reset_index()
+
+def add_chain_columns(df):
+    """Ketenkenmerken terug op elk event (zodat de pitch map er rechtstreeks op kan filteren)."""
+    chains = possession_chains(df).set_index('possession_id')
+    for c in CHAIN_COLUMNS:
+        df[c] = df['possession_id'].map(chains[c]) if not chains.empty else pd.Series(np.nan, index=df.index, dtype=object)
+    return df
+
+def prepare_events(df_ev, home_squad_id):
+    """
+    Alle afgeleide kolommen in één keer (ook voor een lege wedstrijd, zodat de tabs niet crashen).
+    Voor meerdere wedstrijden tegelijk: df_ev met matchId (gesorteerd per wedstrijd) en
+    home_squad_id als dict {matchId: thuisploeg}.
+    """
+    df = df_ev.copy()
+    if df.empty:
+        for c in EVENT_COLUMNS:
+            if c not in df.columns: df[c] = pd.Series(dtype='object')
+
+    df['action_clean'] = df['action'].astype(str).str.upper().str.strip()
+    df['result_clean'] = df['result'].astype(str).str.upper().str.strip()
+    df['squadId_clean'] = normalize_ids(df['squadId']).to_numpy()
+    df['xT_Team_Raw'] = df['xT_Team_Raw'].fillna(0)
+    df['xT_Opp_Raw'] = df['xT_Opp_Raw'].fillna(0)
+    if 'Minuut' not in df.columns: df['Minuut'] = gametime_to_minutes(df['TijdString'])
+    df = rescale_coordinates(df)
+    if isinstance(home_squad_id, dict):
+        home = df['matchId'].astype(str).map({str(k): normalize_id(v) for k, v in home_squad_id.items()}).to_numpy(dtype=object)
+    else:
+        home = normalize_id(home_squad_id)
+    df = add_threat_columns(df, home)
+    return add_chain_columns(add_possession_columns(df))
+
+# -----------------------------------------------------------------------------
+# MOMENTUM (xT PER MINUUT)
+# -----------------------------------------------------------------------------
+# Gegenereerde xT per ploeg per speelminuut via np.bincount; cumulatief en een
+# rollend venster via cumsum-verschillen. Werkt op de (gecachete) verwerkte events
+# en geeft arrays die per ploeg over wedstrijden heen gemiddeld kunnen worden.
+MOMENTUM_EVENTS = ['GOAL', 'OWN_GOAL', 'SUBSTITUTION', 'RED_CARD']
+
+def minute_xt(df, squad_id, n_minutes=None):
+    """(xT voor, xT tegen) per minuut vanuit squad_id. Lengte = n_minutes of laatste minuut + 1."""
+    minute = np.floor(pd.to_numeric(df['Minuut'], errors='coerce').fillna(0).to_numpy(dtype=float)).astype(int).clip(0)
+    if n_minutes is None: n_minutes = int(minute.max()) + 1 if len(minute) else 1
+    minute = np.minimum(minute, n_minutes - 1)
+    xt = df['xT_Generated_Player'].to_numpy(dtype=float)
+    own = (df['squadId_clean'] == squad_id).to_numpy(dtype=bool)
+    other = df['squadId_clean'].notna().to_numpy() & ~own
+    return (np.bincount(minute[own], weights=xt[own], minlength=n_minutes),
+            np.bincount(minute[other], weights=xt[other], minlength=n_minutes))
+
+def _window_sum(values, window):
+    """Som over de laatste `window` minuten (inclusief de huidige)."""
+    c = np.r_[0.0, np.cumsum(values)]
+    idx = np.arange(1, len(c))
+    return c[idx] - c[np.maximum(idx - window, 0)]
+
+def momentum(df, home_id_str, window=5):
+    """Per minuut: xT thuis/uit, netto, cumulatief en rollend (thuisperspectief)."""
+    home, away = minute_xt(df, home_id_str)
+    net = home - away
+    return pd.DataFrame({
+        'Minuut': np.arange(len(net)), 'xT Thuis': home, 'xT Uit': away, 'Netto': net,
+        'Cum. Thuis': np.cumsum(home), 'Cum. Uit': np.cumsum(away), 'Cum. Netto': np.cumsum(net),
+        'Rollend Netto': _window_sum(net, window),
+    })
+
+def momentum_swings(df, home_id_str, window=5):
+    """Netto xT (thuisperspectief) in de `window` minuten voor en na goals, wissels en rode kaarten."""
+    mom = momentum(df, home_id_str, window=1)
+    ev = df[df['action_clean'].isin(MOMENTUM_EVENTS)]
+    if ev.empty or mom.empty: return pd.DataFrame(columns=['Minuut', 'Team', 'Speler', 'Actie', 'Voor', 'Na', 'Swing'])
+    cum = np.r_[0.0, mom['Cum. Netto'].to_numpy()]
+    last = len(cum) - 1
+    m = np.clip(np.floor(pd.to_numeric(ev['Minuut'], errors='coerce').fillna(0).to_numpy(dtype=float)).astype(int), 0, last)
+    before = cum[m] - cum[np.maximum(m - window, 0)]
+    after = cum[np.minimum(m + window, last)] - cum[m]
+    return pd.DataFrame({
+        'Minuut': ev['Minuut'].to_numpy(), 'Team': ev['Team'].to_numpy(), 'Speler': ev['Speler'].to_numpy(),
+        'Actie': ev['action_clean'].to_numpy(), 'Voor': before, 'Na': after, 'Swing': after - before,
+    })
+
+def average_momentum(profiles, window=5):
+    """Lijst (voor, tegen) per wedstrijd -> gemiddelde netto xT per minuut (+ rollend) over die wedstrijden."""
+    if not profiles: return pd.DataFrame(columns=['Minuut', 'xT Voor', 'xT Tegen', 'Netto', 'Rollend Netto'])
+    n = max(len(f) for f, _ in profiles)
+    pad = lambda a: np.pad(a, (0, n - len(a)))
+    f = np.mean([pad(a) for a, _ in profiles], axis=0); a = np.mean([pad(b) for _, b in profiles], axis=0)
+    return pd.DataFrame({'Minuut': np.arange(n), 'xT Voor': f, 'xT Tegen': a, 'Netto': f - a, 'Rollend Netto': _window_sum(f - a, window)})
+
+# -----------------------------------------------------------------------------
+# DATA OPHALEN
+# -----------------------------------------------------------------------------
+@st.cache_data(ttl=3600, max_entries=64)
+def get_match_events(match_id, home_squad_id, persist=True):
+    """
+    Events van een wedstrijd, volledig verwerkt. De ruwe events komen uit de lokale
+    event store (eenmalig uit Postgres gematerialiseerd); verwerking één keer per wedstrijd.
+    """
+    return prepare_events(load_events(match_id, persist=persist), home_squad_id)
+
+@st.cache_data(ttl=3600, max_entries=64)
+def get_match_chains(match_id, home_squad_id, persist=True):
+    """Balbezit ketens van een wedstrijd (één rij per balbezit), gecachet naast de events."""
+    return possession_chains(get_match_events(match_id, home_squad_id, persist=persist))
+
+@st.cache_data(ttl=3600, max_entries=64)
+def get_match_momentum(match_id, home_squad_id, persist=True, window=5):
+    """(momentum per minuut, swings rond sleutelmomenten) van een wedstrijd, gecachet."""
+    df = get_match_events(match_id, home_squad_id, persist=persist)
+    home = normalize_id(home_squad_id)
+    return momentum(df, home, window), momentum_swings(df, home, window)
+
+# -----------------------------------------------------------------------------
+# TEAM-SEIZOEN
+# -----------------------------------------------------------------------------
+@st.cache_data(ttl=600)
+def get_team_matches(iteration_id, squad_id):
+    """Gespeelde wedstrijden van een ploeg in een iteratie (kort gecachet: nieuwe wedstrijden komen vanzelf mee)."""
+    return team_matches(iteration_id, squad_id)
+
+@st.cache_data(ttl=3600, max_entries=8)
+def get_team_events(match_ids, home_ids):
+    """
+    Alle events van een reeks wedstrijden in één frame, verwerkt in één keer (met matchId).
+    Cache-sleutel = de wedstrijdlijst: een nieuwe wedstrijd geeft een nieuwe sleutel en enkel
+    die wedstrijd wordt uit Postgres gematerialiseerd, de rest komt uit de event store.
+    """
+    df = load_many(match_ids)
+    if df.empty: return prepare_events(df, None)
+    return prepare_events(df, dict(zip(match_ids, home_ids)))
+
+# -----------------------------------------------------------------------------
+# SEIZOENSBLOKKEN (INCREMENTEEL, ÉÉN LEESPAS)
+# -----------------------------------------------------------------------------
+def update_season_blocks(iteration_id, blocks, progress=None):
+    """
+    Werkt seizoensblokken bij met één lees- en verwerkpas. blocks = [(verwerkt, toevoegen), ...]:
+    verwerkt(iteratie) -> set matchIds, toevoegen(iteratie, {matchId: events}) -> aantal.
+    Per batch worden de wedstrijden die in minstens één blok ontbreken één keer geladen
+    (load_many) en verwerkt (prepare_events); elk blok krijgt enkel wat het nog mist.
+    Geeft per blok het aantal nieuw verwerkte wedstrijden terug.
+    """
+    iteration_id = str(iteration_id)
+    counts = [0] * len(blocks)
+    df_m = played_matches([iteration_id])
+    if df_m.empty: return counts
+    ids = df_m['id'].astype(str)
+    missing = [set(ids) - set(done(iteration_id)) for done, _ in blocks]
+    todo = df_m[ids.isin(set().union(*missing))]
+
+    for start in range(0, len(todo), BATCH_SIZE):
+        if progress: progress(start, len(todo))
+        batch = todo.iloc[start:start + BATCH_SIZE]
+        batch_ids = batch['id'].astype(str).tolist()
+        events = load_many(batch_ids)
+        if events.empty: continue
+        events = prepare_events(events, dict(zip(batch_ids, batch['homeSquadId'])))
+        per_match = {m: g.reset_index(drop=True) for m, g in events.groupby('matchId', sort=False)}
+        for k, (_, add) in enumerate(blocks):
+            new = {m: per_match[m] for m in batch_ids if m in per_match and m in missing[k]}
+            if new: counts[k] += add(iteration_id, new)
+    return counts
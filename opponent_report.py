@@ -0,0 +1,226 @@
+import html
+import numpy as np
+import pandas as pd
+import streamlit as st
+from store import store_path, save_frame, load_frame, save_arrays, load_arrays, read_manifest, write_manifest, file_version
+from event_store import load_many, _name_map
+from match_engine import prepare_events
+from lineups import load_lineups, build_lineups, LINEUP_COLS
+from pressing import match_pressing, summarise_pressing, PRESS_COLS
+from zone_grids import _entity_rows, grids_from_rows, grid_values, zone_figure, ACTION_GROUPS, GRID_X, GRID_Y
+
+# -----------------------------------------------------------------------------
+# TEGENSTANDER RAPPORT (LAATSTE N WEDSTRIJDEN)
+# -----------------------------------------------------------------------------
+# Per (iteratie, ploeg) wordt elke gespeelde wedstrijd één keer herleid tot kleine
+# blokken: opstelling, spelers (acties/xT), standaardsituaties, pressing en een
+# zonerooster. Nieuwe wedstrijden worden in bulk geladen (load_many + één
+# prepare_events) en enkel toegevoegd. Het rapport zelf is een som over de blokken
+# van de gekozen wedstrijden en kan als HTML geëxporteerd worden.
+# Bestanden: opponent_reports/<iteratie>/<ploeg>/{blok}.feather, zones.npz, manifest.json
+
+SET_PIECES = ['CORNER', 'FREE_KICK', 'THROW_IN', 'PENALTY', 'GOAL_KICK']
+BLOCKS = ['lineups', 'players', 'set_pieces', 'pressing']
+# Startposities -> linie (vleugelspelers worden bij het opstellen van de formatie verdeeld)
+DEF_POS = {'CENTRAL_DEFENDER', 'LEFT_WINGBACK_DEFENDER', 'RIGHT_WINGBACK_DEFENDER'}
+MID_POS = {'DEFENSE_MIDFIELD', 'CENTRAL_MIDFIELD'}
+WING_POS = {'LEFT_WINGER', 'RIGHT_WINGER'}
+
+def _files(iteration_id, squad_id):
+    base = ("opponent_reports", str(iteration_id), str(squad_id))
+    files = {b: store_path(*base, f"{b}.feather") for b in BLOCKS}
+    files['zones'] = store_path(*base, "zones.npz")
+    files['manifest'] = store_path(*base, "manifest.json")
+    return files
+
+# -----------------------------------------------------------------------------
+# 1. PER WEDSTRIJD
+# -----------------------------------------------------------------------------
+def set_piece_type(df):
+    """Type standaardsituatie per event (uit action/actionType), '' voor open spel."""
+    text = df['action'].astype(str).str.upper()
+    if 'actionType' in df.columns: text = text + ' ' + df['actionType'].astype(str).str.upper()
+    return np.select([text.str.contains(s, regex=False) for s in SET_PIECES], SET_PIECES, default='')
+
+def formation(positions):
+    """Startposities van één wedstrijd -> formatie zoals '4-2-3-1' (zonder doelman)."""
+    pos = pd.Series(positions, dtype=object)
+    d, m = pos.isin(DEF_POS).sum(), pos.isin(MID_POS).sum()
+    am, w, f = (pos == 'ATTACKING_MIDFIELD').sum(), pos.isin(WING_POS).sum(), (pos == 'CENTER_FORWARD').sum()
+    # vleugels horen bij de lijn achter de spits(en): met een 10 erbij, anders bij één spits, anders op het middenveld
+    if am: lines = [d, m, am + w, f]
+    elif f == 1: lines = [d, m, w + f]
+    else: lines = [d, m + w, f]
+    lines = [int(n) for n in lines if n]
+    return '-'.join(map(str, lines)) if sum(lines) == 10 else 'Onbekend'
+
+def match_blocks(df, squad_id, match_id):
+    """Verwerkte events van één wedstrijd -> (blokken zonder opstelling, zonerooster (groepen x Y x X))."""
+    sq, match_id = str(squad_id), str(match_id)
+    own = (df['squadId_clean'] == sq).to_numpy()
+    d = df[own]
+
+    known = d[d['Speler'].astype(str) != 'Onbekend']
+    pid = pd.to_numeric(known['player_id_raw'], errors='coerce').astype('Int64').astype(str)
+    players = known.assign(playerId=pid.to_numpy()).groupby(['playerId', 'Speler'], observed=True) \
+        .agg(acties=('action_clean', 'size'), xt=('xT_Generated_Player', 'sum')).reset_index()
+
+    sp = d.assign(type=set_piece_type(d), schot=d['chain_end_action'].isin(['SHOT', 'GOAL']).to_numpy())
+    sp = sp[sp['type'] != '']
+    set_pieces = sp.groupby('type').agg(n=('type', 'size'), schoten=('schot', 'sum'), xt=('xT_Generated_Player', 'sum')).reset_index()
+
+    press = match_pressing(df, match_id)
+    press = press[press['squadId'] == sq]
+
+    rows = _entity_rows(df)
+    rows = rows[(rows['level'] == 'team') & (rows['entity'] == sq)].assign(level='match', entity=match_id)
+    counts, success, xt = grids_from_rows(rows, [('match', match_id)])
+
+    for b in (players, set_pieces): b['matchId'] = match_id
+    players['acties'] = players['acties'].astype('int32'); players['xt'] = players['xt'].astype('float32')
+    set_pieces['n'] = set_pieces['n'].astype('int32'); set_pieces['schoten'] = set_pieces['schoten'].astype('int32')
+    set_pieces['xt'] = set_pieces['xt'].astype('float32')
+    blocks = {'players': players, 'set_pieces': set_pieces, 'pressing': press}
+    return blocks, (counts[0], success[0], xt[0])
+
+def _match_lineups(iteration_id, squad_id, df_matches):
+    """Opstellingen van de ploeg uit de lineup store, ontbrekende wedstrijden rechtstreeks (in batch)."""
+    ids = df_matches['id'].astype(str).tolist()
+    stored = load_lineups(iteration_id)
+    parts = [stored[stored['matchId'].isin(ids)]] if stored is not None else []
+    missing = [m for m in ids if not parts or m not in set(parts[0]['matchId'])]
+    if missing: parts.append(build_lineups(missing, df_matches))
+    df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=LINEUP_COLS)
+    return df[df['squadId'] == int(squad_id)]
+
+# -----------------------------------------------------------------------------
+# 2. OPBOUWEN (INCREMENTEEL)
+# -----------------------------------------------------------------------------
+def update_report(iteration_id, squad_id, df_matches, progress=None):
+    """
+    Voegt de blokken van nog niet verwerkte wedstrijden (df_matches: id, homeSquadId)
+    toe. Events van alle nieuwe wedstrijden in één keer. Geeft het aantal nieuwe wedstrijden terug.
+    """
+    files = _files(iteration_id, squad_id)
+    done = set(read_manifest(files['manifest']).get("matches", []))
+    todo = df_matches[~df_matches['id'].astype(str).isin(done)]
+    if todo.empty: return 0
+
+    ids = todo['id'].astype(str).tolist()
+    events = load_many(ids, progress=progress)
+    if events.empty: return 0
+    events = prepare_events(events, dict(zip(ids, todo['homeSquadId'].astype(str))))
+
+    new = {b: [] for b in BLOCKS}
+    zone_ids, zones = [], []
+    for match_id, g in events.groupby('matchId', sort=False):
+        blocks, grid = match_blocks(g, squad_id, match_id)
+        for b, frame in blocks.items(): new[b].append(frame)
+        zone_ids.append(match_id); zones.append(grid)
+    if not zone_ids: return 0
+    new['lineups'].append(_match_lineups(iteration_id, squad_id, todo[todo['id'].astype(str).isin(zone_ids)]))
+
+    # wedstrijden die al (deels) weggeschreven waren, bv. na een onderbroken run, worden vervangen
+    for b in BLOCKS:
+        existing = load_frame(files[b])
+        if existing is not None: existing = existing[~existing['matchId'].astype(str).isin(zone_ids)]
+        save_frame(pd.concat(([existing] if existing is not None else []) + new[b], ignore_index=True), files[b])
+    old = load_arrays(files['zones'])
+    stacked = [np.stack([z[k] for z in zones]) for k in range(3)]
+    if old:
+        keep = ~np.isin(old['matches'].astype(str), zone_ids)
+        stacked = [np.concatenate([old[name][keep], arr]) for name, arr in zip(['counts', 'success', 'xt'], stacked)]
+    match_ids = np.concatenate([old['matches'][keep], zone_ids]) if old else np.array(zone_ids)
+    save_arrays(files['zones'], matches=match_ids, counts=stacked[0], success=stacked[1], xt=stacked[2])
+    write_manifest(files['manifest'], {"matches": sorted(done | set(zone_ids))})
+    return len(zone_ids)
+
+def report_version(iteration_id, squad_id):
+    return file_version(_files(iteration_id, squad_id)['manifest'])
+
+# -----------------------------------------------------------------------------
+# 3. RAPPORT
+# -----------------------------------------------------------------------------
+@st.cache_resource(max_entries=16)
+def _load_blocks(iteration_id, squad_id, version):
+    files = _files(iteration_id, squad_id)
+    blocks = {b: load_frame(files[b]) for b in BLOCKS}
+    blocks['zones'] = load_arrays(files['zones'])
+    return blocks
+
+def _starting_xi(lu, n_matches):
+    starters = lu[lu['starter']]
+    xi = lu.groupby('playerId').agg(Basis=('starter', 'sum'), Selecties=('matchId', 'nunique'), Minuten=('minutes', 'sum')).reset_index()
+    pos = starters.groupby('playerId')['position'].agg(lambda s: s.value_counts().index[0])
+    xi['Positie'] = xi['playerId'].map(pos).fillna('Bank')
+    names = _name_map("public.players", "commonname", xi['playerId'].dropna().unique())
+    xi['Speler'] = xi['playerId'].astype(str).map(names).fillna('Onbekend')
+    xi['Basis %'] = xi['Basis'] / max(n_matches, 1) * 100
+    return xi.sort_values(['Basis', 'Minuten'], ascending=False)[['Speler', 'Positie', 'Basis', 'Basis %', 'Selecties', 'Minuten']]
+
+@st.cache_data(ttl=3600, max_entries=16)
+def opponent_report(iteration_id, squad_id, match_ids, version):
+    """
+    Rapport over de gegeven (al verwerkte) wedstrijden: dict met formaties, basiself,
+    top xT, standaardsituaties, pressing (ploeg/spelers) en het opgetelde zonerooster.
+    `version` = report_version(): een nieuwe wedstrijd geeft een nieuwe cache-sleutel.
+    """
+    blocks = _load_blocks(str(iteration_id), str(squad_id), version)
+    ids = set(map(str, match_ids))
+    sel = {b: blocks[b][blocks[b]['matchId'].isin(ids)] if blocks[b] is not None else pd.DataFrame() for b in BLOCKS}
+    n = len(ids)
+
+    lu = sel['lineups'] if not sel['lineups'].empty else pd.DataFrame(columns=LINEUP_COLS)
+    forms = lu[lu['starter'] & (lu['position'] != 'GOALKEEPER')].groupby('matchId')['position'].agg(formation)
+    formations = forms.value_counts().rename_axis('Formatie').reset_index(name='Wedstrijden')
+    formations['%'] = formations['Wedstrijden'] / max(len(forms), 1) * 100
+
+    pl = sel['players']
+    xt = pl.groupby('playerId').agg(Speler=('Speler', 'last'), Wedstrijden=('matchId', 'nunique'), Acties=('acties', 'sum'), xT=('xt', 'sum')).reset_index() \
+        if not pl.empty else pd.DataFrame(columns=['playerId', 'Speler', 'Wedstrijden', 'Acties', 'xT'])
+    xt['xT per Wedstrijd'] = xt['xT'] / xt['Wedstrijden'].clip(lower=1)
+    xt = xt.sort_values('xT', ascending=False).drop(columns='playerId')
+
+    sp = sel['set_pieces']
+    set_pieces = sp.groupby('type').agg(Aantal=('n', 'sum'), Schoten=('schoten', 'sum'), xT=('xt', 'sum')) \
+        .reindex(SET_PIECES, fill_value=0).rename_axis('Type').reset_index() if not sp.empty \
+        else pd.DataFrame({'Type': SET_PIECES, 'Aantal': 0, 'Schoten': 0, 'xT': 0.0})
+    set_pieces['Per Wedstrijd'] = set_pieces['Aantal'] / max(n, 1)
+    set_pieces['Eindigt in Schot %'] = set_pieces['Schoten'] / set_pieces['Aantal'].clip(lower=1) * 100
+
+    press = sel['pressing'] if not sel['pressing'].empty else pd.DataFrame(columns=PRESS_COLS)
+    z = blocks['zones']
+    zi = np.flatnonzero(np.isin(z['matches'], list(ids))) if z else np.array([], dtype=int)
+    grid = {'groups': ACTION_GROUPS, **{k: z[k][zi].sum(axis=0) if z else np.zeros((len(ACTION_GROUPS), GRID_Y, GRID_X), dtype='float32')
+                                        for k in ('counts', 'success', 'xt')}}
+
+    return {
+        'n_matches': n, 'formations': formations, 'starting_xi': _starting_xi(lu, n), 'xt': xt,
+        'set_pieces': set_pieces, 'pressing_team': summarise_pressing(press, 'team').drop(columns='entityId', errors='ignore'),
+        'pressing_players': summarise_pressing(press, 'player').drop(columns='entityId', errors='ignore'), 'zones': grid,
+    }
+
+# -----------------------------------------------------------------------------
+# 4. EXPORT
+# -----------------------------------------------------------------------------
+ZONE_VIEWS = [("Passes", ['PASS'], 'Acties'), ("Schoten", ['SHOT'], 'Acties'),
+              ("Verdedigende acties", ['DEFENSIVE'], 'Acties'), ("xT (alle acties)", ACTION_GROUPS, 'xT')]
+
+def report_html(report, team_name, subtitle=""):
+    """Volledig rapport als één zelfstandig HTML bestand (tabellen + zoneheatmaps, plotly.js ingebed)."""
+    fmt = lambda df: df.to_html(index=False, float_format=lambda v: f"{v:.2f}", border=0, classes="tbl")
+    team_name, subtitle = html.escape(str(team_name)), html.escape(str(subtitle))
+    parts = [f"<h1>{team_name}</h1><p>{subtitle} · {report['n_matches']} wedstrijden</p>",
+             "<h2>Formaties</h2>", fmt(report['formations']),
+             "<h2>Basiself</h2>", fmt(report['starting_xi']),
+             "<h2>Top xT</h2>", fmt(report['xt'].head(15)),
+             "<h2>Standaardsituaties</h2>", fmt(report['set_pieces']),
+             "<h2>Pressing</h2>", fmt(report['pressing_team']), fmt(report['pressing_players'].head(10)),
+             "<h2>Zones</h2>"]
+    for i, (title, groups, metric) in enumerate(ZONE_VIEWS):
+        fig = zone_figure(grid_values(report['zones'], groups, metric), metric, height=380)
+        fig.update_layout(title=title)
+        parts.append(fig.to_html(full_html=False, include_plotlyjs=(i == 0)))
+    style = "<style>body{font-family:sans-serif;margin:24px} .tbl{border-collapse:collapse;font-size:12px;margin-bottom:12px}" \
+            " .tbl th,.tbl td{padding:3px 8px;border-bottom:1px solid #ddd;text-align:left} h2{color:#d71920}</style>"
+    return f"<html><head><meta charset='utf-8'><title>{team_name}</title>{style}</head><body>{''.join(parts)}</body></html>"
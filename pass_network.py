@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+import plotly.graph_objects as go
+from store import store_path, save_frame, load_frame, read_manifest, write_manifest, file_version
+from match_engine import get_match_events, update_season_blocks
+from pitch import add_pitch, pitch_layout, segment_arrays
+
+# -----------------------------------------------------------------------------
+# PASSNETWERKEN
+# -----------------------------------------------------------------------------
+# Ontvanger van een geslaagde pass = speler van het volgende event (op index) als
+# dat event van dezelfde ploeg in dezelfde periode is. Alles met verschoven arrays.
+# Per wedstrijd:  edges  squadId, Team, passer, receiver, Passer, Ontvanger, n, xt
+#                 nodes  squadId, Team, playerId, Speler, n, sx, sy   (som van x/y -> gemiddelde positie)
+# Per iteratie worden de blokken van elke wedstrijd één keer toegevoegd (incrementeel).
+
+EDGE_COLS = ['matchId', 'squadId', 'Team', 'passer', 'receiver', 'Passer', 'Ontvanger', 'n', 'xt']
+NODE_COLS = ['matchId', 'squadId', 'Team', 'playerId', 'Speler', 'n', 'sx', 'sy']
+
+def _files(iteration_id):
+    base = ("pass_networks", str(iteration_id))
+    return store_path(*base, "edges.feather"), store_path(*base, "nodes.feather"), store_path(*base, "manifest.json")
+
+# -----------------------------------------------------------------------------
+# 1. PER WEDSTRIJD
+# -----------------------------------------------------------------------------
+def pass_links(df):
+    """Eén rij per geslaagde pass met gekende ontvanger (passer, receiver, ploeg, xT)."""
+    if df.empty: return pd.DataFrame(columns=['squadId', 'Team', 'passer', 'receiver', 'Passer', 'Ontvanger', 'xt'])
+    squad = df['squadId_clean'].to_numpy()
+    period = df['periodId'].astype(str).to_numpy()
+    player = df['player_id_raw'].astype(str).to_numpy()
+    name = df['Speler'].astype(str).to_numpy()
+
+    nxt = np.r_[np.arange(1, len(df)), len(df) - 1]
+    is_pass = df['action_clean'].str.contains('PASS', na=False).to_numpy() & (df['result_clean'] == 'SUCCESS').to_numpy()
+    valid = is_pass & (np.arange(len(df)) < len(df) - 1) & (squad[nxt] == squad) & (period[nxt] == period) \
+        & (name != 'Onbekend') & (name[nxt] != 'Onbekend') & (player[nxt] != player)
+    i = np.flatnonzero(valid)
+    return pd.DataFrame({
+        'squadId': squad[i], 'Team': df['Team'].astype(str).to_numpy()[i],
+        'passer': player[i], 'receiver': player[nxt[i]], 'Passer': name[i], 'Ontvanger': name[nxt[i]],
+        'xt': df['xT_Generated_Player'].to_numpy(dtype=float)[i],
+    })
+
+def match_network(df, match_id=None):
+    """Verwerkte events -> (edges, nodes) van beide ploegen."""
+    links = pass_links(df)
+    edges = links.groupby(['squadId', 'Team', 'passer', 'receiver', 'Passer', 'Ontvanger'], observed=True) \
+        .agg(n=('xt', 'size'), xt=('xt', 'sum')).reset_index()
+
+    known = df[df['Speler'].astype(str) != 'Onbekend']
+    nodes = pd.DataFrame({
+        'squadId': known['squadId_clean'], 'Team': known['Team'].astype(str),
+        'playerId': known['player_id_raw'].astype(str), 'Speler': known['Speler'].astype(str),
+        'x': known['x_start'].astype(float), 'y': known['y_start'].astype(float),
+    }).dropna(subset=['x', 'y'])
+    nodes = nodes.groupby(['squadId', 'Team', 'playerId', 'Speler'], observed=True) \
+        .agg(n=('x', 'size'), sx=('x', 'sum'), sy=('y', 'sum')).reset_index()
+
+    for d in (edges, nodes): d['matchId'] = str(match_id)
+    edges['n'] = edges['n'].astype('int32'); edges['xt'] = edges['xt'].astype('float32')
+    nodes['n'] = nodes['n'].astype('int32')
+    return edges[EDGE_COLS], nodes[NODE_COLS]
+
+@st.cache_data(ttl=3600, max_entries=64)
+def get_match_network(match_id, home_squad_id, persist=True):
+    """Passnetwerk van één wedstrijd, gecachet per wedstrijd."""
+    return match_network(get_match_events(match_id, home_squad_id, persist=persist), match_id)
+
+# -----------------------------------------------------------------------------
+# 2. SEIZOEN (INCREMENTEEL)
+# -----------------------------------------------------------------------------
+def network_processed(iteration_id):
+    """matchIds die al in de seizoensnetwerken zitten."""
+    return set(read_manifest(_files(iteration_id)[2]).get("matches", []))
+
+def add_network_matches(iteration_id, prepared):
+    """Voegt de netwerken van verwerkte events ({matchId: events}) toe. Geeft het aantal wedstrijden terug."""
+    f_edges, f_nodes, f_manifest = _files(iteration_id)
+    new_edges, new_nodes = [], []
+    for m, df in prepared.items():
+        e, n = match_network(df, m)
+        new_edges.append(e); new_nodes.append(n)
+    for path, new in ((f_edges, new_edges), (f_nodes, new_nodes)):
+        existing = load_frame(path)
+        if existing is not None:   # herverwerkte wedstrijden vervangen, niet dubbel tellen
+            existing = existing[~existing['matchId'].astype(str).isin({str(m) for m in prepared})]
+        save_frame(pd.concat(([existing] if existing is not None else []) + new, ignore_index=True), path)
+    write_manifest(f_manifest, {"matches": sorted(network_processed(iteration_id) | set(prepared))})
+    return len(new_edges)
+
+def update_season_network(iteration_id, progress=None):
+    """Voegt de netwerken van nieuwe gespeelde wedstrijden toe. Geeft het aantal nieuwe wedstrijden terug."""
+    return update_season_blocks(iteration_id, [(network_processed, add_network_matches)], progress)[0]
+
+@st.cache_resource(max_entries=16)
+def _load(path, version):
+    return load_frame(path)
+
+def season_network(iteration_id, squad_id):
+    """Seizoensnetwerk van één ploeg: (edges, nodes, aantal wedstrijden) of (None, None, 0)."""
+    f_edges, f_nodes, _ = _files(iteration_id)
+    if not file_version(f_edges) or not file_version(f_nodes): return None, None, 0
+    edges, nodes = _load(f_edges, file_version(f_edges)), _load(f_nodes, file_version(f_nodes))
+    edges, nodes = edges[edges['squadId'] == str(squad_id)], nodes[nodes['squadId'] == str(squad_id)]
+    n_matches = nodes['matchId'].nunique()
+    edges = edges.groupby(['squadId', 'Team', 'passer', 'receiver'], observed=True) \
+        .agg(Passer=('Passer', 'last'), Ontvanger=('Ontvanger', 'last'), n=('n', 'sum'), xt=('xt', 'sum')).reset_index()
+    nodes = nodes.groupby(['squadId', 'playerId'], observed=True) \
+        .agg(Team=('Team', 'last'), Speler=('Speler', 'last'), n=('n', 'sum'), sx=('sx', 'sum'), sy=('sy', 'sum')).reset_index()
+    return edges, nodes, n_matches
+
+# -----------------------------------------------------------------------------
+# 3. FIGUUR
+# -----------------------------------------------------------------------------
+def network_figure(edges, nodes, color, min_passes=1, top_players=14):
+    """Passnetwerk op het veld: lijndikte = aantal passes, node grootte = aantal acties."""
+    nodes = nodes.assign(x=nodes['sx'] / nodes['n'].clip(lower=1), y=nodes['sy'] / nodes['n'].clip(lower=1))
+    nodes = nodes.nlargest(top_players, 'n')
+    pos = nodes.set_index('playerId')[['x', 'y']]
+    edges = edges[(edges['n'] >= min_passes) & edges['passer'].isin(pos.index) & edges['receiver'].isin(pos.index)]
+
+    fig = add_pitch(go.Figure())
+    if not edges.empty:
+        p, r = pos.loc[edges['passer']].to_numpy(), pos.loc[edges['receiver']].to_numpy()
+        # lijndikte per kwartiel: één Scattergl trace per dikte
+        bucket = np.minimum((edges['n'].rank(pct=True).to_numpy() * 4).astype(int), 3)
+        for b in range(4):
+            sel = bucket == b
+            if not sel.any(): continue
+            xs, ys = segment_arrays(p[sel, 0], p[sel, 1], r[sel, 0], r[sel, 1])
+            fig.add_trace(go.Scattergl(x=xs, y=ys, mode='lines', line=dict(color=color, width=1 + 2 * b),
+                                       opacity=0.35 + 0.15 * b, showlegend=False, hoverinfo='skip'))
+        mid = (p + r) / 2
+        fig.add_trace(go.Scatter(x=mid[:, 0], y=mid[:, 1], mode='markers', marker=dict(size=6, opacity=0), showlegend=False,
+                                 text=edges['Passer'] + " → " + edges['Ontvanger'],
+                                 customdata=edges[['n', 'xt']].to_numpy(),
+                                 hovertemplate="%{text}<br>Passes: %{customdata[0]}<br>xT: %{customdata[1]:.3f}<extra></extra>"))
+
+    size = 12 + 28 * nodes['n'] / max(nodes['n'].max(), 1)
+    fig.add_trace(go.Scatter(x=nodes['x'], y=nodes['y'], mode='markers+text', text=nodes['Speler'], textposition='top center',
+                             marker=dict(size=size, color=color, line=dict(width=2, color='white')), showlegend=False,
+                             customdata=nodes['n'], hovertemplate="%{text}<br>Acties: %{customdata}<extra></extra>"))
+    return pitch_layout(fig)
@@ -0,0 +1,226 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils import run_uncached_query, KVK_PROFILES
+from store import store_path, save_arrays, load_arrays, read_manifest, write_manifest, file_version
+
+# -----------------------------------------------------------------------------
+# PERCENTIEL CUBE: iteratie x positie x (metriek | KPI | KVK profiel)
+# -----------------------------------------------------------------------------
+# Per iteratie één .npz bestand met:
+#   player_ids  (int64, n_spelers)        positions (str, n_posities)
+#   pos_codes   (int16, n_spelers)        items     (str, n_items)
+#   pct         (uint8, n_spelers x n_items, 255 = geen score)
+#   means       (float32, n_posities x n_items)
+# Item sleutels: KVK kolomnaam (bv. 'cb_kvk_score'), 'm<metric_id>' of 'k<kpi_id>'.
+
+MISSING = 255
+MANIFEST = store_path("percentiles", "manifest.json")
+BUILD_VERSION = 2   # ophogen als de cube berekening verandert -> alle iteraties opnieuw
+
+def metric_item(metric_id): return f"m{metric_id}"
+def kpi_item(kpi_id): return f"k{kpi_id}"
+
+def _cube_path(iteration_id):
+    return store_path("percentiles", f"cube_{iteration_id}.npz")
+
+# -----------------------------------------------------------------------------
+# 1. VECTORISED RANKING
+# -----------------------------------------------------------------------------
+def percentile_ranks(values, group_codes):
+    """
+    Percentiel (0-100) per kolom binnen elke groep, met gemiddelde rang bij gelijke scores.
+    values: float array (n, m) met NaN voor ontbrekend; group_codes: int array (n,).
+    Alles gebeurt in één sort: elke (kolom, groep) krijgt een eigen 'band' in de sleutel.
+    """
+    n, m = values.shape
+    valid = ~np.isnan(values)
+    if not valid.any(): return np.full((n, m), np.nan)
+
+    lo, hi = np.nanmin(values), np.nanmax(values)
+    band = (hi - lo) + 1.0
+    n_groups = int(group_codes.max()) + 1 if n else 1
+
+    block = np.arange(m)[None, :] * n_groups + group_codes[:, None]      # (n, m)
+    keys = block * band + (values - lo)
+    flat_keys = keys[valid]
+    flat_block = block[valid]
+
+    sorted_keys = np.sort(flat_keys)
+    below_total = np.searchsorted(sorted_keys, flat_keys, side='left')
+    equal = np.searchsorted(sorted_keys, flat_keys, side='right') - below_total
+
+    counts = np.bincount(flat_block, minlength=m * n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    below = below_total - starts[flat_block]
+    n_valid = counts[flat_block]
+
+    rank = below + (equal - 1) / 2.0
+    pct_flat = np.where(n_valid > 1, rank / np.maximum(n_valid - 1, 1) * 100.0, 100.0)
+
+    out = np.full((n, m), np.nan)
+    out[valid] = pct_flat
+    return out
+
+def group_means(values, group_codes, n_groups):
+    """Gemiddelde per groep en kolom (NaN-bewust), via bincount i.p.v. een groupby loop."""
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    sums = np.zeros((n_groups, values.shape[1]))
+    cnts = np.zeros((n_groups, values.shape[1]))
+    np.add.at(sums, group_codes, filled)
+    np.add.at(cnts, group_codes, valid)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(cnts > 0, sums / cnts, np.nan)
+
+# -----------------------------------------------------------------------------
+# 2. BUILDER (BATCH)
+# -----------------------------------------------------------------------------
+def _long_to_matrix(df, row_index, prefix):
+    """Long (playerId, metric_id, score) -> matrix (n_spelers x n_items) zonder pivot_table."""
+    if df.empty: return np.empty((len(row_index), 0)), []
+    df = df[df['playerId'].isin(row_index.index)]
+    items, item_codes = np.unique(df['metric_id'].astype(str).to_numpy(), return_inverse=True)
+    mat = np.full((len(row_index), len(items)), np.nan)
+    mat[row_index.loc[df['playerId']].to_numpy(), item_codes] = df['score'].astype(float).to_numpy()
+    return mat, [f"{prefix}{i}" for i in items]
+
+def build_cube(iteration_id):
+    """Bouwt de cube voor één iteratie en schrijft ze weg. Geeft het aantal spelers terug."""
+    iteration_id = str(iteration_id)
+    kvk_cols = ", ".join(f'"{c}"' for c in KVK_PROFILES)
+    df_base = run_uncached_query(f"""
+        SELECT "playerId", position, {kvk_cols}
+        FROM analysis.final_impect_scores WHERE "iterationId" = %s
+    """, params=(iteration_id,))
+    if df_base.empty: return 0
+
+    df_base = df_base.drop_duplicates(subset=['playerId'])
+    df_base['playerId'] = df_base['playerId'].astype('int64')
+    row_index = pd.Series(np.arange(len(df_base)), index=df_base['playerId'].to_numpy())
+
+    df_met = run_uncached_query("""
+        SELECT "playerId", CAST(metric_id AS TEXT) as metric_id, final_score_1_to_100 as score
+        FROM analysis.player_final_scores WHERE "iterationId" = %s
+    """, params=(iteration_id,))
+    df_kpi = run_uncached_query("""
+        SELECT "playerId", CAST(metric_id AS TEXT) as metric_id, final_score_1_to_100 as score
+        FROM analysis.kpis_final_scores WHERE "iterationId" = %s
+    """, params=(iteration_id,))
+    for d in (df_met, df_kpi):
+        if not d.empty: d['playerId'] = d['playerId'].astype('int64')
+
+    kvk_mat = df_base[list(KVK_PROFILES)].astype(float).to_numpy()
+    kvk_mat[kvk_mat <= 0] = np.nan   # KVK score 0 = profiel niet actief, geen echte score
+    met_mat, met_items = _long_to_matrix(df_met, row_index, "m")
+    kpi_mat, kpi_items = _long_to_matrix(df_kpi, row_index, "k")
+
+    values = np.hstack([kvk_mat, met_mat, kpi_mat])
+    items = list(KVK_PROFILES) + met_items + kpi_items
+
+    positions, pos_codes = np.unique(df_base['position'].fillna('ONBEKEND').astype(str).to_numpy(), return_inverse=True)
+    pct = percentile_ranks(values, pos_codes)
+    means = group_means(values, pos_codes, len(positions))
+
+    save_arrays(
+        _cube_path(iteration_id),
+        player_ids=df_base['playerId'].to_numpy(dtype='int64'),
+        positions=positions.astype(str),
+        pos_codes=pos_codes.astype('int16'),
+        items=np.array(items, dtype=str),
+        pct=np.where(np.isnan(pct), MISSING, np.round(pct)).astype('uint8'),
+        means=means.astype('float32'),
+    )
+    return len(df_base)
+
+def iteration_fingerprints(iteration_ids=None):
+    """Eén aggregaat-query per tabel: verandert de data van een iteratie, dan verandert zijn fingerprint."""
+    kvk_sum = " + ".join(f'COALESCE("{c}", 0)' for c in KVK_PROFILES)
+    where, params = "", None
+    if iteration_ids is not None:
+        where, params = 'WHERE "iterationId" IN %s', (tuple(str(i) for i in iteration_ids),)
+    parts = [
+        f'SELECT CAST("iterationId" AS TEXT) as it, COUNT(*) as n, SUM({kvk_sum}) as s FROM analysis.final_impect_scores {where} GROUP BY 1',
+        f'SELECT CAST("iterationId" AS TEXT) as it, COUNT(*) as n, SUM(final_score_1_to_100) as s FROM analysis.player_final_scores {where} GROUP BY 1',
+        f'SELECT CAST("iterationId" AS TEXT) as it, COUNT(*) as n, SUM(final_score_1_to_100) as s FROM analysis.kpis_final_scores {where} GROUP BY 1',
+    ]
+    fps = {}
+    for q in parts:
+        df = run_uncached_query(q, params=params)
+        for _, r in df.iterrows():
+            fps.setdefault(r['it'], []).append(f"{int(r['n'])}:{float(r['s'] or 0):.3f}")
+    return {k: "|".join(v) for k, v in fps.items()}
+
+def refresh_cubes(iteration_ids=None, progress=None):
+    """
+    Incrementele refresh: enkel iteraties waarvan de fingerprint veranderde (of die
+    nog geen cube hebben) worden herberekend. Geeft de lijst herberekende iteraties terug.
+    """
+    fps = {it: f"{fp}#v={BUILD_VERSION}" for it, fp in iteration_fingerprints(iteration_ids).items()}
+    manifest = read_manifest(MANIFEST)
+    todo = [it for it, fp in fps.items() if manifest.get(it) != fp or not file_version(_cube_path(it))]
+    for i, it in enumerate(todo):
+        if progress: progress(i, len(todo), it)
+        build_cube(it)
+        manifest[it] = fps[it]
+        write_manifest(MANIFEST, manifest)
+    return todo
+
+# -----------------------------------------------------------------------------
+# 3. LOOKUP API (SERVING)
+# -----------------------------------------------------------------------------
+@st.cache_resource(max_entries=64)
+def _load_cube(iteration_id, version):
+    data = load_arrays(_cube_path(iteration_id))
+    if data is None: return None
+    data['player_index'] = {int(p): i for i, p in enumerate(data['player_ids'])}
+    data['item_index'] = {str(it): j for j, it in enumerate(data['items'])}
+    data['pos_index'] = {str(p): k for k, p in enumerate(data['positions'])}
+    return data
+
+@st.cache_resource(max_entries=256)
+def _build_once(iteration_id):
+    """Eén bouwpoging per iteratie per proces (lukt het niet, dan niet bij elke lookup opnieuw)."""
+    refresh_cubes([iteration_id])
+    return True
+
+def get_cube(iteration_id, build_missing=True):
+    """Cube voor een iteratie uit het geheugen; ontbreekt ze nog, dan wordt ze eenmalig gebouwd."""
+    iteration_id = str(iteration_id)
+    path = _cube_path(iteration_id)
+    if not file_version(path) and build_missing:
+        _build_once(iteration_id)
+    return _load_cube(iteration_id, file_version(path))
+
+def get_percentile(iteration_id, player_id, item):
+    """Percentiel (0-100) van een speler binnen zijn positie, of None."""
+    cube = get_cube(iteration_id)
+    if cube is None: return None
+    i = cube['player_index'].get(int(player_id)); j = cube['item_index'].get(str(item))
+    if i is None or j is None: return None
+    v = cube['pct'][i, j]
+    return None if v == MISSING else int(v)
+
+def get_position_mean(iteration_id, position, item):
+    """Gemiddelde score voor een positie binnen de iteratie, of None."""
+    cube = get_cube(iteration_id)
+    if cube is None: return None
+    k = cube['pos_index'].get(str(position)); j = cube['item_index'].get(str(item))
+    if k is None or j is None: return None
+    v = cube['means'][k, j]
+    return None if np.isnan(v) else float(v)
+
+def get_percentiles_bulk(iteration_id, player_ids, item, build_missing=True):
+    """Vectorised variant: percentiel voor een reeks spelers (NaN waar onbekend)."""
+    player_ids = list(player_ids)
+    out = np.full(len(player_ids), np.nan)
+    cube = get_cube(iteration_id, build_missing)
+    if cube is None: return out
+    j = cube['item_index'].get(str(item))
+    if j is None: return out
+    rows = np.array([cube['player_index'].get(int(p), -1) for p in player_ids], dtype='int64')
+    hit = rows >= 0
+    vals = cube['pct'][rows[hit], j].astype(float)
+    vals[vals == MISSING] = np.nan
+    out[hit] = vals
+    return out
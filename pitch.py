@@ -0,0 +1,73 @@
+import numpy as np
+import plotly.graph_objects as go
+
+# -----------------------------------------------------------------------------
+# PITCH RENDERER (WEBGL)
+# -----------------------------------------------------------------------------
+# Coördinaten in meters rond de middenstip: x -52.5..52.5, y -34..34.
+# Markers via Scattergl, alle lijnen van een groep in één trace (NaN als
+# scheiding = null in de JSON, zoals None), dichtheid via numpy.histogram2d
+# zodat enkel het rooster naar de browser gaat en niet elk event.
+
+HALF_LENGTH, HALF_WIDTH = 52.5, 34.0
+
+def add_pitch(fig):
+    """Veldlijnen als shapes (onder de data)."""
+    white = dict(color="white")
+    fig.add_shape(type="rect", x0=-52.5, y0=-34, x1=52.5, y1=34, line=white, fillcolor="#4CAF50", layer="below")
+    fig.add_shape(type="line", x0=0, y0=-34, x1=0, y1=34, line=white)
+    fig.add_shape(type="circle", x0=-9.15, y0=-9.15, x1=9.15, y1=9.15, line=white)
+    fig.add_shape(type="rect", x0=-52.5, y0=-20.16, x1=-36, y1=20.16, line=white)
+    fig.add_shape(type="rect", x0=-52.5, y0=-9.16, x1=-46.5, y1=9.16, line=white)
+    fig.add_shape(type="rect", x0=36, y0=-20.16, x1=52.5, y1=20.16, line=white)
+    fig.add_shape(type="rect", x0=46.5, y0=-9.16, x1=52.5, y1=9.16, line=white)
+    return fig
+
+def pitch_layout(fig, height=550, fixed=True):
+    fig.update_layout(
+        height=height,
+        xaxis=dict(visible=False, range=[-55, 55], fixedrange=fixed),
+        yaxis=dict(visible=False, range=[-36, 36], scaleanchor="x", scaleratio=1, fixedrange=fixed),
+        plot_bgcolor='rgba(0,0,0,0)', margin=dict(l=0, r=0, t=20, b=0)
+    )
+    return fig
+
+def segment_arrays(x0, y0, x1, y1):
+    """Start/eind arrays -> één x en één y reeks [x0, x1, NaN, x0, x1, NaN, ...] (zonder loops)."""
+    x0, y0, x1, y1 = (np.asarray(a, dtype=float) for a in (x0, y0, x1, y1))
+    ok = ~(np.isnan(x0) | np.isnan(y0) | np.isnan(x1) | np.isnan(y1))
+    gap = np.full(ok.sum(), np.nan)
+    xs = np.column_stack([x0[ok], x1[ok], gap]).ravel()
+    ys = np.column_stack([y0[ok], y1[ok], gap]).ravel()
+    return xs, ys
+
+def marker_trace(d, name, color, text=None, customdata=None, hovertemplate=None, size=8):
+    return go.Scattergl(
+        x=d['x_start'], y=d['y_start'], mode='markers', name=name,
+        marker=dict(color=color, size=size, line=dict(width=1, color='black')),
+        text=text, customdata=customdata, hovertemplate=hovertemplate
+    )
+
+def line_trace(d, color, width=1, opacity=0.5):
+    xs, ys = segment_arrays(d['x_start'], d['y_start'], d['x_end'], d['y_end'])
+    return go.Scattergl(x=xs, y=ys, mode='lines', line=dict(color=color, width=width),
+                        opacity=opacity, showlegend=False, hoverinfo='skip')
+
+def density_grid(x, y, bin_size=5.0):
+    """2D histogram over het volledige veld. Geeft (telling [y, x], x-centra, y-centra)."""
+    x_edges = np.arange(-HALF_LENGTH, HALF_LENGTH + bin_size, bin_size)
+    y_edges = np.arange(-HALF_WIDTH, HALF_WIDTH + bin_size, bin_size)
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    ok = ~(np.isnan(x) | np.isnan(y))
+    counts, _, _ = np.histogram2d(x[ok], y[ok], bins=[x_edges, y_edges])
+    return counts.T, (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2
+
+def density_trace(x, y, mode="Raster", bin_size=5.0, colorscale='Hot', opacity=0.7):
+    """Gebinde dichtheid: 'Raster' (heatmap per vak) of 'Contour' (vloeiende lijnen over het rooster)."""
+    counts, xc, yc = density_grid(x, y, bin_size)
+    z = np.where(counts > 0, counts, np.nan) if mode == "Raster" else counts
+    common = dict(x=xc, y=yc, z=z, colorscale=colorscale, showscale=False, opacity=opacity,
+                  hovertemplate="x: %{x:.0f}m, y: %{y:.0f}m<br>Acties: %{z:.0f}<extra></extra>")
+    if mode == "Raster":
+        return go.Heatmap(**common)
+    return go.Contour(**common, ncontours=15, line_smoothing=1.0, contours=dict(coloring='fill', showlines=False))
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from match_engine import get_match_events
+
+# -----------------------------------------------------------------------------
+# FILTER INDEX VOOR DE PITCH MAP
+# -----------------------------------------------------------------------------
+# Per wedstrijd wordt elke filterdimensie één keer gecodeerd: per optie een
+# bitset (np.packbits) met de events die die waarde hebben. Een filtercombinatie
+# is dan een OR over de gekozen opties binnen een dimensie en een AND over de
+# dimensies, zonder isin op object kolommen. De optielijsten zitten mee in de index.
+
+# dimensie -> (kolom, sortering: 'appearance' | 'alpha' | 'numeric')
+FILTER_DIMS = {
+    'team': ('Team', 'appearance'),
+    'action': ('action_clean', 'appearance'),
+    'period': ('periodId', 'alpha'),
+    'player': ('Speler', 'appearance'),
+    'distance': ('distanceToOpponent', 'numeric'),
+    'pressure': ('pressure', 'numeric'),
+    'phase': ('phase', 'alpha'),
+    'chain_end': ('chain_end_action', 'alpha'),
+    'chain_zone': ('chain_start_zone', 'alpha'),
+}
+
+def _ordered(uniques, order):
+    """Volgorde van de opties: zoals ze voorkomen, alfabetisch of numeriek (tekst achteraan)."""
+    if order == 'appearance': return np.arange(len(uniques))
+    labels = pd.Series(uniques, dtype=object).astype(str)
+    if order == 'numeric':
+        nums = pd.to_numeric(labels, errors='coerce').to_numpy(dtype=float)
+        return np.lexsort((labels.to_numpy(), np.nan_to_num(nums, nan=np.inf)))
+    return np.argsort(labels.to_numpy(), kind='stable')
+
+def build_filter_index(df):
+    """Events -> {'n': aantal events, 'dims': {dim: {'options': [...], 'bits': uint8 (opties x bytes)}}}."""
+    n = len(df)
+    dims = {}
+    for dim, (col, order) in FILTER_DIMS.items():
+        if col not in df.columns:
+            dims[dim] = {'options': [], 'bits': np.zeros((0, (n + 7) // 8), dtype=np.uint8)}
+            continue
+        # Periode als tekst; events zonder periode krijgen een eigen optie ('nan', zoals vroeger)
+        values = df[col].astype(str).where(df[col].notna(), 'nan') if dim == 'period' else df[col]
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        perm = _ordered(uniques, order)
+        rank = np.empty(len(perm), dtype=np.int64); rank[perm] = np.arange(len(perm))
+        codes = np.where(codes >= 0, rank[np.maximum(codes, 0)], -1) if len(perm) else np.full(n, -1)
+        onehot = codes[None, :] == np.arange(len(perm))[:, None]
+        dims[dim] = {'options': [uniques[i] for i in perm], 'bits': np.packbits(onehot, axis=1)}
+    return {'n': n, 'dims': dims}
+
+def resolve(index, selections):
+    """
+    selections: {dim: lijst gekozen opties}. None = geen filter op die dimensie,
+    een lege lijst = niets geselecteerd. Geeft een boolean mask over de events terug.
+    """
+    n = index['n']
+    acc = np.full((n + 7) // 8, 0xFF, dtype=np.uint8)
+    for dim, chosen in selections.items():
+        if chosen is None: continue
+        entry = index['dims'][dim]
+        pos = {v: i for i, v in enumerate(entry['options'])}
+        rows = [pos[v] for v in chosen if v in pos]
+        if not rows: return np.zeros(n, dtype=bool)
+        acc &= np.bitwise_or.reduce(entry['bits'][rows], axis=0)
+    return np.unpackbits(acc, count=n).astype(bool)
+
+def options(index, dim):
+    return index['dims'][dim]['options']
+
+@st.cache_data(ttl=3600, max_entries=64)
+def get_filter_index(match_id, home_squad_id, persist=True):
+    """Filter index van een wedstrijd, gecachet naast de verwerkte events."""
+    return build_filter_index(get_match_events(match_id, home_squad_id, persist=persist))
@@ -0,0 +1,85 @@
+import pandas as pd
+from utils import run_query, get_config_for_position, POSITION_METRICS, POSITION_KPIS, KVK_PROFILES
+
+# -----------------------------------------------------------------------------
+# SET-BASED SPELER DATA (gedeeld door vergelijking en dossier export)
+# -----------------------------------------------------------------------------
+def pair_key(df):
+    """Bouwt een 'iterationId_playerId' sleutel om exacte paren te filteren."""
+    return df['iterationId'].astype(str) + "_" + df['playerId'].astype(str)
+
+def fetch_players_data(pairs):
+    """
+    Haalt KVK profielen, metrieken en KPIs op voor een lijst (iterationId, playerId) paren.
+    Eén query per tabel voor de hele set, i.p.v. het volledige dossier per speler.
+    """
+    iter_ids = tuple(sorted({p[0] for p in pairs}))
+    player_ids = tuple(sorted({p[1] for p in pairs}))
+    wanted = {f"{i}_{p}" for i, p in pairs}
+
+    # A. Profielen + positie
+    cols_str = ", ".join(f'a."{c}"' for c in KVK_PROFILES)
+    q_prof = f"""
+        SELECT a."iterationId", a."playerId", a.position, {cols_str}
+        FROM analysis.final_impect_scores a
+        WHERE a."iterationId" IN %s AND a."playerId" IN %s
+    """
+    df_prof = run_query(q_prof, params=(iter_ids, player_ids))
+    if not df_prof.empty:
+        df_prof = df_prof[pair_key(df_prof).isin(wanted)].drop_duplicates(subset=['iterationId', 'playerId'])
+
+    positions = {}
+    for _, r in df_prof.iterrows():
+        positions[(str(r['iterationId']), str(r['playerId']))] = r['position']
+
+    # B. Welke metriek/KPI IDs zijn nodig voor deze posities?
+    def ids_for(config_dict):
+        ids = set()
+        for pos in set(positions.values()):
+            cfg = get_config_for_position(pos, config_dict)
+            if cfg: ids.update(str(x) for x in cfg.get('aan_bal', []) + cfg.get('zonder_bal', []))
+        return tuple(sorted(ids))
+
+    metric_ids, kpi_ids = ids_for(POSITION_METRICS), ids_for(POSITION_KPIS)
+
+    df_met = pd.DataFrame()
+    if metric_ids:
+        q_met = """
+            SELECT s."iterationId", s."playerId", CAST(s.metric_id AS TEXT) as metric_id, d.name as "Metriek", s.final_score_1_to_100 as "Score"
+            FROM analysis.player_final_scores s
+            JOIN public.player_score_definitions d ON CAST(s.metric_id AS TEXT) = d.id
+            WHERE s."iterationId" IN %s AND s."playerId" IN %s AND s.metric_id IN %s
+        """
+        df_met = run_query(q_met, params=(iter_ids, player_ids, metric_ids))
+        if not df_met.empty: df_met = df_met[pair_key(df_met).isin(wanted)]
+
+    df_kpi = pd.DataFrame()
+    if kpi_ids:
+        q_kpi = """
+            SELECT s."iterationId", s."playerId", CAST(s.metric_id AS TEXT) as metric_id, d.name as "KPI", s.final_score_1_to_100 as "Score"
+            FROM analysis.kpis_final_scores s
+            JOIN analysis.kpi_definitions d ON CAST(s.metric_id AS TEXT) = d.id
+            WHERE s."iterationId" IN %s AND s."playerId" IN %s AND s.metric_id IN %s
+        """
+        df_kpi = run_query(q_kpi, params=(iter_ids, player_ids, kpi_ids))
+        if not df_kpi.empty: df_kpi = df_kpi[pair_key(df_kpi).isin(wanted)]
+
+    # C. Opsplitsen per speler (enkel de IDs die bij zijn eigen positie horen)
+    def per_player(df, key, label_col, config_dict):
+        pos = positions.get(key)
+        cfg = get_config_for_position(pos, config_dict)
+        if df.empty or not cfg: return pd.Series(dtype=float)
+        own_ids = {str(x) for x in cfg.get('aan_bal', []) + cfg.get('zonder_bal', [])}
+        d = df[(pair_key(df) == f"{key[0]}_{key[1]}") & (df['metric_id'].isin(own_ids))]
+        return d.groupby(label_col)['Score'].mean()
+
+    result = {}
+    for key in pairs:
+        prof_row = df_prof[pair_key(df_prof) == f"{key[0]}_{key[1]}"] if not df_prof.empty else pd.DataFrame()
+        result[key] = {
+            "position": positions.get(key),
+            "profiles": prof_row.iloc[0][list(KVK_PROFILES)].astype(float) if not prof_row.empty else pd.Series(dtype=float),
+            "metrics": per_player(df_met, key, 'Metriek', POSITION_METRICS),
+            "kpis": per_player(df_kpi, key, 'KPI', POSITION_KPIS),
+        }
+    return result
@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from store import store_path, save_frame, load_frame, read_manifest, write_manifest, file_version
+from match_engine import get_match_events, update_season_blocks, zone_of, ZONES, NON_BALL_ACTIONS
+
+# -----------------------------------------------------------------------------
+# PRESSING ANALYSE
+# -----------------------------------------------------------------------------
+# Een pressing = een balactie met een pressingPlayerId; de pressende ploeg is de
+# tegenstander van de ploeg aan de bal. Geslaagd als de pressende ploeg binnen
+# REGAIN_WINDOW volgende balacties zelf aan de bal is. PPDA = passes van de
+# tegenstander op hun eerste 60% / verdedigende acties van de ploeg op dat deel van
+# het veld. Hoogte = x van de pressing vanuit de pressende ploeg (coördinaten zijn per
+# ploeg genormaliseerd, dus -x). Per wedstrijd één klein blok per ploeg en per speler,
+# per iteratie incrementeel bewaard (zoals season_events).
+
+REGAIN_WINDOW = 5
+PPDA_LINE = -10.5   # 40% van 105m vanaf de eigen doellijn: x > -10.5 = hoogste 60% voor de verdediger
+DEFENSIVE_ACTIONS = {'INTERCEPTION', 'TACKLE', 'BALL_RECOVERY', 'LOOSE_BALL_REGAIN', 'BLOCK', 'CLEARANCE',
+                     'GROUND_DUEL', 'DUEL', 'FOUL'}
+ZONE_COLS = [f"zone_{i}" for i in range(len(ZONES))]
+PRESS_COLS = ['matchId', 'level', 'entityId', 'naam', 'squadId', 'Team', 'pressures', 'regains',
+              'def_actions', 'def_high', 'opp_passes', 'height_sum'] + ZONE_COLS
+
+def _files(iteration_id):
+    return store_path("pressing", str(iteration_id), "partials.feather"), store_path("pressing", str(iteration_id), "manifest.json")
+
+# -----------------------------------------------------------------------------
+# 1. PER WEDSTRIJD
+# -----------------------------------------------------------------------------
+def pressing_events(df, window=REGAIN_WINDOW):
+    """Eén rij per pressing: pressende ploeg/speler, hoogte, zone en of de bal binnen `window` acties heroverd werd."""
+    cols = ['press_squad', 'press_team', 'playerId', 'Speler', 'height', 'zone', 'regain']
+    if df.empty or 'pressingPlayerId' not in df.columns: return pd.DataFrame(columns=cols)
+    ball = ~df['action_clean'].isin(NON_BALL_ACTIONS).to_numpy() & df['squadId_clean'].notna().to_numpy()
+    d = df[ball]
+    squad = d['squadId_clean'].to_numpy()
+    squads = pd.unique(squad)
+    if len(squads) != 2: return pd.DataFrame(columns=cols)
+    other = np.where(squad == squads[0], squads[1], squads[0])
+    team_of = d.groupby('squadId_clean', observed=True)['Team'].first().astype(str)
+
+    # Herovering: staat de pressende ploeg aan de bal in één van de volgende `window` balacties?
+    n = len(d)
+    regain = np.zeros(n, dtype=bool)
+    for k in range(1, window + 1):
+        nxt = np.r_[squad[k:], np.full(min(k, n), None, dtype=object)]
+        regain |= nxt == other
+
+    pressed = d['pressingPlayerId'].notna().to_numpy()
+    i = np.flatnonzero(pressed)
+    height = -d['x_start'].to_numpy(dtype=float)[i]
+    return pd.DataFrame({
+        'press_squad': other[i], 'press_team': pd.Series(other[i], dtype=object).map(team_of).to_numpy(),
+        'playerId': pd.to_numeric(d['pressingPlayerId'], errors='coerce').astype('Int64').astype(str).to_numpy()[i],
+        'Speler': d['PressingSpeler'].astype(str).to_numpy()[i],
+        'height': height, 'zone': zone_of(height), 'regain': regain[i],
+    })
+
+def _zone_counts(p, keys):
+    z = pd.crosstab([p[k] for k in keys], p['zone']).reindex(columns=ZONES, fill_value=0)
+    z.columns = ZONE_COLS
+    return z
+
+def match_pressing(df, match_id=None):
+    """Verwerkte events -> pressing blok per ploeg en per pressende speler."""
+    p = pressing_events(df)
+    if p.empty: return pd.DataFrame(columns=PRESS_COLS)
+
+    # Verdedigende acties (ploeg zelf) en passes van de tegenstander voor PPDA
+    act = df['action_clean'].to_numpy(); sq = df['squadId_clean'].to_numpy()
+    x = df['x_start'].to_numpy(dtype=float)
+    is_def = np.isin(act, list(DEFENSIVE_ACTIONS))
+    is_pass = df['action_clean'].str.contains('PASS', na=False).to_numpy()
+    squads = p['press_squad'].unique().tolist()
+    other = {s: next((o for o in pd.unique(sq[pd.notna(sq)]) if o != s), None) for s in squads}
+    team_stats = pd.DataFrame({
+        'squadId': squads,
+        'def_actions': [int((is_def & (sq == s)).sum()) for s in squads],
+        'def_high': [int((is_def & (sq == s) & (x > PPDA_LINE)).sum()) for s in squads],
+        # tegenstander speelt richting +x: hun eerste 60% = x < -PPDA_LINE
+        'opp_passes': [int((is_pass & (sq == other[s]) & (x < -PPDA_LINE)).sum()) for s in squads],
+    }).set_index('squadId')
+
+    team = p.groupby(['press_squad', 'press_team']).agg(pressures=('regain', 'size'), regains=('regain', 'sum'), height_sum=('height', 'sum'))
+    team = team.join(_zone_counts(p, ['press_squad', 'press_team'])).reset_index()
+    team = team.join(team_stats, on='press_squad')
+    team['level'] = 'team'; team['entityId'] = team['press_squad']; team['naam'] = team['press_team']
+
+    known = p[p['Speler'] != '-']
+    player = known.groupby(['playerId', 'Speler', 'press_squad', 'press_team']).agg(pressures=('regain', 'size'), regains=('regain', 'sum'), height_sum=('height', 'sum'))
+    player = player.join(_zone_counts(known, ['playerId', 'Speler', 'press_squad', 'press_team'])).reset_index()
+    player['level'] = 'player'; player['entityId'] = player['playerId']; player['naam'] = player['Speler']
+    player['def_actions'] = 0; player['def_high'] = 0; player['opp_passes'] = 0
+
+    out = pd.concat([team, player], ignore_index=True).rename(columns={'press_squad': 'squadId', 'press_team': 'Team'})
+    out['matchId'] = str(match_id)
+    for c in ['pressures', 'regains', 'def_actions', 'def_high', 'opp_passes'] + ZONE_COLS:
+        out[c] = out[c].fillna(0).astype('int32')
+    out['height_sum'] = out['height_sum'].astype('float32')
+    return out[PRESS_COLS]
+
+@st.cache_data(ttl=3600, max_entries=64)
+def get_match_pressing(match_id, home_squad_id, persist=True):
+    return match_pressing(get_match_events(match_id, home_squad_id, persist=persist), match_id)
+
+# -----------------------------------------------------------------------------
+# 2. SEIZOEN (INCREMENTEEL)
+# -----------------------------------------------------------------------------
+def pressing_processed(iteration_id):
+    """matchIds die al in de pressing partials zitten."""
+    return set(read_manifest(_files(iteration_id)[1]).get("matches", []))
+
+def add_pressing_matches(iteration_id, prepared):
+    """Voegt de pressing blokken van verwerkte events ({matchId: events}) toe. Geeft het aantal wedstrijden terug."""
+    f_part, f_manifest = _files(iteration_id)
+    new_parts = [match_pressing(df, m) for m, df in prepared.items()]
+    existing = load_frame(f_part)
+    if existing is not None:   # herverwerkte wedstrijden vervangen, niet dubbel tellen
+        existing = existing[~existing['matchId'].astype(str).isin({str(m) for m in prepared})]
+    save_frame(pd.concat(([existing] if existing is not None else []) + new_parts, ignore_index=True), f_part)
+    write_manifest(f_manifest, {"matches": sorted(pressing_processed(iteration_id) | set(prepared))})
+    return len(new_parts)
+
+def update_season_pressing(iteration_id, progress=None):
+    """Voegt de pressing blokken van nieuwe gespeelde wedstrijden toe. Geeft het aantal nieuwe wedstrijden terug."""
+    return update_season_blocks(iteration_id, [(pressing_processed, add_pressing_matches)], progress)[0]
+
+@st.cache_resource(max_entries=16)
+def _load(path, version):
+    return load_frame(path)
+
+def load_pressing(iteration_id):
+    path, _ = _files(iteration_id)
+    return _load(path, file_version(path)) if file_version(path) else None
+
+# -----------------------------------------------------------------------------
+# 3. SAMENVATTEN
+# -----------------------------------------------------------------------------
+def summarise_pressing(p, level='team'):
+    """Blokken (één of meer wedstrijden) -> één rij per ploeg/speler met ratio's en zoneverdeling (%)."""
+    if p is None or p.empty: return pd.DataFrame()
+    p = p[p['level'] == level]
+    keys = ['entityId', 'naam'] if level == 'team' else ['entityId', 'naam', 'Team']
+    sums = ['pressures', 'regains', 'def_actions', 'def_high', 'opp_passes', 'height_sum'] + ZONE_COLS
+    g = p.groupby(keys, observed=True)
+    out = g[sums].sum().join(g['matchId'].nunique().rename('Wedstrijden')).reset_index()
+    out['Pressings per Wedstrijd'] = out['pressures'] / out['Wedstrijden'].clip(lower=1)
+    out['Herovering %'] = out['regains'] / out['pressures'].clip(lower=1) * 100
+    out['Gem. Hoogte (m)'] = out['height_sum'] / out['pressures'].clip(lower=1)
+    for z, c in zip(ZONES, ZONE_COLS):
+        out[f"% {z}"] = out[c] / out['pressures'].clip(lower=1) * 100
+    if level == 'team':
+        out['Pressings per Verd. Actie'] = np.where(out['def_actions'] > 0, out['pressures'] / out['def_actions'].clip(lower=1), np.nan)
+        out['PPDA'] = np.where(out['def_high'] > 0, out['opp_passes'] / out['def_high'].clip(lower=1), np.nan)
+    out = out.rename(columns={'naam': 'Team' if level == 'team' else 'Speler', 'pressures': 'Pressings', 'regains': 'Heroveringen'})
+    return out.drop(columns=['height_sum', 'def_high', 'opp_passes'] + ZONE_COLS + ([] if level == 'team' else ['def_actions']))
+
+def season_pressing(iteration_id, level='team'):
+    return summarise_pressing(load_pressing(iteration_id), level)
@@ -0,0 +1,94 @@
+import datetime
+import streamlit as st
+from utils import run_uncached_query
+
+# -----------------------------------------------------------------------------
+# FILTER PUSHDOWN: UI FILTERS -> GEPARAMETRISEERDE SQL PREDICATEN
+# -----------------------------------------------------------------------------
+# Filters worden eerst genormaliseerd tot een hashbare tuple (lege filters weg,
+# lijsten gesorteerd), zodat dezelfde selectie altijd dezelfde SQL + params en dus
+# dezelfde cache-sleutel geeft. Waarden gaan enkel als %s parameters mee;
+# kolomnamen enkel uit een whitelist (schema). Predicaten laten de kolommen zelf
+# ongemoeid (geen ::int of TO_DATE per rij): leeftijd wordt omgezet naar grenzen op
+# de geboortedatum, ISO tekst of date.
+#
+#   iterations / competitions / positions / squads : lijst waarden (IN)
+#   min_scores / max_scores                        : {kolom: waarde}
+#   min_age / max_age                              : jaren (inclusief)
+#   min_minutes                                    : minuten (enkel als de kolom bestaat)
+
+LIST_FILTERS = ('iterations', 'competitions', 'positions', 'squads')
+SCORE_FILTERS = {'min_scores': '>=', 'max_scores': '<='}
+VALUE_FILTERS = ('min_age', 'max_age', 'min_minutes')
+
+def normalise_filters(filters):
+    """dict met UI filters -> canonieke tuple ((sleutel, waarde), ...)."""
+    out = []
+    for key in sorted(filters):
+        v = filters[key]
+        if v is None or (isinstance(v, (list, tuple, set, dict)) and not v): continue
+        if key in LIST_FILTERS:
+            v = tuple(sorted({str(x) for x in v}))
+        elif key in SCORE_FILTERS:
+            v = tuple(sorted((str(c), float(x)) for c, x in v.items() if x is not None))
+            if not v: continue
+        elif key in VALUE_FILTERS:
+            v = int(v) if key != 'min_minutes' else float(v)
+        else:
+            raise ValueError(f"Onbekende filter: {key}")
+        out.append((key, v))
+    return tuple(out)
+
+def _years_before(day, years):
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:   # 29 februari
+        return day.replace(year=day.year - years, day=28)
+
+def age_bounds(min_age=None, max_age=None, today=None):
+    """
+    Leeftijd (volle jaren) -> grenzen op de geboortedatum als ISO tekst:
+    (geboren na, geboren op of voor). leeftijd <= max  <=>  geboren na vandaag - (max + 1) jaar.
+    """
+    today = today or datetime.date.today()
+    after = _years_before(today, max_age + 1).isoformat() if max_age is not None else None
+    before = _years_before(today, min_age).isoformat() if min_age is not None else None
+    return after, before
+
+def build_where(filters, score_columns, alias='a', birthdate=None, minutes_column=None):
+    """
+    Genormaliseerde filters -> (SQL predicaat, params). `alias` = alias van
+    analysis.final_impect_scores, `birthdate` = SQL expressie van de geboortedatum,
+    `score_columns` = toegelaten scorekolommen.
+    """
+    f = dict(filters)
+    clauses, params = [], []
+    col = lambda c: f'{alias}."{c}"'
+    if 'iterations' in f:
+        clauses.append(f'{col("iterationId")} IN %s'); params.append(f['iterations'])
+    if 'competitions' in f:
+        clauses.append(f'{col("iterationId")} IN (SELECT id FROM public.iterations WHERE "competitionName" IN %s)'); params.append(f['competitions'])
+    if 'positions' in f:
+        clauses.append(f'{alias}.position IN %s'); params.append(f['positions'])
+    if 'squads' in f:
+        clauses.append(f'{col("squadId")} IN %s'); params.append(f['squads'])
+    for key, op in SCORE_FILTERS.items():
+        for c, v in f.get(key, ()):
+            if c not in score_columns: raise ValueError(f"Onbekende scorekolom: {c}")
+            clauses.append(f'{col(c)} {op} %s'); params.append(v)
+    if 'min_age' in f or 'max_age' in f:
+        if birthdate is None: raise ValueError("Leeftijdsfilter zonder geboortedatum kolom")
+        after, before = age_bounds(f.get('min_age'), f.get('max_age'))
+        if after: clauses.append(f'{birthdate} > %s'); params.append(after)
+        if before: clauses.append(f'{birthdate} <= %s'); params.append(before)
+    if 'min_minutes' in f and minutes_column:
+        clauses.append(f'{col(minutes_column)} >= %s'); params.append(f['min_minutes'])
+    return " AND ".join(clauses) or "TRUE", tuple(params)
+
+@st.cache_data(ttl=3600, max_entries=128)
+def cached_query(sql, params):
+    """
+    Resultaat gecachet op (SQL, params); met genormaliseerde filters = op het predicaat.
+    Ongecachete query eronder: het resultaat staat maar één keer in het geheugen.
+    """
+    return run_uncached_query(sql, params=params)
@@ -0,0 +1,175 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from store import store_path, save_frame, load_frame, read_manifest, write_manifest, file_version
+from event_store import played_matches
+from match_engine import update_season_blocks
+from pass_network import network_processed, add_network_matches
+from pressing import pressing_processed, add_pressing_matches
+from zone_grids import grids_processed, add_grid_matches
+
+# -----------------------------------------------------------------------------
+# SEIZOENS-AGGREGATIE VAN MATCH EVENTS (PER ITERATIE)
+# -----------------------------------------------------------------------------
+# Elke wedstrijd wordt één keer verwerkt tot een klein 'partial' blok:
+#   matchId, level ('team' | 'player'), entityId, naam, squadId, Team, action, result, n, xt
+# (n = aantal acties, xt = som van xT_Generated_Player). De blokken van een iteratie
+# staan samen in één Feather bestand; nieuwe wedstrijden worden er enkel aan toegevoegd.
+# De leaderboards zijn een groupby over die partials (enkele tienduizenden rijen).
+
+PARTIAL_COLS = ['matchId', 'level', 'entityId', 'naam', 'squadId', 'Team', 'action', 'result', 'n', 'xt']
+
+def _partials_file(iteration_id):
+    return store_path("season_events", str(iteration_id), "partials.feather")
+
+def _manifest_file(iteration_id):
+    return store_path("season_events", str(iteration_id), "manifest.json")
+
+# -----------------------------------------------------------------------------
+# 1. PER WEDSTRIJD
+# -----------------------------------------------------------------------------
+def match_partials(df, match_id):
+    """Verwerkte events van één wedstrijd -> partial rijen per team en per speler."""
+    if df.empty: return pd.DataFrame(columns=PARTIAL_COLS)
+    base = pd.DataFrame({
+        'squadId': df['squadId_clean'].astype(str),
+        'Team': df['Team'].astype(str),
+        'playerId': df['player_id_raw'].astype(str),
+        'Speler': df['Speler'].astype(str),
+        'action': df['action_clean'],
+        'result': df['result_clean'],
+        'xt': df['xT_Generated_Player'].astype(float),
+    })
+
+    team = base.groupby(['squadId', 'Team', 'action', 'result'], observed=True).agg(n=('xt', 'size'), xt=('xt', 'sum')).reset_index()
+    team['level'] = 'team'; team['entityId'] = team['squadId']; team['naam'] = team['Team']
+
+    known = base[base['Speler'] != 'Onbekend']
+    player = known.groupby(['playerId', 'Speler', 'squadId', 'Team', 'action', 'result'], observed=True).agg(n=('xt', 'size'), xt=('xt', 'sum')).reset_index()
+    player['level'] = 'player'; player['entityId'] = player['playerId']; player['naam'] = player['Speler']
+
+    out = pd.concat([team, player], ignore_index=True)
+    out['matchId'] = str(match_id)
+    out['n'] = out['n'].astype('int32'); out['xt'] = out['xt'].astype('float32')
+    return out[PARTIAL_COLS]
+
+# -----------------------------------------------------------------------------
+# 2. INCREMENTELE UPDATE
+# -----------------------------------------------------------------------------
+def partials_processed(iteration_id):
+    """matchIds die al in de partials zitten."""
+    return set(read_manifest(_manifest_file(iteration_id)).get("matches", []))
+
+def add_partial_matches(iteration_id, prepared):
+    """Voegt verwerkte events ({matchId: events}) toe aan de partials. Geeft het aantal wedstrijden terug."""
+    iteration_id = str(iteration_id)
+    new_parts = [match_partials(df, m) for m, df in prepared.items()]
+    existing = load_frame(_partials_file(iteration_id))
+    if existing is not None:   # herverwerkte wedstrijden vervangen, niet dubbel tellen
+        existing = existing[~existing['matchId'].astype(str).isin({str(m) for m in prepared})]
+    save_frame(pd.concat(([existing] if existing is not None else []) + new_parts, ignore_index=True), _partials_file(iteration_id))
+    write_manifest(_manifest_file(iteration_id), {"matches": sorted(partials_processed(iteration_id) | set(prepared))})
+    return len(new_parts)
+
+def update_season(iteration_id, progress=None):
+    """
+    Verwerkt enkel de gespeelde wedstrijden van de iteratie die nog niet in de
+    aggregaten zitten. Geeft het aantal nieuw verwerkte wedstrijden terug.
+    """
+    return update_season_blocks(iteration_id, [(partials_processed, add_partial_matches)], progress)[0]
+
+# Alle seizoensblokken van een iteratie: leaderboards, passnetwerken, pressing, zonegrids
+SEASON_BLOCKS = [
+    (partials_processed, add_partial_matches),
+    (network_processed, add_network_matches),
+    (pressing_processed, add_pressing_matches),
+    (grids_processed, add_grid_matches),
+]
+
+def update_all_blocks(iteration_id, progress=None):
+    """Werkt alle seizoensblokken bij; elke wedstrijd wordt één keer geladen en verwerkt."""
+    return max(update_season_blocks(iteration_id, SEASON_BLOCKS, progress))
+
+@st.cache_data(ttl=600)
+def _played_count(iteration_id):
+    return len(played_matches([iteration_id]))
+
+def season_status(iteration_id):
+    """
+    (verwerkte wedstrijden, gespeelde wedstrijden) voor een iteratie. Verwerkt = aanwezig
+    in alle seizoensblokken, zodat een blok dat achterloopt de knop niet uitschakelt.
+    """
+    done = set.intersection(*[processed(str(iteration_id)) for processed, _ in SEASON_BLOCKS])
+    return len(done), _played_count(str(iteration_id))
+
+def refresh_season_blocks(iteration_ids=None, progress=None):
+    """Alle (of de gegeven) iteraties bijwerken. Geeft het totaal aantal nieuwe wedstrijden terug."""
+    df_m = played_matches(iteration_ids)
+    if df_m.empty: return 0
+    its = df_m['iterationId'].unique().tolist()
+    total = 0
+    for i, it in enumerate(its):
+        if progress: progress(i, len(its), it)
+        total += update_all_blocks(it)
+    return total
+
+# -----------------------------------------------------------------------------
+# 3. LEADERBOARDS (SERVING)
+# -----------------------------------------------------------------------------
+@st.cache_resource(max_entries=16)
+def _load_partials(iteration_id, version):
+    return load_frame(_partials_file(iteration_id))
+
+def load_partials(iteration_id):
+    path = _partials_file(iteration_id)
+    return _load_partials(str(iteration_id), file_version(path)) if file_version(path) else None
+
+def _summarise(p, keys):
+    """Partials -> één rij per entiteit met xT, acties en passes."""
+    is_pass = p['action'].str.contains('PASS', na=False)
+    ok = p['result'] == 'SUCCESS'
+    p = p.assign(
+        passes=np.where(is_pass, p['n'], 0),
+        passes_ok=np.where(is_pass & ok, p['n'], 0),
+        shots=np.where(p['action'].isin(['SHOT', 'GOAL']), p['n'], 0),
+        goals=np.where(p['action'] == 'GOAL', p['n'], 0),
+    )
+    g = p.groupby(keys, observed=True)
+    out = g.agg(Wedstrijden=('matchId', 'nunique'), xT=('xt', 'sum'), Acties=('n', 'sum'),
+                Passes=('passes', 'sum'), Passes_OK=('passes_ok', 'sum'), Schoten=('shots', 'sum'), Goals=('goals', 'sum')).reset_index()
+    out['xT per Wedstrijd'] = out['xT'] / out['Wedstrijden'].clip(lower=1)
+    out['Pass %'] = np.where(out['Passes'] > 0, out['Passes_OK'] / out['Passes'].clip(lower=1) * 100, np.nan)
+    return out.drop(columns=['Passes_OK'])
+
+def team_leaderboard(iteration_id):
+    p = load_partials(iteration_id)
+    if p is None or p.empty: return pd.DataFrame()
+    out = _summarise(p[p['level'] == 'team'], ['entityId', 'naam'])
+    return out.rename(columns={'naam': 'Team'}).drop(columns='entityId').sort_values('xT', ascending=False)
+
+def player_leaderboard(iteration_id):
+    p = load_partials(iteration_id)
+    if p is None or p.empty: return pd.DataFrame()
+    p = p[p['level'] == 'player']
+    out = _summarise(p, ['entityId', 'naam'])
+    # Team = de ploeg waarvoor de speler de meeste acties had
+    main_team = p.groupby(['entityId', 'Team'], observed=True)['n'].sum().reset_index().sort_values('n', ascending=False).drop_duplicates('entityId')
+    out = out.merge(main_team[['entityId', 'Team']], on='entityId', how='left')
+    return out.rename(columns={'naam': 'Speler', 'entityId': 'playerId'}).sort_values('xT', ascending=False)
+
+def pass_types(iteration_id, level='team'):
+    """Pass succes per type en entiteit (long: naam, action, Totaal, Succes, Pass %)."""
+    p = load_partials(iteration_id)
+    if p is None or p.empty: return pd.DataFrame()
+    p = p[(p['level'] == level) & p['action'].str.contains('PASS', na=False)]
+    p = p.assign(ok=np.where(p['result'] == 'SUCCESS', p['n'], 0))
+    out = p.groupby(['naam', 'action'], observed=True).agg(Totaal=('n', 'sum'), Succes=('ok', 'sum')).reset_index()
+    out['Pass %'] = out['Succes'] / out['Totaal'].clip(lower=1) * 100
+    return out
+
+def action_counts(iteration_id, level='team'):
+    """Aantal acties per entiteit, actie en resultaat (long)."""
+    p = load_partials(iteration_id)
+    if p is None or p.empty: return pd.DataFrame()
+    p = p[p['level'] == level]
+    return p.groupby(['naam', 'action', 'result'], observed=True)['n'].sum().reset_index()
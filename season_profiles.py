@@ -0,0 +1,229 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils import run_query, run_uncached_query, KVK_PROFILES
+from store import store_path, save_frame, load_frame, frame_columns, read_manifest, write_manifest, file_version
+from percentiles import iteration_fingerprints, metric_item, kpi_item
+from league_strength import strength_map
+from lineups import player_minutes, lineups_version
+
+# -----------------------------------------------------------------------------
+# SEIZOENSAGGREGAAT: één (minuten-gewogen) profiel per speler per seizoen
+# -----------------------------------------------------------------------------
+# Een speler die midden in het seizoen van club/competitie wisselt, staat in twee
+# iteraties. Per seizoen bewaren we twee Feather bestanden:
+#   <seizoen>.feather          playerId, season, iterationId (hoofditeratie = meeste minuten),
+#                              squadId, position, n_iterations, minutes, KVK kolommen, m<id>, k<id>
+#   <seizoen>_weights.feather  playerId, iterationId, share (aandeel in het gewicht)
+# Gewicht = gespeelde minuten in de iteratie (scorekolom, anders de lineup store);
+# zonder minuten tellen alle iteraties even zwaar.
+
+MANIFEST = store_path("season_profiles", "manifest.json")
+WEIGHT_CANDIDATES = ("playDuration", "play_duration", "minutes", "minutesPlayed")
+BUILD_VERSION = 2   # ophogen als de aggregatie verandert -> alle seizoenen worden herberekend
+
+def _season_file(season, suffix=""):
+    safe = str(season).replace('/', '-')
+    return store_path("season_profiles", f"{safe}{suffix}.feather")
+
+@st.cache_data(ttl=3600)
+def weight_column():
+    """Kolom met gespeelde minuten in final_impect_scores (als die bestaat)."""
+    df = run_query("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = 'analysis' AND table_name = 'final_impect_scores' AND column_name IN %s
+    """, params=(WEIGHT_CANDIDATES,))
+    found = set(df['column_name']) if not df.empty else set()
+    return next((c for c in WEIGHT_CANDIDATES if c in found), None)
+
+def _season_iterations(season):
+    df = run_uncached_query("SELECT CAST(id AS TEXT) as id FROM public.iterations WHERE season = %s", params=(season,))
+    return df['id'].tolist() if not df.empty else []
+
+# -----------------------------------------------------------------------------
+# 1. BUILDER (BATCH, VECTORISED)
+# -----------------------------------------------------------------------------
+def _long_to_rows(df, row_index, make_item):
+    """Long (playerId, iterationId, metric_id, score) -> matrix (n_rijen x n_items)."""
+    if df.empty: return np.empty((len(row_index), 0)), []
+    rows = row_index.get_indexer(pd.MultiIndex.from_arrays([df['playerId'].to_numpy(), df['iterationId'].to_numpy()]))
+    keep = rows >= 0
+    items, item_codes = np.unique(df['metric_id'].astype(str).to_numpy()[keep], return_inverse=True)
+    mat = np.full((len(row_index), len(items)), np.nan)
+    mat[rows[keep], item_codes] = df['score'].astype(float).to_numpy()[keep]
+    return mat, [make_item(i) for i in items]
+
+def build_season(season):
+    """Bouwt het seizoensaggregaat voor één seizoen. Geeft het aantal spelers terug."""
+    iteration_ids = _season_iterations(season)
+    if not iteration_ids: return 0
+    ids = tuple(iteration_ids)
+
+    wcol = weight_column()
+    weight_sql = f'CAST(a."{wcol}" AS FLOAT)' if wcol else 'NULL'
+    kvk_cols = ", ".join(f'a."{c}"' for c in KVK_PROFILES)
+    df_base = run_uncached_query(f"""
+        SELECT a."playerId", CAST(a."iterationId" AS TEXT) as "iterationId", CAST(a."squadId" AS TEXT) as "squadId",
+               a.position, {weight_sql} as minutes, {kvk_cols}
+        FROM analysis.final_impect_scores a WHERE a."iterationId" IN %s
+    """, params=(ids,))
+    if df_base.empty: return 0
+
+    long_q = """
+        SELECT "playerId", CAST("iterationId" AS TEXT) as "iterationId", CAST(metric_id AS TEXT) as metric_id, final_score_1_to_100 as score
+        FROM {table} WHERE "iterationId" IN %s
+    """
+    df_met = run_uncached_query(long_q.format(table="analysis.player_final_scores"), params=(ids,))
+    df_kpi = run_uncached_query(long_q.format(table="analysis.kpis_final_scores"), params=(ids,))
+
+    df_base = df_base.drop_duplicates(subset=['playerId', 'iterationId']).reset_index(drop=True)
+    for d in (df_base, df_met, df_kpi):
+        if not d.empty: d['playerId'] = d['playerId'].astype('int64')
+    row_index = pd.MultiIndex.from_arrays([df_base['playerId'].to_numpy(), df_base['iterationId'].to_numpy()])
+    if not wcol:
+        df_min = player_minutes(iteration_ids)
+        if not df_min.empty:
+            df_base['minutes'] = df_min.set_index(['playerId', 'iterationId'])['minutes'].reindex(row_index).to_numpy()
+
+    met_mat, met_items = _long_to_rows(df_met, row_index, metric_item)
+    kpi_mat, kpi_items = _long_to_rows(df_kpi, row_index, kpi_item)
+    values = np.hstack([df_base[list(KVK_PROFILES)].astype(float).to_numpy(), met_mat, kpi_mat])
+    items = list(KVK_PROFILES) + met_items + kpi_items
+
+    # Gewichten: minuten, of gelijk gewicht als een speler geen minuten heeft
+    codes, players = pd.factorize(df_base['playerId'])
+    minutes = pd.to_numeric(df_base['minutes'], errors='coerce').fillna(0).clip(lower=0).to_numpy()
+    tot_min = np.bincount(codes, weights=minutes, minlength=len(players))
+    w = np.where(tot_min[codes] > 0, minutes, 1.0)
+
+    # KVK score 0 = profiel niet actief: telt niet mee in het gemiddelde (70 en 0 -> 70, niet 35)
+    present = ~np.isnan(values)
+    valid = present.copy()
+    n_kvk = len(KVK_PROFILES)
+    valid[:, :n_kvk] &= values[:, :n_kvk] > 0
+    sums = np.zeros((len(players), values.shape[1])); wsum = np.zeros_like(sums)
+    np.add.at(sums, codes, np.where(valid, values, 0.0) * w[:, None])
+    np.add.at(wsum, codes, valid * w[:, None])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        agg = np.where(wsum > 0, sums / wsum, np.nan).astype('float32')
+    # Nergens actief (enkel nullen) blijft 0, zoals in de bron
+    seen = np.zeros((len(players), n_kvk), dtype=bool)
+    np.logical_or.at(seen, codes, present[:, :n_kvk])
+    agg[:, :n_kvk] = np.where(seen & (wsum[:, :n_kvk] == 0), 0.0, agg[:, :n_kvk])
+
+    # Hoofditeratie = de iteratie met het grootste gewicht
+    order = np.lexsort((-w, codes))
+    primary = order[np.r_[True, codes[order][1:] != codes[order][:-1]]]
+    primary = primary[np.argsort(codes[primary])]
+
+    out = pd.DataFrame({
+        'playerId': players.to_numpy(dtype='int64'),
+        'season': str(season),
+        'iterationId': df_base['iterationId'].to_numpy()[primary],
+        'squadId': df_base['squadId'].to_numpy()[primary],
+        'position': df_base['position'].to_numpy()[primary],
+        'n_iterations': np.bincount(codes, minlength=len(players)).astype('int16'),
+        'minutes': tot_min.astype('float32'),
+    })
+    out = pd.concat([out, pd.DataFrame(agg, columns=items)], axis=1)
+
+    wsum_player = np.bincount(codes, weights=w, minlength=len(players))
+    weights = pd.DataFrame({
+        'playerId': df_base['playerId'].to_numpy(dtype='int64'),
+        'iterationId': df_base['iterationId'].to_numpy(),
+        'share': (w / wsum_player[codes]).astype('float32'),
+    })
+
+    save_frame(out, _season_file(season))
+    save_frame(weights, _season_file(season, "_weights"))
+    return len(out)
+
+def refresh_season_profiles(seasons=None, progress=None):
+    """Incrementeel: enkel seizoenen waarvan een iteratie veranderde worden herberekend."""
+    if seasons is None:
+        df = run_uncached_query("SELECT DISTINCT season FROM public.iterations")
+        seasons = df['season'].tolist() if not df.empty else []
+    season_its = {s: _season_iterations(s) for s in seasons}
+    all_ids = [i for ids in season_its.values() for i in ids]
+    fps = iteration_fingerprints(all_ids) if all_ids else {}
+
+    manifest = read_manifest(MANIFEST)
+    todo = []
+    for s, ids in season_its.items():
+        fp = "#".join(f"{i}={fps.get(i, '')}" for i in sorted(ids)) + f"#w={weight_column() or lineups_version(ids)}#v={BUILD_VERSION}"
+        if ids and (manifest.get(s) != fp or not file_version(_season_file(s))):
+            todo.append((s, fp))
+
+    for i, (s, fp) in enumerate(todo):
+        if progress: progress(i, len(todo), s)
+        build_season(s)
+        manifest[s] = fp
+        write_manifest(MANIFEST, manifest)
+    return [s for s, _ in todo]
+
+# -----------------------------------------------------------------------------
+# 2. SERVING
+# -----------------------------------------------------------------------------
+@st.cache_resource(max_entries=32)
+def _load(path, version, columns):
+    return load_frame(path, list(columns) if columns else None)
+
+def load_season_profiles(season, columns=None):
+    """Seizoensaggregaat van een seizoen (enkel de gevraagde kolommen), of None."""
+    path = _season_file(season)
+    if not file_version(path): return None
+    if columns is not None:
+        available = set(frame_columns(path))
+        columns = tuple(c for c in dict.fromkeys(['playerId', 'iterationId'] + list(columns)) if c in available)
+    return _load(path, file_version(path), columns)
+
+def load_season_weights(season):
+    path = _season_file(season, "_weights")
+    return _load(path, file_version(path), None) if file_version(path) else None
+
+def merge_season_scores(df, cols, season_col='Seizoen', season=None, iteration_col='iterationId', adjust=False):
+    """
+    Eén rij per (speler, seizoen): de rij van de hoofditeratie blijft staan en `cols`
+    worden vervangen door de minuten-gewogen seizoenswaarden. Met adjust=True wordt de
+    (gewogen) competitiesterkte erbij geteld. Spelers zonder aggregaat blijven ongewijzigd.
+    """
+    if df.empty: return df
+    df = df.copy()
+    if season is not None: df['_season'] = str(season)
+    else: df['_season'] = df[season_col].astype(str)
+    pid = df['playerId'].astype('int64')
+    strengths = strength_map() if adjust else {}
+
+    parts = []
+    for s, part in df.groupby('_season', sort=False):
+        part = part.copy(); p_pid = pid.loc[part.index]
+        present = [c for c in cols if c in part.columns]
+        agg = load_season_profiles(s, present)
+        own_offset = part[iteration_col].astype(str).map(strengths).fillna(0.0) if adjust else 0.0
+        if agg is None:
+            part['_prim'] = 0; part['_offset'] = own_offset
+        else:
+            agg = agg.set_index('playerId')
+            agg_cols = [c for c in present if c in agg.columns]
+            prim = p_pid.map(agg['iterationId'])
+            part['_prim'] = (prim.astype(str) == part[iteration_col].astype(str)).astype(int)
+            known = p_pid.isin(agg.index).to_numpy()
+            for c in agg_cols:
+                part.loc[known, c] = p_pid[known].map(agg[c]).to_numpy()
+            part['_offset'] = own_offset
+            if adjust:
+                weights = load_season_weights(s)
+                if weights is not None:
+                    off = (weights['iterationId'].astype(str).map(strengths).fillna(0.0) * weights['share']).groupby(weights['playerId']).sum()
+                    has = p_pid.isin(off.index).to_numpy() & known
+                    part.loc[has, '_offset'] = p_pid[has].map(off).to_numpy()
+        parts.append(part)
+
+    df = pd.concat(parts)
+    df['_pid'] = pid.loc[df.index]
+    df = df.sort_values('_prim', ascending=False, kind='stable').drop_duplicates(subset=['_pid', '_season'])
+    if adjust:
+        for c in [c for c in cols if c in df.columns]:
+            vals = pd.to_numeric(df[c], errors='coerce')
+            df[c] = np.where(vals > 0, np.clip(vals + df['_offset'], 0, 100), vals)
+    return df.drop(columns=['_season', '_prim', '_offset', '_pid']).sort_index()
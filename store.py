@@ -0,0 +1,74 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+# -----------------------------------------------------------------------------
+# LOKALE DATA STORE (voorberekende batch resultaten)
+# -----------------------------------------------------------------------------
+# Batch engines schrijven hun resultaten als kleine bestanden weg in deze map.
+# Alles hierin is afgeleide data en mag op elk moment verwijderd worden;
+# de engines bouwen het dan (incrementeel) opnieuw op.
+DATA_DIR = os.environ.get("KVK_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".kvk_data"))
+
+def store_path(*parts):
+    """Pad binnen de data store; de bovenliggende map wordt aangemaakt."""
+    path = os.path.join(DATA_DIR, *[str(p) for p in parts])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+def _atomic_target(path):
+    return f"{path}.tmp{os.getpid()}"
+
+def save_arrays(path, **arrays):
+    """Schrijft numpy arrays weg als één .npz bestand (atomair via rename)."""
+    tmp = _atomic_target(path)
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+
+def load_arrays(path):
+    """Leest een .npz bestand volledig in als dict van arrays, of None."""
+    if not os.path.exists(path): return None
+    with np.load(path, allow_pickle=False) as data:
+        return {k: data[k] for k in data.files}
+
+def save_frame(df, path):
+    """Schrijft een DataFrame weg als Feather (Arrow) bestand."""
+    tmp = _atomic_target(path)
+    df.reset_index(drop=True).to_feather(tmp)
+    os.replace(tmp, path)
+
+def load_frame(path, columns=None):
+    """Leest een Feather bestand in, of None als het niet bestaat."""
+    if not os.path.exists(path): return None
+    return pd.read_feather(path, columns=columns)
+
+def frame_columns(path):
+    """Kolomnamen van een Feather bestand zonder de data in te lezen."""
+    if not os.path.exists(path): return []
+    import pyarrow.ipc
+    with pyarrow.ipc.open_file(path) as reader:
+        return reader.schema.names
+
+def read_manifest(path):
+    """Manifest = kleine JSON met fingerprints/versies van wat al berekend is."""
+    if not os.path.exists(path): return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_manifest(path, data):
+    tmp = _atomic_target(path)
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+def file_version(path):
+    """Wijzigingstijd van een bestand; handig als cache-sleutel (0 als het ontbreekt)."""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0
@@ -0,0 +1,26 @@
+"""
+Benchmark: oorspronkelijke rij-per-rij verwerking vs. match_engine.prepare_events.
+
+    python tests/bench_match_engine.py [aantal events] [herhalingen]
+"""
+import sys
+import time
+import conftest  # noqa: F401  (repo root op sys.path)
+from match_engine import prepare_events
+from test_match_engine import synthetic_match, reference_prepare
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); times.append(time.perf_counter() - t0)
+    return min(times) * 1000
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    df = synthetic_match(n)
+    ref = best_of(lambda: reference_prepare(df, 101), repeat)
+    new = best_of(lambda: prepare_events(df, 101), repeat)
+    print(f"{n} events, beste van {repeat}")
+    print(f"  referentie (apply):  {ref:8.1f} ms")
+    print(f"  prepare_events:      {new:8.1f} ms  (incl. balbezit ketens)")
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import pytest
+from match_engine import prepare_events
+
+# -----------------------------------------------------------------------------
+# REFERENTIE: DE OORSPRONKELIJKE RIJ-PER-RIJ CODE UIT WEDSTRIJDEN (ONGEWIJZIGD)
+# -----------------------------------------------------------------------------
+def normalize_id(val):
+    try:
+        if pd.isna(val) or val == 'nan' or val == 'None': return None
+        return str(int(float(val)))
+    except: return str(val).strip()
+
+def parse_gametime_to_min(t_str):
+    try:
+        if not isinstance(t_str, str): return 0.0
+        main_part = t_str.split('.')[0] 
+        parts = main_part.split(':')
+        if len(parts) >= 2: return float(parts[0]) + float(parts[1])/60.0
+        return float(parts[0]) if len(parts) == 1 else 0.0
+    except: return 0.0
+
+def reference_prepare(df_events, home_squad_id):
+    df_events = df_events.copy()
+    df_events['Minuut'] = df_events['TijdString'].apply(parse_gametime_to_min)
+    df_events['action_clean'] = df_events['action'].astype(str).str.upper().str.strip()
+    df_events['result_clean'] = df_events['result'].astype(str).str.upper().str.strip()
+    home_id_str = normalize_id(home_squad_id)
+    df_events['squadId_clean'] = df_events['squadId'].apply(normalize_id)
+
+    df_events['xT_Team_Raw'] = df_events['xT_Team_Raw'].fillna(0)
+    df_events['xT_Opp_Raw'] = df_events['xT_Opp_Raw'].fillna(0)
+
+    max_x = df_events['x_start'].max()
+    min_x = df_events['x_start'].min()
+    if max_x > 55 and min_x >= 0:
+        df_events['x_start'] = (df_events['x_start'] - 50) * (105/100)
+        df_events['y_start'] = (df_events['y_start'] - 50) * (68/100)
+        df_events['x_end'] = (df_events['x_end'] - 50) * (105/100)
+        df_events['y_end'] = (df_events['y_end'] - 50) * (68/100)
+
+    def calc_home_threat(row):
+        if row['squadId_clean'] == home_id_str:
+            return row['xT_Team_Raw'] - row['xT_Opp_Raw']
+        else:
+            return row['xT_Opp_Raw'] - row['xT_Team_Raw']
+
+    df_events['Home_Net_Threat_State'] = df_events.apply(calc_home_threat, axis=1)
+    df_events['xT_Generated_Raw'] = df_events['Home_Net_Threat_State'].shift(-1) - df_events['Home_Net_Threat_State']
+
+    def calc_player_xt(row):
+        if pd.isna(row['xT_Generated_Raw']): return 0.0
+        if row['squadId_clean'] == home_id_str: return row['xT_Generated_Raw']
+        else: return -row['xT_Generated_Raw']
+
+    df_events['xT_Generated_Player'] = df_events.apply(calc_player_xt, axis=1)
+    return df_events
+
+DERIVED_COLUMNS = ['Minuut', 'action_clean', 'result_clean', 'squadId_clean', 'xT_Team_Raw', 'xT_Opp_Raw',
+                   'x_start', 'y_start', 'x_end', 'y_end', 'Home_Net_Threat_State', 'xT_Generated_Raw', 'xT_Generated_Player']
+
+# -----------------------------------------------------------------------------
+# SYNTHETISCHE WEDSTRIJD
+# -----------------------------------------------------------------------------
+def synthetic_match(n=3000, seed=0):
+    """Eén wedstrijd met rommelige input: foute speeltijden, gemengde squad id types, ontbrekende xT."""
+    rng = np.random.default_rng(seed)
+    times = [f"{m}:{s:02d}.{ms:03d}" for m, s, ms in zip(np.sort(rng.integers(0, 95, n)), rng.integers(0, 60, n), rng.integers(0, 1000, n))]
+    for i in rng.choice(n, 60, replace=False):
+        times[i] = rng.choice(['', 'abc', '12', '45:xx.000', '1:2:3.4', None])
+    squads = np.array([101, 101.0, '101', '202', 202, 'nan', None, 'None', ' 303 '], dtype=object)
+    actions = np.array(['PASS', 'pass ', 'SHOT', 'GOAL', 'DRIBBLE', 'SUBSTITUTION', None], dtype=object)
+    xt_team = rng.random(n); xt_team[rng.random(n) < 0.1] = np.nan
+    xt_opp = rng.random(n); xt_opp[rng.random(n) < 0.1] = np.nan
+    return pd.DataFrame({
+        'Volgorde': np.arange(n),
+        'action': rng.choice(actions, n),
+        'result': rng.choice(np.array(['SUCCESS', 'fail', None], dtype=object), n),
+        'squadId': rng.choice(squads, n, p=[0.3, 0.1, 0.05, 0.3, 0.1, 0.04, 0.04, 0.03, 0.04]),
+        'xT_Team_Raw': xt_team, 'xT_Opp_Raw': xt_opp,
+        'periodId': np.where(np.arange(n) < n // 2, 1, 2),
+        'distanceToOpponent': None, 'pressure': None, 'phase': None,
+        'Team': rng.choice(['Thuis', 'Uit'], n), 'Speler': rng.choice(['A', 'B', 'C'], n), 'PressingSpeler': None,
+        'TijdString': pd.Series(times, dtype=object),
+        'x_start': rng.uniform(0, 100, n), 'y_start': rng.uniform(0, 100, n),
+        'x_end': rng.uniform(0, 100, n), 'y_end': rng.uniform(0, 100, n),
+    })
+
+def assert_same_columns(got, expected):
+    for c in DERIVED_COLUMNS:
+        g, e = got[c].reset_index(drop=True), expected[c].reset_index(drop=True)
+        if c in ('action_clean', 'result_clean', 'squadId_clean'):
+            assert g.astype(object).where(g.notna(), None).tolist() == e.astype(object).where(e.notna(), None).tolist(), c
+        else:
+            np.testing.assert_array_equal(g.to_numpy(dtype=float), e.to_numpy(dtype=float), err_msg=c)
+
+# -----------------------------------------------------------------------------
+# TESTS
+# -----------------------------------------------------------------------------
+@pytest.mark.parametrize("home", [101, "202", "101.0"])
+def test_prepare_events_matches_reference(home):
+    df = synthetic_match()
+    assert_same_columns(prepare_events(df, home), reference_prepare(df, home))
+
+def test_prepare_events_without_rescale():
+    df = synthetic_match(500, seed=1)
+    for c in ('x_start', 'x_end'): df[c] = df[c] - 52.5
+    assert_same_columns(prepare_events(df, 101), reference_prepare(df, 101))
+
+def test_prepare_events_multi_match_equals_per_match():
+    a, b = synthetic_match(800, seed=2), synthetic_match(700, seed=3)
+    a['matchId'], b['matchId'] = '1', '2'
+    both = prepare_events(pd.concat([a, b], ignore_index=True), {'1': 101, '2': '202'})
+    for m, part, home in (('1', a, 101), ('2', b, '202')):
+        assert_same_columns(both[both['matchId'] == m], prepare_events(part, home))
+
+def test_prepare_events_empty_match():
+    out = prepare_events(pd.DataFrame(), 101)
+    assert out.empty
+    assert {'Minuut', 'xT_Generated_Player', 'squadId_clean'} <= set(out.columns)
@@ -26,6 +26,17 @@ def run_query(query, params=None):
     finally:
         conn.close()
 
+def run_uncached_query(query, params=None):
+    """Voert query uit ZONDER cache (voor live checks en batch jobs)."""
+    conn = init_connection()
+    try:
+        return pd.read_sql(query, conn, params=params)
+    except Exception as e:
+        st.error(f"SQL Error: {e}")
+        return pd.DataFrame()
+    finally:
+        conn.close()
+
 # -----------------------------------------------------------------------------
 # 2. ALGEMENE SIDEBAR
 # -----------------------------------------------------------------------------
@@ -102,6 +113,29 @@ POSITION_KPIS = {
     "center_forward": {"aan_bal": [9, 427, 426, 1401, 82], "zonder_bal": [1536]}
 }
 
+# KVK profiel kolommen in analysis.final_impect_scores -> leesbare naam
+KVK_PROFILES = {
+    "cb_kvk_score": "KVK Centrale Verdediger", "wb_kvk_score": "KVK Wingback",
+    "dm_kvk_score": "KVK Verdedigende Mid.", "cm_kvk_score": "KVK Centrale Mid.",
+    "acm_kvk_score": "KVK Aanvallende Mid.", "fa_kvk_score": "KVK Flank Aanvaller",
+    "fw_kvk_score": "KVK Spits", "footballing_cb_kvk_score": "Voetballende CV",
+    "controlling_cb_kvk_score": "Controlerende CV", "defensive_wb_kvk_score": "Verdedigende Back",
+    "offensive_wingback_kvk_score": "Aanvallende Back", "ball_winning_dm_kvk_score": "Ballenafpakker (CVM)",
+    "playmaker_dm_kvk_score": "Spelmaker (CVM)", "box_to_box_cm_kvk_score": "Box-to-Box (CM)",
+    "deep_running_acm_kvk_score": "Diepgaande '10'", "playmaker_off_acm_kvk_score": "Spelmakende '10'",
+    "fa_inside_kvk_score": "Buitenspeler (Binnendoor)", "fa_wide_kvk_score": "Buitenspeler (Buitenom)",
+    "fw_target_kvk_score": "Targetman", "fw_running_kvk_score": "Lopende Spits", "fw_finisher_kvk_score": "Afmaker"
+}
+
+def season_start_year(season):
+    """'25/26' -> 2025, '2025' -> 2025 (sorteerbaar jaartal, None als onbekend)."""
+    try:
+        first = str(season).split('/')[0].strip()
+        year = int(first)
+        return year + 2000 if year < 100 else year
+    except (ValueError, TypeError):
+        return None
+
 def get_config_for_position(db_position, config_dict):
     if not db_position: return None
     pos = str(db_position).upper().strip()
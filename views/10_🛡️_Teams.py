@@ -3,6 +3,7 @@ import pandas as pd
 import plotly.express as px
 import numpy as np
 from utils import run_query
+from zone_grids import zone_grid, grid_values, zone_figure, ACTION_GROUPS
 
 st.set_page_config(page_title="Team Analyse", page_icon="🛡️", layout="wide")
 
@@ -122,6 +123,18 @@ try:
                     else: st.info("Geen data.")
                 except: st.error("Fout KPIs.")
 
+            # ZONES (voorberekende seizoensroosters)
+            st.markdown("---"); st.subheader("🗺️ Actiezones (Seizoen)")
+            grid = zone_grid(selected_iteration_id, 'team', final_squad_id)
+            if grid is None:
+                st.info("Nog geen zonedata voor dit team (Admin → Zonegrids).")
+            else:
+                zc1, zc2 = st.columns(2)
+                z_groups = zc1.multiselect("Acties:", ACTION_GROUPS, default=['PASS'], key="team_zone_groups")
+                z_metric = zc2.radio("Waarde:", ['Acties', 'Succes %', 'xT'], horizontal=True, key="team_zone_metric")
+                if z_groups:
+                    st.plotly_chart(zone_figure(grid_values(grid, z_groups, z_metric), z_metric), use_container_width=True)
+
             # SIMILARITY
             st.markdown("---"); st.subheader("🤝 Vergelijkbare Teams")
             st.caption("Vergelijkt enkel met teams uit seizoenen '25/26' en '2025'.")
@@ -3,6 +3,8 @@ import pandas as pd
 import plotly.graph_objects as go
 # We importeren de benodigde functies en configuraties uit jouw utils.py
 from utils import run_query, show_sidebar_filters, POSITION_METRICS, get_config_for_position
+from percentiles import get_position_mean, metric_item
+from age_curves import project_scores
 
 # -----------------------------------------------------------------------------
 # 1. SETUP & FILTERS
@@ -71,6 +73,13 @@ for db_pos, display_label in display_positions:
         st.header(display_label)
         df_pivot_eigen = df_eigen.pivot_table(index='Speler', columns='metric_name', values='score', aggfunc='mean')
         averages = df_pivot_eigen.mean().to_frame().T
+
+        # Competitie gemiddelde voor deze positie (lookup in de percentiel cube)
+        metric_ids_by_name = df_eigen.drop_duplicates('metric_name').set_index('metric_name')['metric_id']
+        comp_avg = pd.DataFrame(
+            [{name: get_position_mean(iteration_id, db_pos, metric_item(mid)) for name, mid in metric_ids_by_name.items()}],
+            index=["COMPETITIE GEMIDDELDE"]
+        ).reindex(columns=df_pivot_eigen.columns).astype(float)
         
         # 2. Haal potentiële targets op (voor de selectbox in de spider en de tabel)
         weak_metrics = averages.iloc[0][averages.iloc[0] < 60]
@@ -79,7 +88,7 @@ for db_pos, display_label in display_positions:
         if not weak_metrics.empty:
             weak_ids_str = ",".join([f"'{x}'" for x in df_eigen[df_eigen['metric_name'].isin(weak_metrics.index)]['metric_id'].unique()])
             target_query = f"""
-                SELECT p.commonname as "Naam", s.name as "Club", def.name as metric_name, pfs.final_score_1_to_100 as score,
+                SELECT p.commonname as "Naam", s.name as "Club", pfs.metric_id, def.name as metric_name, pfs.final_score_1_to_100 as score,
                 EXTRACT(YEAR FROM AGE(p.birthdate)) as "Leeftijd"
                 FROM analysis.player_final_scores pfs
                 JOIN analysis.players p ON pfs."playerId"::text = p.id
@@ -95,6 +104,16 @@ for db_pos, display_label in display_positions:
             if not df_targets_raw.empty:
                 df_target_pivot = df_targets_raw.pivot_table(index=['Naam', 'Leeftijd', 'Club'], columns='metric_name', values='score', aggfunc='mean')
                 df_target_pivot['Gaten Gedicht'] = df_target_pivot[weak_metrics.index].gt(60).sum(axis=1)
+
+                # Verwachte evolutie op de zwakke punten (lookup in de leeftijdscurves)
+                df_weak = df_targets_raw[df_targets_raw['metric_name'].isin(weak_metrics.index)].copy()
+                for n in (1, 2):
+                    df_weak[f'Proj. +{n}'] = float('nan')
+                    for mid, idx in df_weak.groupby('metric_id').groups.items():
+                        part = df_weak.loc[idx]
+                        df_weak.loc[idx, f'Proj. +{n}'] = project_scores([db_pos] * len(part), metric_item(mid), part['score'], part['Leeftijd'], n)
+                proj = df_weak.groupby(['Naam', 'Leeftijd', 'Club'])[['Proj. +1', 'Proj. +2']].mean()
+                df_target_pivot = df_target_pivot.join(proj)
                 df_target_pivot = df_target_pivot.sort_values('Gaten Gedicht', ascending=False).head(25)
 
         # TABS INITIALISEREN
@@ -107,7 +126,8 @@ for db_pos, display_label in display_positions:
             
             st.write("### 📊 Positie Gemiddelde")
             averages.index = ["GROEP GEMIDDELDE"]
-            st.dataframe(averages.style.background_gradient(cmap='RdYlGn', axis=1, vmin=40, vmax=80).format("{:.1f}"), use_container_width=True)
+            df_avgs = pd.concat([averages, comp_avg]) if comp_avg.notna().values.any() else averages
+            st.dataframe(df_avgs.style.background_gradient(cmap='RdYlGn', axis=1, vmin=40, vmax=80).format("{:.1f}", na_rep="-"), use_container_width=True)
 
             if not df_target_pivot.empty:
                 with st.expander("🎯 Aanbevolen Versterkingen (Top 25, <25j, 2 laatste seizoenen)"):
@@ -128,6 +148,8 @@ for db_pos, display_label in display_positions:
 
             # 1. Gemiddelde
             fig.add_trace(go.Scatterpolar(r=averages.iloc[0].values, theta=categories, fill='toself', name='Groep Gemiddelde', line_color='gray', opacity=0.4))
+            if comp_avg.notna().values.any():
+                fig.add_trace(go.Scatterpolar(r=comp_avg.iloc[0].fillna(0).values, theta=categories, name='Competitie Gemiddelde', line=dict(color='black', dash='dot')))
 
             # 2. Eigen Speler
             if eigen_speler != "Geen":
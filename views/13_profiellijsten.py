@@ -1,6 +1,10 @@
 import streamlit as st
 import pandas as pd
 from utils import run_query
+from age_curves import project_scores
+from league_strength import strength_map
+from season_profiles import merge_season_scores
+from query_builder import normalise_filters, build_where, cached_query
 
 # -------------------------------------------------------------------------
 # HULPFUNCTIES
@@ -87,6 +91,10 @@ def show_shortlists_page():
     with col3:
         min_score = st.number_input("Minimale Score", 0, 100, 60)
 
+    strengths = strength_map()
+    adjust_league = st.checkbox("⚖️ Corrigeer voor competitiesterkte", value=False, disabled=not strengths,
+                                help="Score + geschatte sterkte van de competitie (voorberekend), zodat competities vergelijkbaar worden.")
+
     # 3. DATA OPHALEN
     if selected_season and selected_db_column:
         # Stap A: Haal alle ID's op
@@ -96,35 +104,59 @@ def show_shortlists_page():
             st.warning(f"Geen data gevonden voor seizoen {selected_season}")
             return
 
-        # Stap B: Maak string voor SQL IN clause
-        ids_string = ",".join(map(str, iteration_ids))
+        # Stap B: Filters als geparametriseerde predicaten (query_builder): geen casts of TO_DATE per rij
+        # Bij correctie voor competitiesterkte gebeurt filteren en sorteren op de gecorrigeerde score
+        raw_expr = score_expr = f'scores."{selected_db_column}"'
+        adj_join, adj_params = "", ()
+        filters = {'iterations': iteration_ids, 'max_age': max_age}
+        if adjust_league:
+            score_expr = f'LEAST(100, {score_expr} + COALESCE(adj.s, 0))'
+            adj_join = 'LEFT JOIN unnest(%s::text[], %s::float8[]) as adj(it, s) ON scores."iterationId"::text = adj.it'
+            adj_params = (list(strengths.keys()), list(strengths.values()))
+        else:
+            filters['min_scores'] = {selected_db_column: min_score}
+        where, where_params = build_where(normalise_filters(filters), list(profiles_dict.values()),
+                                          alias='scores', birthdate='info."Geboortedatum"')
+        if adjust_league:
+            where += f" AND {score_expr} >= %s"; where_params += (min_score,)
 
         # Stap C: De Query
         query = f"""
             SELECT 
                 info."Spelersnaam" as naam,
                 info."Teamnaam" as team,
+                scores."playerId",
                 scores."iterationId" as comp_id,
                 DATE_PART('year', AGE(CURRENT_DATE, TO_DATE(info."Geboortedatum", 'YYYY-MM-DD'))) as leeftijd,
-                scores."{selected_db_column}" as score,
+                {raw_expr} as score,
                 scores."position" as positie
             FROM analysis.final_impect_scores as scores
             JOIN tabellen.players_squads_info as info 
               ON scores."playerId"::text = info."Speler_ID"::text
-            WHERE 
-                scores."iterationId"::int IN ({ids_string})
-                AND scores."{selected_db_column}" >= %s
-                AND DATE_PART('year', AGE(CURRENT_DATE, TO_DATE(info."Geboortedatum", 'YYYY-MM-DD'))) <= %s
+            {adj_join}
+            WHERE {where}
             ORDER BY 
-                scores."{selected_db_column}" DESC
+                {score_expr} DESC
             LIMIT 50;
         """
         
-        # Stap D: Uitvoeren (zonder suppress_error parameter!)
-        df_shortlist = run_query(query, params=(min_score, max_age))
+        # Stap D: Uitvoeren, gecachet op het genormaliseerde predicaat
+        df_shortlist = cached_query(query, adj_params + where_params)
         
         # 4. RESULTAAT TONEN
+        # Stap E: Spelers met meerdere iteraties in dit seizoen -> één minuten-gewogen score.
+        # De query geeft de ruwe score terug; de competitiecorrectie gebeurt hier één keer.
         if not df_shortlist.empty:
+            df_shortlist = merge_season_scores(df_shortlist.rename(columns={'score': selected_db_column}), [selected_db_column],
+                                               season=selected_season, iteration_col='comp_id', adjust=adjust_league)
+            df_shortlist = df_shortlist.rename(columns={selected_db_column: 'score'})
+            df_shortlist = df_shortlist[df_shortlist['score'] >= min_score].sort_values('score', ascending=False)
+
+        if not df_shortlist.empty:
+            # Verwachte evolutie volgens de leeftijdscurve van de positie
+            for n in (1, 2):
+                df_shortlist[f"proj_{n}"] = project_scores(df_shortlist['positie'], selected_db_column, df_shortlist['score'], df_shortlist['leeftijd'], n)
+
             st.success(f"🔍 {len(df_shortlist)} spelers gevonden in **Seizoen {selected_season}**.")
             
             st.dataframe(
@@ -139,7 +171,10 @@ def show_shortlists_page():
                         min_value=0, 
                         max_value=100
                     ),
-                    "comp_id": None 
+                    "proj_1": st.column_config.NumberColumn("Proj. +1 sz", format="%.1f"),
+                    "proj_2": st.column_config.NumberColumn("Proj. +2 sz", format="%.1f"),
+                    "comp_id": None,
+                    "playerId": None
                 },
                 use_container_width=True,
                 hide_index=True
@@ -0,0 +1,160 @@
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+from utils import run_query, KVK_PROFILES
+from player_data import fetch_players_data
+
+st.set_page_config(page_title="Speler Vergelijking", page_icon="⚖️", layout="wide")
+
+MAX_PLAYERS = 8
+PLAYER_COLORS = ['#d71920', '#2980b9', '#27ae60', '#8e44ad', '#f39c12', '#16a085', '#2c3e50', '#e67e22']
+
+# -----------------------------------------------------------------------------
+# 0. SESSION STATE
+# -----------------------------------------------------------------------------
+# cmp_players: de geselecteerde spelers (mag over verschillende iteraties gaan)
+# cmp_cache: reeds opgehaalde data per (iterationId, playerId), zodat we enkel nieuwe spelers ophalen
+if "cmp_players" not in st.session_state: st.session_state.cmp_players = []
+if "cmp_cache" not in st.session_state: st.session_state.cmp_cache = {}
+
+# -----------------------------------------------------------------------------
+# 1. HULPFUNCTIES
+# -----------------------------------------------------------------------------
+@st.cache_data(ttl=3600)
+def get_players_for_iteration(iteration_id):
+    q = """
+        SELECT p.commonname, p.id as "playerId", sq.name as "squadName"
+        FROM public.players p
+        JOIN analysis.final_impect_scores s ON CAST(p.id AS TEXT) = CAST(s."playerId" AS TEXT)
+        LEFT JOIN public.squads sq ON CAST(s."squadId" AS TEXT) = CAST(sq.id AS TEXT)
+        WHERE CAST(s."iterationId" AS TEXT) = CAST(%s AS TEXT)
+        ORDER BY p.commonname;
+    """
+    return run_query(q, params=(str(iteration_id),))
+
+def render_comparison(matrix, title, key):
+    """Overlapt radar charts en toont een verschil-tabel (rijen = items, kolommen = spelers)."""
+    if matrix.empty:
+        st.info("Geen data voor deze selectie.")
+        return
+
+    fig = go.Figure()
+    for i, col in enumerate(matrix.columns):
+        vals = matrix[col].fillna(0).tolist()
+        fig.add_trace(go.Scatterpolar(
+            r=vals + vals[:1], theta=matrix.index.tolist() + matrix.index[:1].tolist(),
+            fill='toself', name=col, opacity=0.6, line_color=PLAYER_COLORS[i % len(PLAYER_COLORS)]
+        ))
+    fig.update_layout(title=title, polar=dict(radialaxis=dict(visible=True, range=[0, 100])), showlegend=True, height=550)
+    st.plotly_chart(fig, use_container_width=True, key=f"radar_{key}")
+
+    diff = matrix.copy()
+    player_cols = matrix.columns.tolist()
+    diff['Verschil (max-min)'] = matrix.max(axis=1) - matrix.min(axis=1)
+    diff = diff.sort_values('Verschil (max-min)', ascending=False)
+    st.dataframe(
+        diff.style.highlight_max(axis=1, subset=player_cols, color='#2ecc7155').format("{:.1f}", na_rep="-"),
+        use_container_width=True
+    )
+
+# -----------------------------------------------------------------------------
+# 2. SIDEBAR: SPELERS TOEVOEGEN
+# -----------------------------------------------------------------------------
+st.sidebar.header("1. Speler Toevoegen")
+
+try:
+    df_seasons = run_query("SELECT DISTINCT season FROM public.iterations ORDER BY season DESC;")
+    seasons_list = df_seasons['season'].tolist()
+    cmp_season = st.sidebar.selectbox("Seizoen:", seasons_list, key="cmp_season")
+except Exception as e:
+    st.error("Kon seizoenen niet laden."); st.stop()
+
+df_iters = run_query('SELECT id, "competitionName" FROM public.iterations WHERE season = %s ORDER BY "competitionName";', params=(cmp_season,))
+if df_iters.empty:
+    st.warning("Geen competities gevonden."); st.stop()
+
+cmp_comp = st.sidebar.selectbox("Competitie:", df_iters['competitionName'].tolist(), key="cmp_comp")
+cmp_iteration_id = str(df_iters[df_iters['competitionName'] == cmp_comp].iloc[0]['id'])
+
+df_players = get_players_for_iteration(cmp_iteration_id)
+if not df_players.empty:
+    df_players = df_players.drop_duplicates(subset=['playerId'])
+    df_players['label'] = df_players['commonname'] + " (" + df_players['squadName'].fillna('?') + ")"
+    sel_label = st.sidebar.selectbox("Speler:", df_players['label'].tolist(), key="cmp_player")
+    sel_row = df_players[df_players['label'] == sel_label].iloc[0]
+
+    full = len(st.session_state.cmp_players) >= MAX_PLAYERS
+    if st.sidebar.button("➕ Voeg toe aan vergelijking", disabled=full):
+        entry = {
+            "iterationId": cmp_iteration_id, "playerId": str(sel_row['playerId']),
+            "Naam": sel_row['commonname'], "Team": sel_row['squadName'],
+            "Seizoen": cmp_season, "Competitie": cmp_comp
+        }
+        existing = {(p['iterationId'], p['playerId']) for p in st.session_state.cmp_players}
+        if (entry['iterationId'], entry['playerId']) not in existing:
+            st.session_state.cmp_players.append(entry)
+            st.rerun()
+    if full: st.sidebar.caption(f"Maximum {MAX_PLAYERS} spelers bereikt.")
+else:
+    st.sidebar.warning("Geen spelers in deze competitie.")
+
+if st.session_state.cmp_players and st.sidebar.button("🗑️ Alles wissen"):
+    st.session_state.cmp_players = []
+    st.rerun()
+
+# -----------------------------------------------------------------------------
+# 3. HOOFDPAGINA
+# -----------------------------------------------------------------------------
+st.title("⚖️ Speler Vergelijking")
+
+players = st.session_state.cmp_players
+if len(players) < 2:
+    st.info(f"Voeg minstens 2 spelers toe via de zijbalk (max {MAX_PLAYERS}). Spelers mogen uit verschillende seizoenen/competities komen.")
+    if players: st.write(f"Geselecteerd: **{players[0]['Naam']}** ({players[0]['Seizoen']} - {players[0]['Competitie']})")
+    st.stop()
+
+def player_label(p):
+    return f"{p['Naam']} ({p['Seizoen']} {p['Competitie']})"
+
+# Selectie beheren (verwijderen via de multiselect)
+labels = [player_label(p) for p in players]
+keep = st.multiselect("Geselecteerde spelers:", labels, default=labels)
+if len(keep) < len(labels):
+    st.session_state.cmp_players = [p for p in players if player_label(p) in keep]
+    st.rerun()
+
+# Enkel ontbrekende spelers ophalen
+pairs = [(p['iterationId'], p['playerId']) for p in players]
+missing = [k for k in pairs if k not in st.session_state.cmp_cache]
+if missing:
+    with st.spinner(f"Data ophalen voor {len(missing)} nieuwe speler(s)..."):
+        st.session_state.cmp_cache.update(fetch_players_data(missing))
+
+cache = st.session_state.cmp_cache
+df_overview = pd.DataFrame([{**p, "Positie": cache[(p['iterationId'], p['playerId'])]['position'] or "-"} for p in players])
+st.dataframe(df_overview[['Naam', 'Team', 'Positie', 'Seizoen', 'Competitie']], use_container_width=True, hide_index=True)
+
+positions = {cache[k]['position'] for k in pairs if cache[k]['position']}
+if len(positions) > 1:
+    st.caption("ℹ️ Spelers hebben verschillende posities: metrieken/KPIs die niet bij een positie horen worden als '-' getoond.")
+
+def build_matrix(part):
+    cols = {}
+    for p, k in zip(players, pairs):
+        cols[player_label(p)] = cache[k][part]
+    return pd.DataFrame(cols)
+
+tab1, tab2, tab3 = st.tabs(["🕸️ KVK Profielen", "📊 Metrieken", "📈 KPIs"])
+
+with tab1:
+    df_profiles = build_matrix('profiles')
+    if not df_profiles.empty:
+        df_profiles = df_profiles[(df_profiles.fillna(0) > 0).any(axis=1)]
+        df_profiles.index = [KVK_PROFILES.get(c, c) for c in df_profiles.index]
+    render_comparison(df_profiles, "KVK Profiel Scores", "profiles")
+
+with tab2:
+    render_comparison(build_matrix('metrics'), "Metrieken (Impect)", "metrics")
+
+with tab3:
+    render_comparison(build_matrix('kpis'), "KPIs", "kpis")
@@ -2,7 +2,14 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import streamlit.components.v1 as components
-from utils import run_query, get_config_for_position, POSITION_METRICS, POSITION_KPIS
+from crosswalk import crosswalk_available, skillcorner_id_for
+from utils import run_query, get_config_for_position, POSITION_METRICS, POSITION_KPIS, KVK_PROFILES
+from percentiles import get_percentile, metric_item, kpi_item
+from career import get_career, career_frame
+from age_curves import project_scores, age_from_birthdate
+from league_strength import strength_map
+from season_profiles import merge_season_scores
+from zone_grids import zone_grid, grid_values, zone_figure, ACTION_GROUPS
 
 st.set_page_config(page_title="Speler Analyse", page_icon="⚽", layout="wide")
 
@@ -224,20 +231,24 @@ try:
             return 'color: #2ecc71; font-weight: bold' if isinstance(val, (int, float)) and val > 66 else ''
 
         # 2. PROFIEL SPIDER
-        profile_mapping = {
-            "KVK Centrale Verdediger": row['cb_kvk_score'], "KVK Wingback": row['wb_kvk_score'],
-            "KVK Verdedigende Mid.": row['dm_kvk_score'], "KVK Centrale Mid.": row['cm_kvk_score'],
-            "KVK Aanvallende Mid.": row['acm_kvk_score'], "KVK Flank Aanvaller": row['fa_kvk_score'],
-            "KVK Spits": row['fw_kvk_score'], "Voetballende CV": row['footballing_cb_kvk_score'],
-            "Controlerende CV": row['controlling_cb_kvk_score'], "Verdedigende Back": row['defensive_wb_kvk_score'],
-            "Aanvallende Back": row['offensive_wingback_kvk_score'], "Ballenafpakker (CVM)": row['ball_winning_dm_kvk_score'],
-            "Spelmaker (CVM)": row['playmaker_dm_kvk_score'], "Box-to-Box (CM)": row['box_to_box_cm_kvk_score'],
-            "Diepgaande '10'": row['deep_running_acm_kvk_score'], "Spelmakende '10'": row['playmaker_off_acm_kvk_score'],
-            "Buitenspeler (Binnendoor)": row['fa_inside_kvk_score'], "Buitenspeler (Buitenom)": row['fa_wide_kvk_score'],
-            "Targetman": row['fw_target_kvk_score'], "Lopende Spits": row['fw_running_kvk_score'], "Afmaker": row['fw_finisher_kvk_score']
-        }
+        profile_mapping = {label: row[col] for col, label in KVK_PROFILES.items()}
         active_profiles = {k: v for k, v in profile_mapping.items() if v is not None and v > 0}
         df_chart = pd.DataFrame(list(active_profiles.items()), columns=['Profiel', 'Score'])
+        reverse_mapping = {label: col for col, label in KVK_PROFILES.items()}
+
+        # Percentiel binnen positie & competitie (O(1) lookup in de percentiel cube)
+        def add_percentiles(df, item_keys):
+            if df.empty: return df
+            df['Percentiel'] = pd.to_numeric(pd.Series([get_percentile(selected_iteration_id, p_player_id, k) for k in item_keys], index=df.index, dtype=object), errors='coerce')
+            return df
+
+        df_chart = add_percentiles(df_chart, [reverse_mapping[p] for p in df_chart['Profiel']])
+
+        # Projectie via de leeftijdscurve van de positie (pure lookup)
+        player_age = age_from_birthdate(row['birthdate'])
+        if not df_chart.empty and player_age is not None:
+            for n in (1, 2):
+                df_chart[f'Proj. +{n}'] = [project_scores([row['position']], reverse_mapping[p], [s], [player_age], n)[0] for p, s in zip(df_chart['Profiel'], df_chart['Score'])]
         
         top_profile_name = df_chart.sort_values(by='Score', ascending=False).iloc[0]['Profiel'] if not df_chart.empty and df_chart.iloc[0]['Score'] > 66 else None
         if top_profile_name: st.success(f"### ✅ Speler is POSITIEF op data profiel: {top_profile_name}")
@@ -248,7 +259,7 @@ try:
         
         with c1:
             st.write(f"**Positie:** {row['position']}")
-            st.dataframe(df_chart.style.applymap(highlight_high_scores, subset=['Score']).format({'Score': '{:.1f}'}), use_container_width=True, hide_index=True)
+            st.dataframe(df_chart.style.applymap(highlight_high_scores, subset=['Score']).format({'Score': '{:.1f}', 'Percentiel': '{:.0f}', 'Proj. +1': '{:.1f}', 'Proj. +2': '{:.1f}'}, na_rep='-'), use_container_width=True, hide_index=True)
         with c2:
             if not df_chart.empty:
                 fig = px.line_polar(df_chart, r='Score', theta='Profiel', line_close=True, title='KVK Profiel Spider Chart')
@@ -268,12 +279,14 @@ try:
             def get_metrics_table(metric_ids):
                 if not metric_ids: return pd.DataFrame()
                 ids_tuple = tuple(str(x) for x in metric_ids)
-                q = """SELECT d.name as "Metriek", d.details_label as "Detail", s.final_score_1_to_100 as "Score" 
+                q = """SELECT d.name as "Metriek", d.details_label as "Detail", s.final_score_1_to_100 as "Score", CAST(s.metric_id AS TEXT) as metric_id 
                        FROM analysis.player_final_scores s 
                        JOIN public.player_score_definitions d ON CAST(s.metric_id AS TEXT) = d.id 
                        WHERE s."iterationId" = %s AND s."playerId" = %s AND s.metric_id IN %s 
                        ORDER BY s.final_score_1_to_100 DESC"""
-                return run_query(q, params=(selected_iteration_id, p_player_id, ids_tuple))
+                df = run_query(q, params=(selected_iteration_id, p_player_id, ids_tuple))
+                if df.empty: return df
+                return add_percentiles(df, [metric_item(m) for m in df['metric_id']]).drop(columns=['metric_id'])
             
             df_aan = get_metrics_table(metrics_config.get('aan_bal', []))
             df_zonder = get_metrics_table(metrics_config.get('zonder_bal', []))
@@ -286,11 +299,11 @@ try:
             with c_table:
                 if not df_aan.empty: 
                     st.caption("⚽ Aan de Bal")
-                    st.dataframe(df_aan.style.applymap(highlight_high_scores, subset=['Score']), use_container_width=True, hide_index=True)
+                    st.dataframe(df_aan.style.applymap(highlight_high_scores, subset=['Score']).format({'Percentiel': '{:.0f}'}, na_rep='-'), use_container_width=True, hide_index=True)
                 if not df_zonder.empty: 
                     st.write("") 
                     st.caption("🏃 Zonder Bal")
-                    st.dataframe(df_zonder.style.applymap(highlight_high_scores, subset=['Score']), use_container_width=True, hide_index=True)
+                    st.dataframe(df_zonder.style.applymap(highlight_high_scores, subset=['Score']).format({'Percentiel': '{:.0f}'}, na_rep='-'), use_container_width=True, hide_index=True)
             
             with c_chart:
                 chart_data = pd.concat([df_aan, df_zonder], ignore_index=True)
@@ -310,12 +323,14 @@ try:
             def get_kpis_table(kpi_ids):
                 if not kpi_ids: return pd.DataFrame()
                 ids_tuple = tuple(str(x) for x in kpi_ids)
-                q = """SELECT d.name as "KPI", d.context as "Context", s.final_score_1_to_100 as "Score" 
+                q = """SELECT d.name as "KPI", d.context as "Context", s.final_score_1_to_100 as "Score", CAST(s.metric_id AS TEXT) as metric_id 
                        FROM analysis.kpis_final_scores s 
                        JOIN analysis.kpi_definitions d ON CAST(s.metric_id AS TEXT) = d.id 
                        WHERE s."iterationId" = %s AND s."playerId" = %s AND s.metric_id IN %s 
                        ORDER BY s.final_score_1_to_100 DESC"""
-                return run_query(q, params=(selected_iteration_id, p_player_id, ids_tuple))
+                df = run_query(q, params=(selected_iteration_id, p_player_id, ids_tuple))
+                if df.empty: return df
+                return add_percentiles(df, [kpi_item(k) for k in df['metric_id']]).drop(columns=['metric_id'])
             
             df_k1 = get_kpis_table(kpis_config.get('aan_bal', []))
             df_k2 = get_kpis_table(kpis_config.get('zonder_bal', []))
@@ -328,11 +343,11 @@ try:
             with c_table:
                 if not df_k1.empty: 
                     st.caption("⚽ Aan de Bal")
-                    st.dataframe(df_k1.style.applymap(highlight_high_scores, subset=['Score']), use_container_width=True, hide_index=True)
+                    st.dataframe(df_k1.style.applymap(highlight_high_scores, subset=['Score']).format({'Percentiel': '{:.0f}'}, na_rep='-'), use_container_width=True, hide_index=True)
                 if not df_k2.empty: 
                     st.write("")
                     st.caption("🏃 Zonder Bal")
-                    st.dataframe(df_k2.style.applymap(highlight_high_scores, subset=['Score']), use_container_width=True, hide_index=True)
+                    st.dataframe(df_k2.style.applymap(highlight_high_scores, subset=['Score']).format({'Percentiel': '{:.0f}'}, na_rep='-'), use_container_width=True, hide_index=True)
             
             with c_chart:
                 chart_data_kpi = pd.concat([df_k1, df_k2], ignore_index=True)
@@ -344,6 +359,51 @@ try:
         else:
              st.info("Geen KPI configuratie.")
 
+        # 3B. CARRIÈRE TIJDLIJN (alle iteraties, één query + incrementele cache)
+        st.markdown("---")
+        st.subheader("📈 Carrière Tijdlijn")
+        try:
+            career = get_career(p_player_id)
+            if len(career["iterations"]) < 2:
+                st.info("Speler heeft nog maar één iteratie: geen tijdlijn beschikbaar.")
+            else:
+                items = career["items"]
+                naam_to_item = dict(zip(items['naam'].fillna(items['item']), items['item']))
+                kvk_opts = items.loc[items['bron'] == 'kvk', 'naam'].tolist()
+                other_opts = items.loc[items['bron'] != 'kvk', 'naam'].dropna().sort_values().tolist()
+                default_kvk = df_chart.sort_values('Score', ascending=False)['Profiel'].head(3).tolist() if not df_chart.empty else []
+
+                ct1, ct2 = st.columns(2) if not print_mode else (st.container(), st.container())
+                with ct1:
+                    sel_kvk = st.multiselect("KVK Profielen:", kvk_opts, default=[p for p in default_kvk if p in kvk_opts], key="career_kvk")
+                with ct2:
+                    sel_other = st.multiselect("Metrieken / KPIs:", other_opts, key="career_other")
+
+                df_career = career_frame(career, [naam_to_item[n] for n in sel_kvk + sel_other])
+                if not df_career.empty:
+                    fig_car = px.line(df_career, x='Iteratie', y='Score', color='Item', markers=True, title="Evolutie over seizoenen")
+                    fig_car.update_layout(yaxis=dict(range=[0, 100]), xaxis=dict(categoryorder='array', categoryarray=career["iterations"]['label'].tolist()))
+                    st.plotly_chart(fig_car, use_container_width=True)
+                else:
+                    st.caption("Selecteer profielen, metrieken of KPIs.")
+        except Exception as e:
+            st.error(f"Fout bij laden carrière tijdlijn: {e}")
+
+        # 3C. ZONES (voorberekende seizoensroosters, geen event scan)
+        st.markdown("---")
+        st.subheader("🗺️ Actiezones (Seizoen)")
+        grid = zone_grid(selected_iteration_id, 'player', p_player_id)
+        if grid is None:
+            st.info("Nog geen zonedata voor deze speler in deze competitie (Admin → Zonegrids).")
+        else:
+            zc1, zc2 = st.columns(2) if not print_mode else (st.container(), st.container())
+            with zc1:
+                z_groups = st.multiselect("Acties:", ACTION_GROUPS, default=['PASS', 'DRIBBLE', 'SHOT'], key="zone_groups")
+            with zc2:
+                z_metric = st.radio("Waarde:", ['Acties', 'Succes %', 'xT'], horizontal=True, key="zone_metric")
+            if z_groups:
+                st.plotly_chart(zone_figure(grid_values(grid, z_groups, z_metric), z_metric), use_container_width=True)
+
         # 4. OVERIGE SECTIES
         st.markdown("---")
         st.subheader("💪 Fysieke Data (SkillCorner)")
@@ -362,8 +422,27 @@ try:
             WHERE p.id = %s
             LIMIT 1
         """
+        # Via de crosswalk: directe lookup op de SkillCorner ID i.p.v. een CAST-join over alle spelers
+        q_phys_direct = """
+            SELECT 
+                f.total_matches,
+                f.psv99_score as "PSV 99",
+                f.timetosprint_score as "TTS",
+                f.sprint_distance_full_all_score as "Sprint Dis",
+                f.sprint_count_full_all_score as "Sprint Cnt",
+                f.total_distance_full_all_score as "Tot. Dis",
+                f.*
+            FROM analysis.player_physical_group_scores f
+            WHERE f.player_id = %s
+            LIMIT 1
+        """
         try:
-            df_phys = run_query(q_phys, params=(str(final_player_id),))
+            # Speler (nog) niet in de crosswalk -> terugvallen op de oude join
+            sc_id = skillcorner_id_for(final_player_id) if crosswalk_available() else None
+            if sc_id:
+                df_phys = run_query(q_phys_direct, params=(sc_id,))
+            else:
+                df_phys = run_query(q_phys, params=(str(final_player_id),))
             if not df_phys.empty:
                 df_phys = df_phys.loc[:, ~df_phys.columns.duplicated()]
                 def color_physical_score(val):
@@ -475,15 +554,6 @@ try:
         st.markdown("---")
         st.subheader("👯 Vergelijkbare Spelers")
         compare_columns = [col for col, score in profile_mapping.items() if score is not None and score > 0]
-        reverse_mapping = {
-            "KVK Centrale Verdediger": 'cb_kvk_score', "KVK Wingback": 'wb_kvk_score', "KVK Verdedigende Mid.": 'dm_kvk_score',
-            "KVK Centrale Mid.": 'cm_kvk_score', "KVK Aanvallende Mid.": 'acm_kvk_score', "KVK Flank Aanvaller": 'fa_kvk_score',
-            "KVK Spits": 'fw_kvk_score', "Voetballende CV": 'footballing_cb_kvk_score', "Controlerende CV": 'controlling_cb_kvk_score',
-            "Verdedigende Back": 'defensive_wb_kvk_score', "Aanvallende Back": 'offensive_wingback_kvk_score', "Ballenafpakker (CVM)": 'ball_winning_dm_kvk_score',
-            "Spelmaker (CVM)": 'playmaker_dm_kvk_score', "Box-to-Box (CM)": 'box_to_box_cm_kvk_score', "Diepgaande '10'": 'deep_running_acm_kvk_score',
-            "Spelmakende '10'": 'playmaker_off_acm_kvk_score', "Buitenspeler (Binnendoor)": 'fa_inside_kvk_score', "Buitenspeler (Buitenom)": 'fa_wide_kvk_score',
-            "Targetman": 'fw_target_kvk_score', "Lopende Spits": 'fw_running_kvk_score', "Afmaker": 'fw_finisher_kvk_score'
-        }
         db_cols = [reverse_mapping[c] for c in compare_columns if c in reverse_mapping]
         if db_cols:
             with st.expander(f"Toon top 10 spelers die lijken op {selected_player_name}", expanded=False):
@@ -491,16 +561,19 @@ try:
                 sim_query = f"""
                     SELECT p.id as "playerId", p.commonname as "Naam", sq.name as "Team", 
                            i.season as "Seizoen", i."competitionName" as "Competitie", 
-                           a.position, {cols_str}
+                           a."iterationId", a.position, {cols_str}
                     FROM analysis.final_impect_scores a
                     JOIN public.players p ON CAST(a."playerId" AS TEXT) = CAST(p.id AS TEXT)
                     LEFT JOIN public.squads sq ON CAST(a."squadId" AS TEXT) = CAST(sq.id AS TEXT)
                     JOIN public.iterations i ON CAST(a."iterationId" AS TEXT) = CAST(i.id AS TEXT)
                     WHERE a.position = %s AND i.season IN ('25/26', '2025')
                 """
+                adjust_league = st.checkbox("⚖️ Corrigeer voor competitiesterkte", value=False, disabled=not strength_map(), key="sim_adjust")
                 try:
                     df_all_p = run_query(sim_query, params=(row['position'],))
                     if not df_all_p.empty:
+                        # Eén minuten-gewogen profiel per speler per seizoen (ook bij wissel van club/competitie)
+                        df_all_p = merge_season_scores(df_all_p, db_cols, adjust=adjust_league)
                         df_all_p['unique_id'] = df_all_p['playerId'].astype(str) + "_" + df_all_p['Seizoen']
                         df_all_p = df_all_p.drop_duplicates(subset=['unique_id']).set_index('unique_id')
                         curr_uid = f"{p_player_id}_{selected_season}"
@@ -1,30 +1,22 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from utils import run_query
-import json
+from match_engine import get_match_events, get_match_momentum, get_team_matches, get_team_events, minute_xt, average_momentum, normalize_id
+from pitch_filters import get_filter_index, resolve, options
+from event_store import FINAL_AFTER_HOURS
+from lineups import match_lineup
+from pitch import add_pitch, pitch_layout, marker_trace, line_trace, density_trace
+from pass_network import get_match_network, season_network, network_figure
+from pressing import get_match_pressing, summarise_pressing, season_pressing, REGAIN_WINDOW
+from zone_grids import grid_values, zone_figure
+from opponent_report import update_report, report_version, opponent_report, report_html, ZONE_VIEWS
+from season_events import update_all_blocks, season_status, team_leaderboard, player_leaderboard, pass_types, action_counts
 
 st.set_page_config(page_title="Match Events", page_icon="🏟️", layout="wide")
 
-# -----------------------------------------------------------------------------
-# HELPER FUNCTIES
-# -----------------------------------------------------------------------------
-def normalize_id(val):
-    try:
-        if pd.isna(val) or val == 'nan' or val == 'None': return None
-        return str(int(float(val)))
-    except: return str(val).strip()
-
-def parse_gametime_to_min(t_str):
-    try:
-        if not isinstance(t_str, str): return 0.0
-        main_part = t_str.split('.')[0] 
-        parts = main_part.split(':')
-        if len(parts) >= 2: return float(parts[0]) + float(parts[1])/60.0
-        return float(parts[0]) if len(parts) == 1 else 0.0
-    except: return 0.0
-
 # -----------------------------------------------------------------------------
 # 1. SELECTIE
 # -----------------------------------------------------------------------------
@@ -48,10 +40,137 @@ if sel_season:
 else:
     st.stop()
 
+view_mode = st.sidebar.radio("Modus", ["Wedstrijd", "Team Seizoen", "Tegenstander"], horizontal=True, key="wd_mode")
+
+# -----------------------------------------------------------------------------
+# 1B. TEAM SEIZOEN (alle gespeelde wedstrijden van één ploeg in één keer)
+# -----------------------------------------------------------------------------
+if view_mode in ("Team Seizoen", "Tegenstander"):
+    df_it = run_query('SELECT id FROM public.iterations WHERE season = %s AND "competitionName" = %s LIMIT 1', (sel_season, sel_comp))
+    if df_it.empty:
+        st.warning("Geen iteratie gevonden."); st.stop()
+    ts_it = str(df_it.iloc[0]['id'])
+    df_sq = run_query("""
+        SELECT DISTINCT s.id, s.name FROM public.matches m
+        JOIN public.squads s ON s.id IN (m."homeSquadId", m."awaySquadId")
+        WHERE CAST(m."iterationId" AS TEXT) = %s ORDER BY s.name
+    """, (ts_it,))
+    if df_sq.empty:
+        st.warning("Geen teams gevonden."); st.stop()
+    ts_team = st.sidebar.selectbox("Team", df_sq['name'].tolist(), key="ts_team")
+    ts_squad = normalize_id(df_sq[df_sq['name'] == ts_team].iloc[0]['id'])
+    df_tm = get_team_matches(ts_it, ts_squad)
+    if df_tm.empty:
+        st.warning("Nog geen gespeelde wedstrijden voor dit team."); st.stop()
+    if view_mode == "Tegenstander":
+        ts_last = st.sidebar.slider("Laatste N wedstrijden", 1, len(df_tm), min(5, len(df_tm)), key="opp_last")
+    else:
+        ts_last = st.sidebar.slider("Laatste N wedstrijden", 1, len(df_tm), len(df_tm), key="ts_last")
+    df_tm = df_tm.tail(ts_last)
+
+# -----------------------------------------------------------------------------
+# 1C. TEGENSTANDER RAPPORT (laatste N wedstrijden, incrementeel opgebouwd)
+# -----------------------------------------------------------------------------
+if view_mode == "Tegenstander":
+    st.title(f"🔎 Tegenstander: {ts_team}")
+    with st.spinner("Nieuwe wedstrijden verwerken..."):
+        n_new = update_report(ts_it, ts_squad, df_tm)
+    rep = opponent_report(ts_it, ts_squad, tuple(df_tm['id'].astype(str)), report_version(ts_it, ts_squad))
+    st.caption(f"{rep['n_matches']} wedstrijden ({sel_comp} {sel_season})" + (f" · {n_new} nieuw verwerkt" if n_new else ""))
+    st.download_button("📥 Exporteer rapport (HTML)", report_html(rep, ts_team, f"{sel_comp} {sel_season}"),
+                       file_name=f"tegenstander_{ts_team.replace(' ', '_')}.html", mime="text/html")
+
+    r1, r2 = st.columns([1, 2])
+    with r1:
+        st.subheader("Formaties")
+        st.dataframe(rep['formations'].style.format({'%': '{:.0f}%'}), use_container_width=True, hide_index=True)
+        st.subheader("Standaardsituaties")
+        st.dataframe(rep['set_pieces'].style.format({'xT': '{:.2f}', 'Per Wedstrijd': '{:.1f}', 'Eindigt in Schot %': '{:.0f}%'}), use_container_width=True, hide_index=True)
+    with r2:
+        st.subheader("Basiself")
+        st.dataframe(rep['starting_xi'].style.format({'Basis %': '{:.0f}%', 'Minuten': '{:.0f}'}), use_container_width=True, hide_index=True)
+    st.subheader("Top xT")
+    st.dataframe(rep['xt'].head(15).style.format({'xT': '{:.2f}', 'xT per Wedstrijd': '{:.3f}'}), use_container_width=True, hide_index=True)
+    st.subheader("Pressing")
+    st.dataframe(rep['pressing_team'], use_container_width=True, hide_index=True)
+    st.dataframe(rep['pressing_players'].head(10), use_container_width=True, hide_index=True)
+    st.subheader("Zones")
+    z_cols = st.columns(2)
+    for i, (title, groups, metric) in enumerate(ZONE_VIEWS):
+        with z_cols[i % 2]:
+            st.caption(title)
+            st.plotly_chart(zone_figure(grid_values(rep['zones'], groups, metric), metric, height=380), use_container_width=True)
+    st.stop()
+
+if view_mode == "Team Seizoen":
+
+    st.title(f"🛡️ {ts_team}: {sel_comp} {sel_season}")
+    st.caption(f"{len(df_tm)} gespeelde wedstrijden, in één keer geladen uit de lokale event store (enkel nieuwe wedstrijden worden uit de database gehaald).")
+    with st.spinner("Wedstrijden laden..."):
+        df_ts = get_team_events(tuple(df_tm['id']), tuple(df_tm['homeSquadId']))
+    if df_ts.empty:
+        st.warning("Geen events beschikbaar."); st.stop()
+
+    own = (df_ts['squadId_clean'] == ts_squad).to_numpy()
+    df_ts['Kant'] = np.where(own, ts_team, np.where(df_ts['squadId_clean'].notna(), 'Tegenstanders', None))
+    n_ts = max(df_ts['matchId'].nunique(), 1)
+    side_colors = {ts_team: '#e74c3c', 'Tegenstanders': '#3498db'}
+    is_pass = df_ts['action_clean'].str.contains('PASS', na=False)
+    is_ok = df_ts['result_clean'] == 'SUCCESS'
+
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("xT per wedstrijd", f"{df_ts.loc[own, 'xT_Generated_Player'].sum() / n_ts:.2f}", f"tegen: {df_ts.loc[~own, 'xT_Generated_Player'].sum() / n_ts:.2f}", delta_color="off")
+    m2.metric("Passes per wedstrijd", f"{(is_pass & own).sum() / n_ts:.0f}")
+    m3.metric("Pass %", f"{(is_pass & is_ok & own).sum() / max((is_pass & own).sum(), 1) * 100:.1f}%")
+    m4.metric("Schoten per wedstrijd", f"{(df_ts['action_clean'].isin(['SHOT', 'GOAL']) & own).sum() / n_ts:.1f}")
+
+    ts1, ts2, ts3, ts4, ts5 = st.tabs(["📊 Acties", "🏃 Spelers", "🎯 Passes", "📍 Pitch Map", "📈 Momentum"])
+    with ts1:
+        act = df_ts[df_ts['Kant'].notna()].groupby(['Kant', 'action_clean']).size().unstack('Kant', fill_value=0) / n_ts
+        act = act.sort_values(ts_team, ascending=False) if ts_team in act.columns else act
+        st.caption("Gemiddeld aantal per wedstrijd.")
+        st.dataframe(act.style.format('{:.1f}'), use_container_width=True)
+    with ts2:
+        pl = df_ts[own & (df_ts['Speler'] != 'Onbekend').to_numpy()].groupby('Speler').agg(
+            Wedstrijden=('matchId', 'nunique'), Acties=('action_clean', 'size'), xT=('xT_Generated_Player', 'sum')).reset_index()
+        pl['xT per Wedstrijd'] = pl['xT'] / pl['Wedstrijden'].clip(lower=1)
+        st.dataframe(pl.sort_values('xT', ascending=False).style.format({'xT': '{:.2f}', 'xT per Wedstrijd': '{:.3f}'}), use_container_width=True, hide_index=True)
+    with ts3:
+        ps = df_ts[is_pass.to_numpy() & own].assign(ok=is_ok[is_pass & own]).groupby('action_clean').agg(Totaal=('ok', 'size'), Succes=('ok', 'sum')).reset_index()
+        ps['Pass %'] = ps['Succes'] / ps['Totaal'].clip(lower=1) * 100
+        fig_ps = px.bar(ps.melt(id_vars='action_clean', value_vars=['Totaal', 'Succes'], var_name='Status', value_name='Aantal'),
+                        x='action_clean', y='Aantal', color='Status', barmode='group', color_discrete_map={'Totaal': '#95a5a6', 'Succes': '#2ecc71'})
+        st.plotly_chart(fig_ps, use_container_width=True)
+        st.dataframe(ps.style.format({'Pass %': '{:.1f}'}), use_container_width=True, hide_index=True)
+    with ts4:
+        p_c1, p_c2, p_c3 = st.columns(3)
+        ts_acts_all = sorted(df_ts['action_clean'].dropna().unique().tolist())
+        ts_acts = p_c1.multiselect("Acties", ts_acts_all, default=[a for a in ['SHOT', 'GOAL'] if a in ts_acts_all], key="ts_acts")
+        ts_side = p_c2.radio("Ploeg", [ts_team, 'Tegenstanders'], horizontal=True, key="ts_side")
+        ts_view = p_c3.radio("Weergave", ["Raster", "Contour", "Punten"], horizontal=True, key="ts_view")
+        d_map = df_ts[(df_ts['Kant'] == ts_side) & df_ts['action_clean'].isin(ts_acts)]
+        if d_map.empty:
+            st.info("Geen events met deze filters.")
+        else:
+            fig_ts = add_pitch(go.Figure())
+            if ts_view == "Punten":
+                fig_ts.add_trace(marker_trace(d_map, ts_side, side_colors[ts_side], size=5, text=d_map['Speler'] + " (" + d_map['action_clean'] + ")", hovertemplate="%{text}<extra></extra>"))
+            else:
+                fig_ts.add_trace(density_trace(d_map['x_start'], d_map['y_start'], mode=ts_view))
+            st.caption(f"{len(d_map)} events over {n_ts} wedstrijden.")
+            st.plotly_chart(pitch_layout(fig_ts, fixed=ts_view != "Punten"), use_container_width=True)
+    with ts5:
+        ts_window = st.slider("Venster (min.)", 3, 15, 5, key="ts_mom_window")
+        df_avg = average_momentum([minute_xt(g, ts_squad, 100) for _, g in df_ts.groupby('matchId', sort=False)], window=ts_window)
+        fig_avg = go.Figure(go.Bar(x=df_avg['Minuut'], y=df_avg['Rollend Netto'], marker_color=np.where(df_avg['Rollend Netto'] >= 0, side_colors[ts_team], side_colors['Tegenstanders'])))
+        fig_avg.update_layout(height=350, xaxis_title="Minuut", yaxis_title=f"Gem. netto xT ({ts_window} min.)", margin=dict(t=30))
+        st.plotly_chart(fig_avg, use_container_width=True)
+    st.stop()
+
 if sel_season and sel_comp:
     q_matches = """
         SELECT m.id, m."scheduledDate", h.name as home, a.name as away, 
-               m."homeSquadId", m."awaySquadId"
+               m."homeSquadId", m."awaySquadId", CAST(m."iterationId" AS TEXT) as "iterationId"
         FROM public.matches m
         JOIN public.squads h ON m."homeSquadId" = h.id
         JOIN public.squads a ON m."awaySquadId" = a.id
@@ -79,225 +198,26 @@ st.caption(f"Datum: {match_row['scheduledDate'].strftime('%d-%m-%Y %H:%M')}")
 # -----------------------------------------------------------------------------
 # 2. DATA OPHALEN EVENTS
 # -----------------------------------------------------------------------------
-@st.cache_data
-def get_match_data_optimized(match_id):
-    q_events = """
-        SELECT 
-            e.index as "Volgorde",
-            e."squadId", e.action, e."actionType", e.result,
-            (e.player ->> 'id') as player_id_raw,
-            (e."gameTime" ->> 'gameTime') as "TijdString",
-            
-            e."distanceToOpponent",
-            e."phase",
-            e."pressure",
-            e."periodId",
-            e."pressingPlayerId",
-            
-            CAST(e."start" -> 'coordinates' ->> 'x' AS FLOAT) as x_start,
-            CAST(e."start" -> 'coordinates' ->> 'y' AS FLOAT) as y_start,
-            CAST(e."end" -> 'coordinates' ->> 'x' AS FLOAT) as x_end,
-            CAST(e."end" -> 'coordinates' ->> 'y' AS FLOAT) as y_end,
-            
-            CAST(e."pxT" ->> 'team' AS FLOAT) as "xT_Team_Raw",
-            CAST(e."pxT" ->> 'opponent' AS FLOAT) as "xT_Opp_Raw"
-        FROM public.match_events e
-        WHERE e."matchId" = %s 
-        ORDER BY e.index ASC
-    """
-    df_ev = run_query(q_events, (match_id,))
-    if df_ev.empty: return pd.DataFrame()
-    
-    df_ev['Minuut'] = df_ev['TijdString'].apply(parse_gametime_to_min)
-    
-    # Teams Map
-    squad_ids = df_ev['squadId'].dropna().unique().tolist()
-    squad_map = {}
-    if squad_ids:
-        s_ids_formatted = ", ".join(f"'{x}'" for x in squad_ids)
-        if s_ids_formatted:
-            df_sq = run_query(f"SELECT id, name FROM public.squads WHERE id IN ({s_ids_formatted})")
-            if not df_sq.empty:
-                squad_map = dict(zip(df_sq['id'].astype(str), df_sq['name']))
-    df_ev['Team'] = df_ev['squadId'].astype(str).map(squad_map).fillna('Onbekend')
-
-    # Spelers Map
-    p_ids_1 = df_ev['player_id_raw'].dropna().unique().tolist()
-    p_ids_2 = df_ev['pressingPlayerId'].dropna().unique().tolist()
-    all_p_ids = list(set(p_ids_1 + p_ids_2))
-    all_p_ids = [str(pid) for pid in all_p_ids if str(pid).isdigit()]
-    
-    player_map = {}
-    if all_p_ids:
-        p_ids_formatted = ", ".join(f"'{x}'" for x in all_p_ids)
-        if p_ids_formatted:
-            df_pl = run_query(f"SELECT id, commonname FROM public.players WHERE id IN ({p_ids_formatted})")
-            if not df_pl.empty:
-                player_map = dict(zip(df_pl['id'].astype(str), df_pl['commonname']))
-    
-    df_ev['Speler'] = df_ev['player_id_raw'].astype(str).map(player_map).fillna('Onbekend')
-    df_ev['PressingSpeler'] = df_ev['pressingPlayerId'].astype(str).map(player_map).fillna('-')
-
-    return df_ev
+# Ophalen + alle transformaties (xT, minuten, ids, coördinaten) gebeuren gevectoriseerd
+# in match_engine en worden per wedstrijd gecachet.
 
 # -----------------------------------------------------------------------------
 # 3. DATA OPHALEN OPSTELLINGEN
 # -----------------------------------------------------------------------------
-@st.cache_data
-def get_match_lineups(match_id):
-    q = 'SELECT "squadHome", "squadAway" FROM public.match_details_full WHERE id = %s'
-    df_details = run_query(q, (match_id,))
-    
-    if df_details.empty:
-        return None, None
-    
-    row = df_details.iloc[0]
-    
-    def parse_squad_json(squad_data):
-        if not squad_data: return {}
-        if isinstance(squad_data, str):
-            data = json.loads(squad_data)
-        else:
-            data = squad_data
-            
-        coach_id = data.get('coachId')
-        players_raw = data.get('players', [])
-        starting_raw = data.get('startingPositions', [])
-        
-        starters_map = {str(p['playerId']): p for p in starting_raw}
-        
-        roster = []
-        player_ids_to_fetch = []
-        
-        for p in players_raw:
-            pid = str(p['id'])
-            shirt = p.get('shirtNumber', '-')
-            player_ids_to_fetch.append(pid)
-            
-            if pid in starters_map:
-                role = "Basis"
-                pos = starters_map[pid].get('position', '?')
-                pos_side = starters_map[pid].get('positionSide', '')
-            else:
-                role = "Wissel"
-                pos = "Bank"
-                pos_side = ""
-            
-            roster.append({
-                'id': pid,
-                'shirt': shirt,
-                'role': role,
-                'position': pos,
-                'side': pos_side
-            })
-            
-        return {
-            'coachId': str(coach_id) if coach_id else None,
-            'roster': roster,
-            'ids': player_ids_to_fetch
-        }
-
-    home_parsed = parse_squad_json(row['squadHome'])
-    away_parsed = parse_squad_json(row['squadAway'])
-    
-    all_player_ids = home_parsed['ids'] + away_parsed['ids']
-    all_coach_ids = [x for x in [home_parsed['coachId'], away_parsed['coachId']] if x]
-    
-    p_map = {}
-    if all_player_ids:
-        clean_p_ids = [x for x in all_player_ids if x.isdigit()]
-        if clean_p_ids:
-            p_str = ", ".join(f"'{x}'" for x in clean_p_ids)
-            df_p = run_query(f"SELECT id, commonname FROM public.players WHERE id IN ({p_str})")
-            if not df_p.empty:
-                p_map = dict(zip(df_p['id'].astype(str), df_p['commonname']))
-
-    c_map = {}
-    if all_coach_ids:
-        clean_c_ids = [x for x in all_coach_ids if x.isdigit()]
-        if clean_c_ids:
-            c_str = ", ".join(f"'{x}'" for x in clean_c_ids)
-            try:
-                df_c = run_query(f"SELECT id, name FROM public.coaches WHERE id IN ({c_str})")
-                if not df_c.empty:
-                    c_map = dict(zip(df_c['id'].astype(str), df_c['name']))
-            except: pass
-
-    def enrich(parsed):
-        parsed['coachName'] = c_map.get(parsed['coachId'], 'Onbekend')
-        for p in parsed['roster']:
-            p['name'] = p_map.get(p['id'], 'Onbekend')
-        return parsed
-
-    return enrich(home_parsed), enrich(away_parsed)
-
+# Genormaliseerde lineups (met speelminuten) uit de lineup store; zie lineups.py.
 
 with st.spinner("Bezig met analyseren..."):
-    df_events = get_match_data_optimized(sel_match_id)
-    lineup_home, lineup_away = get_match_lineups(sel_match_id)
+    # Recente wedstrijden (< 24u) nog niet vastleggen in de event store: data kan nog wijzigen
+    is_final = pd.Timestamp(match_row['scheduledDate']).tz_localize(None) <= pd.Timestamp.now() - pd.Timedelta(hours=FINAL_AFTER_HOURS)
+    df_events = get_match_events(sel_match_id, match_row['homeSquadId'], persist=is_final)
+    df_lineup = match_lineup(sel_match_id, match_row['iterationId'])
 
 # -----------------------------------------------------------------------------
-# VERWERKING LOGICA (ROBUUST GEMAAKT)
+# VERWERKING LOGICA
 # -----------------------------------------------------------------------------
-# Als df_events leeg is, voeg de kolommen toe om errors te voorkomen
 if df_events.empty:
     st.warning("⚠️ Geen events data beschikbaar voor deze wedstrijd.")
-    cols_needed = [
-        "action", "result", "squadId", "xT_Team_Raw", "xT_Opp_Raw", 
-        "periodId", "distanceToOpponent", "pressure", "phase", 
-        "Team", "Speler", "PressingSpeler", "TijdString", "Minuut", 
-        "x_start", "y_start", "x_end", "y_end"
-    ]
-    for c in cols_needed:
-        if c not in df_events.columns:
-            df_events[c] = pd.Series(dtype='object')
-
-# Nu kunnen we veilig transformeren, zelfs als het leeg is
-df_events['action_clean'] = df_events['action'].astype(str).str.upper().str.strip()
-df_events['result_clean'] = df_events['result'].astype(str).str.upper().str.strip()
 home_id_str = normalize_id(match_row['homeSquadId'])
-df_events['squadId_clean'] = df_events['squadId'].apply(normalize_id)
-
-df_events['xT_Team_Raw'] = df_events['xT_Team_Raw'].fillna(0)
-df_events['xT_Opp_Raw'] = df_events['xT_Opp_Raw'].fillna(0)
-
-if not df_events.empty:
-    max_x = df_events['x_start'].max()
-    min_x = df_events['x_start'].min()
-    
-    # Als de data groter is dan 55 (dus waarschijnlijk 100 of 105) 
-    # EN er zijn geen negatieve waardes (dus 0 is de start), dan moeten we shiften.
-    if max_x > 55 and min_x >= 0:
-        # Aanname: Bron is 0-100 of 0-105. We schalen naar 105x68 meters.
-        # Factor berekenen (is de data 0-100 of 0-1 ?)
-        scale_x = 105.0 / 100.0 if max_x <= 100 else 1.0 # Als max rond 100 is, schaal iets op naar 105m
-        scale_y = 68.0 / 100.0 if df_events['y_start'].max() <= 100 else 1.0
-
-        # Formule: (Waarde - 50%) * Schaal
-        # Dit zet 0 om naar -52.5 en 100 om naar +52.5
-        # Let op: Soms moet Y omgedraaid worden (100-y), check dit in de app!
-        df_events['x_start'] = (df_events['x_start'] - 50) * (105/100)
-        df_events['y_start'] = (df_events['y_start'] - 50) * (68/100) # Pas aan naar (68/100) * -1 als het ondersteboven is
-        
-        # Doe hetzelfde voor end coordinates
-        df_events['x_end'] = (df_events['x_end'] - 50) * (105/100)
-        df_events['y_end'] = (df_events['y_end'] - 50) * (68/100)
-
-def calc_home_threat(row):
-    if row['squadId_clean'] == home_id_str:
-        return row['xT_Team_Raw'] - row['xT_Opp_Raw']
-    else:
-        return row['xT_Opp_Raw'] - row['xT_Team_Raw']
-
-df_events['Home_Net_Threat_State'] = df_events.apply(calc_home_threat, axis=1)
-df_events['xT_Generated_Raw'] = df_events['Home_Net_Threat_State'].shift(-1) - df_events['Home_Net_Threat_State']
-
-def calc_player_xt(row):
-    if pd.isna(row['xT_Generated_Raw']): return 0.0
-    if row['squadId_clean'] == home_id_str: return row['xT_Generated_Raw']
-    else: return -row['xT_Generated_Raw']
-
-df_events['xT_Generated_Player'] = df_events.apply(calc_player_xt, axis=1)
 
 team_colors = {match_row['home']: '#e74c3c', match_row['away']: '#3498db', 'Onbekend': '#95a5a6'} 
 result_colors = {'SUCCESS': '#2ecc71', 'FAIL': '#e74c3c', 'OFFSIDE': '#95a5a6', 'NONE': '#bdc3c7', 'nan': '#bdc3c7', '': '#bdc3c7'}
@@ -305,38 +225,35 @@ result_colors = {'SUCCESS': '#2ecc71', 'FAIL': '#e74c3c', 'OFFSIDE': '#95a5a6',
 # -----------------------------------------------------------------------------
 # 4. DASHBOARD TABS
 # -----------------------------------------------------------------------------
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["👥 Opstellingen", "📊 Stats & Tijdlijn", "📍 Pitch Map & Radar", "🏃 Spelers xT", "📋 Data"])
+tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs(["👥 Opstellingen", "📊 Stats & Tijdlijn", "📍 Pitch Map & Radar", "🏃 Spelers xT", "📋 Data", "🏆 Seizoen", "🔗 Passnetwerk", "🛡️ Pressing"])
 
 # --- TAB 1: OPSTELLINGEN ---
 with tab1:
     st.subheader("👥 Opstellingen")
-    if lineup_home and lineup_away:
+    if not df_lineup.empty:
         col_h, col_a = st.columns(2)
         def render_lineup(data, team_name, color):
             with st.container():
                 st.markdown(f"<h3 style='color:{color}'>{team_name}</h3>", unsafe_allow_html=True)
-                st.write(f"**Coach:** {data['coachName']}")
-                
+                st.write(f"**Coach:** {data['coachName'].iloc[0] if not data.empty else 'Onbekend'}")
+                lineup_cfg = {"shirt": "Nr.", "name": "Speler", "position": "Positie", "side": "Kant", "minutes": st.column_config.NumberColumn("Min.", format="%d")}
+
                 st.markdown("#### Basiself")
-                basis = [p for p in data['roster'] if p['role'] == 'Basis']
-                df_basis = pd.DataFrame(basis)
+                df_basis = data[data['starter']].rename(columns={'positionSide': 'side'})
                 if not df_basis.empty:
-                    df_basis = df_basis[['shirt', 'name', 'position', 'side']]
-                    st.dataframe(df_basis, hide_index=True, use_container_width=True)
+                    st.dataframe(df_basis[['shirt', 'name', 'position', 'side', 'minutes']], hide_index=True, use_container_width=True, column_config=lineup_cfg)
                 else:
                     st.write("Geen basiself gevonden.")
-                
+
                 st.markdown("#### Wissels")
-                bank = [p for p in data['roster'] if p['role'] == 'Wissel']
-                df_bank = pd.DataFrame(bank)
+                df_bank = data[~data['starter']].sort_values('minutes', ascending=False)
                 if not df_bank.empty:
-                    df_bank = df_bank[['shirt', 'name']]
-                    st.dataframe(df_bank, hide_index=True, use_container_width=True)
+                    st.dataframe(df_bank[['shirt', 'name', 'minutes']], hide_index=True, use_container_width=True, column_config=lineup_cfg)
                 else:
                     st.write("Geen wisselspelers gevonden.")
-        
-        with col_h: render_lineup(lineup_home, match_row['home'], team_colors.get(match_row['home'], 'black'))
-        with col_a: render_lineup(lineup_away, match_row['away'], team_colors.get(match_row['away'], 'black'))
+
+        with col_h: render_lineup(df_lineup[df_lineup['side'] == 'home'], match_row['home'], team_colors.get(match_row['home'], 'black'))
+        with col_a: render_lineup(df_lineup[df_lineup['side'] == 'away'], match_row['away'], team_colors.get(match_row['away'], 'black'))
     else:
         st.info("Geen opstellingsdata beschikbaar.")
 
@@ -386,6 +303,33 @@ with tab2:
             else:
                 st.info("Geen stats.")
 
+        st.divider()
+        st.subheader("📈 Momentum")
+        m_c1, m_c2 = st.columns([1, 3])
+        mom_window = m_c1.slider("Venster (min.)", 3, 15, 5, key="mom_window")
+        mom_view = m_c2.radio("Weergave", ["Rollend", "Cumulatief"], horizontal=True, key="mom_view")
+        df_mom, df_swings = get_match_momentum(sel_match_id, match_row['homeSquadId'], persist=is_final, window=mom_window)
+        if not df_mom.empty:
+            if mom_view == "Rollend":
+                vals = df_mom['Rollend Netto']
+                fig_mom = go.Figure(go.Bar(x=df_mom['Minuut'], y=vals, marker_color=np.where(vals >= 0, team_colors[match_row['home']], team_colors[match_row['away']]),
+                                           hovertemplate="Min. %{x}: %{y:.3f}<extra></extra>"))
+                fig_mom.update_layout(yaxis_title=f"Netto xT ({mom_window} min.) ↑ {match_row['home']} / ↓ {match_row['away']}")
+            else:
+                fig_mom = go.Figure([
+                    go.Scatter(x=df_mom['Minuut'], y=df_mom['Cum. Thuis'], name=match_row['home'], line=dict(color=team_colors[match_row['home']])),
+                    go.Scatter(x=df_mom['Minuut'], y=df_mom['Cum. Uit'], name=match_row['away'], line=dict(color=team_colors[match_row['away']])),
+                ])
+                fig_mom.update_layout(yaxis_title="Cumulatieve xT")
+            for g in df_swings[df_swings['Actie'].isin(['GOAL', 'OWN_GOAL'])].itertuples():
+                fig_mom.add_vline(x=g.Minuut, line_dash="dot", line_color="#2ecc71", annotation_text=f"⚽ {g.Speler}", annotation_position="top")
+            fig_mom.update_layout(height=350, xaxis_title="Minuut", margin=dict(t=30))
+            st.plotly_chart(fig_mom, use_container_width=True)
+            if not df_swings.empty:
+                with st.expander("🔀 Momentum rond goals, wissels en rode kaarten"):
+                    st.caption(f"Netto xT (thuisperspectief) in de {mom_window} minuten voor en na het moment.")
+                    st.dataframe(df_swings.style.format({'Minuut': '{:.0f}', 'Voor': '{:.3f}', 'Na': '{:.3f}', 'Swing': '{:+.3f}'}), use_container_width=True, hide_index=True)
+
         st.divider()
         c1, c2 = st.columns(2)
         with c1:
@@ -427,59 +371,46 @@ with tab3:
     if df_events.empty:
         st.info("Geen data.")
     else:
+        # Opties + bitsets per filterdimensie, één keer per wedstrijd berekend
+        f_idx = get_filter_index(sel_match_id, match_row['homeSquadId'], persist=is_final)
         c1, c2, c3, c4 = st.columns(4)
-        teams = df_events['Team'].unique()
+        teams = options(f_idx, 'team')
         sel_teams = c1.multiselect("Teams", teams, default=teams, key="pm_teams")
-        acts = df_events['action_clean'].unique()
+        acts = options(f_idx, 'action')
         def_acts = [x for x in ['SHOT','GOAL'] if x in acts]
         sel_acts = c2.multiselect("Acties", acts, default=def_acts, key="pm_acts")
-        periods = sorted(df_events['periodId'].astype(str).unique())
+        periods = options(f_idx, 'period')
         sel_period = c3.multiselect("Periode / Helft", periods, default=periods, key="pm_period")
-        plys = df_events['Speler'].unique()
-        sel_plys = c4.multiselect("Speler", plys, key="pm_plys")
-        
+        sel_plys = c4.multiselect("Speler", options(f_idx, 'player'), key="pm_plys")
+
         st.markdown("### Extra Filters & Opties")
         f_c1, f_c2, f_c3 = st.columns(3)
-        try:
-            dist_vals = df_events['distanceToOpponent'].dropna().unique()
-            dist_opts = sorted(dist_vals, key=lambda x: float(x))
-        except:
-            dist_opts = sorted(df_events['distanceToOpponent'].dropna().astype(str).unique())
-        sel_dist = f_c1.multiselect("Afstand tot Opponent", dist_opts, key="pm_dist")
-        
-        try:
-            pres_vals = df_events['pressure'].dropna().unique()
-            pres_opts = sorted(pres_vals, key=lambda x: float(x))
-        except:
-            pres_opts = sorted(df_events['pressure'].dropna().astype(str).unique())
-        sel_pres = f_c2.multiselect("Pressure", pres_opts, key="pm_pres")
-        
-        phases = sorted(df_events['phase'].dropna().astype(str).unique().tolist())
-        sel_phase = f_c3.multiselect("Spelfase", phases, key="pm_phase")
-        
+        sel_dist = f_c1.multiselect("Afstand tot Opponent", options(f_idx, 'distance'), key="pm_dist")
+        sel_pres = f_c2.multiselect("Pressure", options(f_idx, 'pressure'), key="pm_pres")
+        sel_phase = f_c3.multiselect("Spelfase", options(f_idx, 'phase'), key="pm_phase")
+
+        st.markdown("### Balbezit Filters")
+        k_c1, k_c2, k_c3 = st.columns(3)
+        sel_chain_end = k_c1.multiselect("Balbezit eindigt met", options(f_idx, 'chain_end'), key="pm_chain_end")
+        sel_chain_zone = k_c2.multiselect("Balbezit start in", options(f_idx, 'chain_zone'), key="pm_chain_zone")
+        min_chain_xt = k_c3.number_input("Min. xT winst balbezit", value=None, step=0.01, format="%.3f", key="pm_chain_xt")
+
         v_c1, v_c2 = st.columns(2)
         show_lines = v_c1.checkbox("Toon Pass/Looplijnen", value=False, key="pm_lines")
         color_mode = v_c2.radio("Kleur op basis van:", ["Team", "Resultaat (Succes/Fail)"], horizontal=True, key="pm_color")
 
-        # Filter
-        df_m = df_events[(df_events['Team'].isin(sel_teams)) & (df_events['action_clean'].isin(sel_acts))].copy() 
-        if sel_period: df_m = df_m[df_m['periodId'].astype(str).isin(sel_period)]
-        if sel_dist: df_m = df_m[df_m['distanceToOpponent'].isin(sel_dist)]
-        if sel_pres: df_m = df_m[df_m['pressure'].isin(sel_pres)]
-        if sel_phase: df_m = df_m[df_m['phase'].isin(sel_phase)]
-        if sel_plys: df_m = df_m[df_m['Speler'].isin(sel_plys)]
+        # Filter: teams en acties altijd (leeg = niets), de rest enkel als er iets gekozen is
+        mask = resolve(f_idx, {
+            'team': sel_teams, 'action': sel_acts, 'period': sel_period or None, 'player': sel_plys or None,
+            'distance': sel_dist or None, 'pressure': sel_pres or None, 'phase': sel_phase or None,
+            'chain_end': sel_chain_end or None, 'chain_zone': sel_chain_zone or None,
+        })
+        df_m = df_events[mask].copy()
+        if min_chain_xt is not None: df_m = df_m[df_m['chain_xt'] >= min_chain_xt]
         
         if not df_m.empty:
-            # --- 1. DE SCATTER MAP ---
-            fig = go.Figure()
-            # Veld
-            fig.add_shape(type="rect", x0=-52.5, y0=-34, x1=52.5, y1=34, line=dict(color="white"), fillcolor="#4CAF50", layer="below")
-            fig.add_shape(type="line", x0=0, y0=-34, x1=0, y1=34, line=dict(color="white"))
-            fig.add_shape(type="circle", x0=-9.15, y0=-9.15, x1=9.15, y1=9.15, line=dict(color="white"))
-            fig.add_shape(type="rect", x0=-52.5, y0=-20.16, x1=-36, y1=20.16, line=dict(color="white"))
-            fig.add_shape(type="rect", x0=-52.5, y0=-9.16, x1=-46.5, y1=9.16, line=dict(color="white"))
-            fig.add_shape(type="rect", x0=36, y0=-20.16, x1=52.5, y1=20.16, line=dict(color="white"))
-            fig.add_shape(type="rect", x0=46.5, y0=-9.16, x1=52.5, y1=9.16, line=dict(color="white"))
+            # --- 1. DE SCATTER MAP (WebGL) ---
+            fig = add_pitch(go.Figure())
 
             if color_mode == "Team":
                 groups = sel_teams
@@ -491,42 +422,24 @@ with tab3:
                 if color_mode == "Team":
                     d = df_m[df_m['Team'] == key]
                     color = team_colors.get(key, '#95a5a6')
-                    name_lbl = key
                 else:
                     d = df_m[df_m['result_plot'] == key]
                     color = result_colors.get(key, '#bdc3c7')
-                    name_lbl = key
 
                 if d.empty: continue
 
-                fig.add_trace(go.Scatter(
-                    x=d['x_start'], y=d['y_start'], mode='markers', name=name_lbl,
-                    marker=dict(color=color, size=8, line=dict(width=1,color='black')),
+                # Lijnen eerst, zodat de markers erboven liggen (één trace per groep)
+                if show_lines:
+                    fig.add_trace(line_trace(d, color))
+
+                fig.add_trace(marker_trace(
+                    d, key, color, size=8 if len(df_m) < 5000 else 5,
                     text=d['Speler'] + " (" + d['action'] + ") [" + d['result_clean'] + "]",
                     hovertemplate="%{text}<br>DistOpp: %{customdata[1]}<br>Press: %{customdata[2]}<br>Pressing Speler: %{customdata[3]}",
                     customdata=d[['TijdString', 'distanceToOpponent', 'pressure', 'PressingSpeler']]
                 ))
-                
-                if show_lines and len(d) < 2000:
-                    x_lines = []
-                    y_lines = []
-                    for _, row in d.iterrows():
-                        if pd.notnull(row['x_end']) and pd.notnull(row['y_end']):
-                            x_lines.extend([row['x_start'], row['x_end'], None])
-                            y_lines.extend([row['y_start'], row['y_end'], None])
-                    
-                    if x_lines:
-                        fig.add_trace(go.Scatter(
-                            x=x_lines, y=y_lines, mode='lines',
-                            line=dict(color=color, width=1), opacity=0.5, showlegend=False, hoverinfo='skip'
-                        ))
-
-            fig.update_layout(
-                width=800, height=550, 
-                xaxis=dict(visible=False, range=[-55, 55]), 
-                yaxis=dict(visible=False, range=[-36, 36], scaleanchor="x", scaleratio=1),
-                plot_bgcolor='rgba(0,0,0,0)', margin=dict(l=0, r=0, t=20, b=0)
-            )
+
+            pitch_layout(fig, fixed=False)
             st.plotly_chart(fig, use_container_width=True)
             
             # --- 2. DE SPIDER DIAGRAM ---
@@ -547,46 +460,17 @@ with tab3:
                 fig_rad.update_layout(polar=dict(radialaxis=dict(visible=True)), showlegend=True, height=500)
                 st.plotly_chart(fig_rad, use_container_width=True)
 
-# --- 3. DE NIEUWE HEATMAP ---
+            # --- 3. HEATMAP (GEBINNED) ---
             st.divider()
             st.subheader("🔥 Actie Heatmap")
-            st.caption("Dichtheid van de geselecteerde acties")
-            
-            fig_hm = go.Figure()
-            # Veld (Hetzelfde als hierboven)
-            fig_hm.add_shape(type="rect", x0=-52.5, y0=-34, x1=52.5, y1=34, line=dict(color="white"), fillcolor="#4CAF50", layer="below")
-            fig_hm.add_shape(type="line", x0=0, y0=-34, x1=0, y1=34, line=dict(color="white"))
-            fig_hm.add_shape(type="circle", x0=-9.15, y0=-9.15, x1=9.15, y1=9.15, line=dict(color="white"))
-            fig_hm.add_shape(type="rect", x0=-52.5, y0=-20.16, x1=-36, y1=20.16, line=dict(color="white"))
-            fig_hm.add_shape(type="rect", x0=-52.5, y0=-9.16, x1=-46.5, y1=9.16, line=dict(color="white"))
-            fig_hm.add_shape(type="rect", x0=36, y0=-20.16, x1=52.5, y1=20.16, line=dict(color="white"))
-            fig_hm.add_shape(type="rect", x0=46.5, y0=-9.16, x1=52.5, y1=9.16, line=dict(color="white"))
-
-            # Heatmap layer
-            # FIX: We hebben 'xaxis', 'yaxis' en 'reversescale' verwijderd om de ValueError te voorkomen.
-            # Wil je de kleuren omdraaien? Gebruik dan colorscale='Hot_r'
-            fig_hm.add_trace(go.Histogram2dContour(
-                x=df_m['x_start'],
-                y=df_m['y_start'],
-                colorscale='Hot', 
-                ncontours=15,
-                showscale=False,
-                opacity=0.7,
-                # Forceer de bins
-                autobinx=False,
-                xbins=dict(start=-52.5, end=52.5, size=5), 
-                autobiny=False,
-                ybins=dict(start=-34, end=34, size=5),
-                zsmooth='best' 
-            ))
-            
-            # Forceer de range van de plot
-            fig_hm.update_layout(
-                width=800, height=550, 
-                xaxis=dict(visible=False, range=[-55, 55], fixedrange=True),
-                yaxis=dict(visible=False, range=[-36, 36], scaleanchor="x", scaleratio=1, fixedrange=True),
-                plot_bgcolor='rgba(0,0,0,0)', margin=dict(l=0, r=0, t=20, b=0)
-            )
+            st.caption("Dichtheid van de geselecteerde acties (numpy.histogram2d; enkel het rooster gaat naar de browser)")
+            h_c1, h_c2 = st.columns(2)
+            hm_mode = h_c1.radio("Weergave", ["Raster", "Contour"], horizontal=True, key="pm_hm_mode")
+            hm_bin = h_c2.select_slider("Vakgrootte (m)", options=[2.5, 5.0, 7.5, 10.0], value=5.0, key="pm_hm_bin")
+
+            fig_hm = add_pitch(go.Figure())
+            fig_hm.add_trace(density_trace(df_m['x_start'], df_m['y_start'], mode=hm_mode, bin_size=hm_bin))
+            pitch_layout(fig_hm)
             st.plotly_chart(fig_hm, use_container_width=True)
 
         else:
@@ -612,6 +496,123 @@ with tab4:
 
 # --- TAB 5: DATA ---
 with tab5:
-    cols = ['Volgorde', 'periodId', 'Minuut', 'Team', 'Speler', 'PressingSpeler', 'action', 'result', 'distanceToOpponent', 'pressure', 'phase']
+    cols = ['Volgorde', 'periodId', 'Minuut', 'Team', 'Speler', 'PressingSpeler', 'action', 'result', 'distanceToOpponent', 'pressure', 'phase', 'possession_id', 'sequence_id', 'chain_xt', 'chain_end_action']
     existing_cols = [c for c in cols if c in df_events.columns]
     st.dataframe(df_events[existing_cols], use_container_width=True)
+
+# --- TAB 6: SEIZOEN LEADERBOARDS ---
+with tab6:
+    st.subheader(f"🏆 Seizoen Leaderboards: {sel_comp} {sel_season}")
+    st.caption("Uit de voorberekende seizoensaggregaten: elke wedstrijd wordt één keer verwerkt, nieuwe wedstrijden worden incrementeel toegevoegd.")
+    df_it = run_query('SELECT id FROM public.iterations WHERE season = %s AND "competitionName" = %s LIMIT 1', (sel_season, sel_comp))
+    if df_it.empty:
+        st.info("Geen iteratie gevonden.")
+    else:
+        season_it = str(df_it.iloc[0]['id'])
+        n_done, n_played = season_status(season_it)
+        c_s1, c_s2 = st.columns([3, 1])
+        c_s1.write(f"**{n_done}** van **{n_played}** gespeelde wedstrijden verwerkt.")
+        if c_s2.button("🔄 Nieuwe wedstrijden verwerken", disabled=n_done >= n_played):
+            bar = st.progress(0.0, text="Wedstrijden verwerken...")
+            def on_progress(i, total):
+                bar.progress(i / max(total, 1), text=f"Wedstrijd {i + 1}/{total}")
+            n_new = update_all_blocks(season_it, progress=on_progress)
+            bar.progress(1.0, text="Klaar")
+            st.success(f"{n_new} wedstrijd(en) toegevoegd.")
+
+        df_teams = team_leaderboard(season_it)
+        if df_teams.empty:
+            st.info("Nog geen seizoensaggregaten voor deze competitie.")
+        else:
+            lb1, lb2, lb3 = st.tabs(["🛡️ Teams", "🏃 Spelers", "🎯 Passes & Acties"])
+            fmt = {'xT': '{:.2f}', 'xT per Wedstrijd': '{:.3f}', 'Pass %': '{:.1f}'}
+            with lb1:
+                st.dataframe(df_teams.style.format(fmt, na_rep='-').background_gradient(subset=['xT per Wedstrijd'], cmap='Greens'), use_container_width=True, hide_index=True)
+                fig_lb = px.bar(df_teams.sort_values('xT per Wedstrijd'), x='xT per Wedstrijd', y='Team', orientation='h', title="xT per Wedstrijd")
+                st.plotly_chart(fig_lb, use_container_width=True)
+            with lb2:
+                df_pl = player_leaderboard(season_it)
+                l_c1, l_c2 = st.columns(2)
+                min_games = l_c1.slider("Minimum wedstrijden", 1, max(int(df_pl['Wedstrijden'].max()), 1), min(5, max(int(df_pl['Wedstrijden'].max()), 1)), key="lb_min_games")
+                sort_col = l_c2.selectbox("Sorteer op", ['xT', 'xT per Wedstrijd', 'Acties', 'Passes', 'Pass %', 'Schoten', 'Goals'], key="lb_sort")
+                df_pl = df_pl[df_pl['Wedstrijden'] >= min_games].sort_values(sort_col, ascending=False).head(50)
+                st.dataframe(df_pl.drop(columns='playerId').style.format(fmt, na_rep='-'), use_container_width=True, hide_index=True)
+            with lb3:
+                df_pt = pass_types(season_it)
+                if not df_pt.empty:
+                    sel_pt_team = st.selectbox("Team", sorted(df_pt['naam'].unique()), key="lb_pass_team")
+                    d_pt = df_pt[df_pt['naam'] == sel_pt_team]
+                    fig_pt = px.bar(d_pt.melt(id_vars=['action'], value_vars=['Totaal', 'Succes'], var_name='Status', value_name='Aantal'),
+                                    x='action', y='Aantal', color='Status', barmode='group',
+                                    color_discrete_map={'Totaal': '#95a5a6', 'Succes': '#2ecc71'}, title=f"Passes per type: {sel_pt_team}")
+                    st.plotly_chart(fig_pt, use_container_width=True)
+                    df_ac = action_counts(season_it)
+                    piv_ac = df_ac[df_ac['naam'] == sel_pt_team].pivot_table(index='action', columns='result', values='n', aggfunc='sum', fill_value=0)
+                    piv_ac['Totaal'] = piv_ac.sum(axis=1)
+                    st.dataframe(piv_ac.sort_values('Totaal', ascending=False), use_container_width=True)
+
+# --- TAB 7: PASSNETWERK ---
+with tab7:
+    st.subheader("🔗 Passnetwerk")
+    st.caption("Ontvanger = speler van het volgende event van dezelfde ploeg na een geslaagde pass. Positie = gemiddelde x/y van alle acties van de speler.")
+    n_c1, n_c2, n_c3, n_c4 = st.columns(4)
+    net_side = n_c1.radio("Team", [match_row['home'], match_row['away']], horizontal=True, key="net_team")
+    net_scope = n_c2.radio("Bereik", ["Wedstrijd", "Seizoen"], horizontal=True, key="net_scope")
+    net_min = n_c3.slider("Min. passes per lijn", 1, 15, 3 if net_scope == "Wedstrijd" else 10, key=f"net_min_{net_scope}")
+    net_top = n_c4.slider("Aantal spelers", 8, 20, 14, key="net_top")
+    net_squad = normalize_id(match_row['homeSquadId'] if net_side == match_row['home'] else match_row['awaySquadId'])
+
+    if net_scope == "Wedstrijd":
+        df_edges, df_nodes = get_match_network(sel_match_id, match_row['homeSquadId'], persist=is_final)
+        df_edges, df_nodes = df_edges[df_edges['squadId'] == net_squad], df_nodes[df_nodes['squadId'] == net_squad]
+    else:
+        df_edges, df_nodes, n_net = season_network(match_row['iterationId'], net_squad)
+        if df_nodes is None or df_nodes.empty:
+            st.info("Nog geen seizoensnetwerk: verwerk eerst de wedstrijden in de tab 🏆 Seizoen.")
+        else:
+            st.write(f"Gebaseerd op **{n_net}** verwerkte wedstrijden.")
+
+    if df_nodes is not None and not df_nodes.empty:
+        color = team_colors.get(net_side, '#95a5a6')
+        st.plotly_chart(network_figure(df_edges, df_nodes, color, min_passes=net_min, top_players=net_top), use_container_width=True)
+        st.markdown("#### Sterkste combinaties")
+        top_links = df_edges.sort_values('n', ascending=False).head(15)[['Passer', 'Ontvanger', 'n', 'xt']]
+        st.dataframe(top_links.rename(columns={'n': 'Passes', 'xt': 'xT'}), use_container_width=True, hide_index=True,
+                     column_config={"xT": st.column_config.NumberColumn(format="%.3f")})
+    elif net_scope == "Wedstrijd":
+        st.info("Geen passdata voor deze ploeg.")
+
+# --- TAB 8: PRESSING ---
+with tab8:
+    st.subheader("🛡️ Pressing")
+    st.caption(f"Pressing = balactie van de tegenstander met een pressende speler. Herovering = balbezit binnen {REGAIN_WINDOW} acties. PPDA = passes tegenstander op hun eerste 60% / eigen verdedigende acties daar (lager = intensiever).")
+    pct_fmt = {c: '{:.1f}' for c in ['Herovering %', 'Gem. Hoogte (m)', '% Eigen derde', '% Middenveld', '% Laatste derde']}
+    ratio_fmt = {'Pressings per Wedstrijd': '{:.1f}', 'Pressings per Verd. Actie': '{:.2f}', 'PPDA': '{:.2f}'}
+    df_press = get_match_pressing(sel_match_id, match_row['homeSquadId'], persist=is_final)
+    if df_press.empty:
+        st.info("Geen pressingdata voor deze wedstrijd.")
+    else:
+        df_pt_team = summarise_pressing(df_press, 'team').drop(columns=['entityId', 'Wedstrijden', 'Pressings per Wedstrijd'])
+        st.dataframe(df_pt_team.style.format({**pct_fmt, **ratio_fmt}, na_rep='-'), use_container_width=True, hide_index=True)
+        df_pp = summarise_pressing(df_press, 'player').drop(columns=['entityId', 'Wedstrijden', 'Pressings per Wedstrijd'])
+        p_c1, p_c2 = st.columns([2, 3])
+        with p_c1:
+            st.markdown("#### Spelers")
+            st.dataframe(df_pp.sort_values('Pressings', ascending=False).style.format(pct_fmt, na_rep='-'), use_container_width=True, hide_index=True)
+        with p_c2:
+            zone_long = df_pt_team.melt(id_vars=['Team'], value_vars=['% Eigen derde', '% Middenveld', '% Laatste derde'], var_name='Zone', value_name='%')
+            fig_pz = px.bar(zone_long, x='Zone', y='%', color='Team', barmode='group', color_discrete_map=team_colors, title="Pressinghoogte per zone")
+            st.plotly_chart(fig_pz, use_container_width=True)
+
+    st.divider()
+    st.markdown(f"#### Competitievergelijking: {sel_comp} {sel_season}")
+    df_ps = season_pressing(match_row['iterationId'])
+    if df_ps.empty:
+        st.info("Nog geen seizoensdata: verwerk eerst de wedstrijden in de tab 🏆 Seizoen.")
+    else:
+        df_ps = df_ps.drop(columns='entityId').sort_values('PPDA')
+        st.dataframe(df_ps.style.format({**pct_fmt, **ratio_fmt}, na_rep='-').background_gradient(subset=['Herovering %'], cmap='Greens'), use_container_width=True, hide_index=True)
+        fig_ppda = px.scatter(df_ps, x='PPDA', y='Gem. Hoogte (m)', text='Team', size='Pressings per Wedstrijd', title="PPDA vs. pressinghoogte")
+        fig_ppda.update_traces(textposition='top center')
+        fig_ppda.update_xaxes(autorange='reversed')
+        st.plotly_chart(fig_ppda, use_container_width=True)
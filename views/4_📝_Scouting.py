@@ -1,8 +1,8 @@
 import streamlit as st
 import pandas as pd
-import json
 import datetime
 from utils import run_query, init_connection
+from lineups import match_lineup
 
 st.set_page_config(page_title="Live Speler Scouting", page_icon="📝", layout="wide")
 
@@ -236,28 +236,13 @@ st.sidebar.write(f"👤 **Scout:** {current_scout_name}")
 df_players = pd.DataFrame()
 players_list = []
 
-# A. Officiele Spelers uit Match Details JSON
+# A. Officiele Spelers uit de genormaliseerde lineups (zie lineups.py)
 if selected_match_id:
-    df_json = run_query('SELECT "squadHome", "squadAway" FROM public.match_details_full WHERE "id" = %s', params=(selected_match_id,))
-    if df_json is not None and not df_json.empty:
-        for side in ['Home', 'Away']:
-            raw_data = df_json.iloc[0][f'squad{side}']
-            # Verwerk JSON ongeacht of het als string of dict uit de DB komt
-            data = json.loads(raw_data) if isinstance(raw_data, str) else raw_data
-            
-            if data and isinstance(data, dict) and 'players' in data:
-                for p in data['players']:
-                    p_id = p.get('id')
-                    if p_id:
-                        # Probeer verschillende mogelijke naam-velden uit de JSON
-                        p_name = p.get('name') or p.get('shortName') or p.get('commonName') or p.get('commonname')
-                        players_list.append({
-                            'player_id': str(p_id), 
-                            'shirt_number': p.get('shirtNumber', p.get('shirt_number', 0)), 
-                            'side': side.lower(), 
-                            'source': 'official',
-                            'commonname': p_name # Kan None zijn, herstellen we in stap D
-                        })
+    df_lu = match_lineup(selected_match_id, selected_comp_id)
+    if not df_lu.empty:
+        df_lu = df_lu.assign(player_id=df_lu['playerId'].astype(str), shirt_number=df_lu['shirt'].fillna(0).astype(int),
+                             source='official', commonname=df_lu['name'].replace('Onbekend', None))
+        players_list += df_lu[['player_id', 'shirt_number', 'side', 'source', 'commonname']].to_dict('records')
 
 # B. Reeds gerapporteerde spelers uit de database (Extra spelers)
 q_rep = """
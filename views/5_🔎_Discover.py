@@ -1,7 +1,13 @@
 import streamlit as st
-import plotly.express as px
 import pandas as pd
-from utils import run_query
+import numpy as np
+from utils import run_query, KVK_PROFILES
+from percentiles import get_percentiles_bulk
+from league_strength import adjust_scores, strength_map
+from season_profiles import merge_season_scores
+from query_builder import normalise_filters
+from discover_data import score_columns, filter_options, discover_frame, scatter_figure, RENDER_MODES, WEBGL_THRESHOLD, MAX_POINTS, \
+    get_discover_cube, cube_mask, cube_frame, season_delta
 
 # -----------------------------------------------------------------------------
 # 1. SETUP & CONFIGURATIE
@@ -13,82 +19,111 @@ st.title("🔎 Discover & Data Visualisatie")
 # 2. CUSTOM SIDEBAR (Specifiek voor Discover)
 # -----------------------------------------------------------------------------
 st.sidebar.header("1. Selecteer Data")
+multi_season = st.sidebar.toggle("🗂️ Meerdere seizoenen", key="disc_multi",
+                                 help="Seizoensoverschrijdend uit de voorberekende Discover cube (Admin → Data Onderhoud).")
+
+if multi_season:
+    # A. Seizoenen en competities uit de cube (index-maskers, geen queries)
+    cube = get_discover_cube()
+    if cube is None:
+        st.warning("De Discover cube is nog niet opgebouwd (Admin → Data Onderhoud).")
+        st.stop()
+    cube_seasons = sorted(set(cube['iter_season'].tolist()), reverse=True)
+    sel_seasons = st.sidebar.multiselect("Seizoenen:", cube_seasons, default=cube_seasons[:2])
+    comp_choices = sorted(set(cube['iter_comp'][np.isin(cube['iter_season'], sel_seasons)].tolist()))
+    sel_comps = st.sidebar.multiselect("Competities (leeg = alles):", comp_choices)
+    if not sel_seasons:
+        st.warning("Kies minstens één seizoen.")
+        st.stop()
+    cube_sel = cube_mask(cube, seasons=sel_seasons, competitions=sel_comps)
+
+    # B. Delta tussen twee seizoenen en kleur
+    use_delta = st.sidebar.checkbox("Δ tussen seizoenen", value=False, disabled=len(sel_seasons) < 2,
+                                    help="Assen = verschil van het seizoensgemiddelde per speler (enkel spelers in beide seizoenen).")
+    if use_delta and len(sel_seasons) >= 2:
+        ordered = sorted(sel_seasons)
+        season_from = st.sidebar.selectbox("Van:", ordered, index=0)
+        season_to = st.sidebar.selectbox("Naar:", ordered, index=len(ordered) - 1)
+    else:
+        use_delta = False
+    color_by = st.sidebar.radio("Kleur op:", ["Seizoen", "Team", "Competitie"], horizontal=True)
+    adjust_league = st.sidebar.checkbox("⚖️ Corrigeer voor competitiesterkte", value=False, disabled=not strength_map() or use_delta,
+                                        help="Telt de geschatte sterkte van de competitie op bij de KVK profielscores.")
+    merge_season = False
+    selected_season = f"{season_from} → {season_to}" if use_delta else ", ".join(sorted(sel_seasons))
+    selected_comp_name = ", ".join(sel_comps) if sel_comps else "Alle Competities"
+    st.sidebar.divider()
+else:
+    color_by, use_delta = 'Team', False
 
-# A. Seizoen (Verplicht)
-season_query = "SELECT DISTINCT season FROM public.iterations ORDER BY season DESC;"
-try:
-    df_seasons = run_query(season_query)
-    seasons_list = df_seasons['season'].tolist()
+    # A. Seizoen (Verplicht)
+    season_query = "SELECT DISTINCT season FROM public.iterations ORDER BY season DESC;"
+    try:
+        df_seasons = run_query(season_query)
+        seasons_list = df_seasons['season'].tolist()
     
-    # Sessie status behouden als die er is
-    idx = 0
-    if "sb_season" in st.session_state and st.session_state.sb_season in seasons_list:
-        idx = seasons_list.index(st.session_state.sb_season)
+        # Sessie status behouden als die er is
+        idx = 0
+        if "sb_season" in st.session_state and st.session_state.sb_season in seasons_list:
+            idx = seasons_list.index(st.session_state.sb_season)
     
-    selected_season = st.sidebar.selectbox("Seizoen:", seasons_list, index=idx, key="sb_season")
-except Exception as e:
-    st.error("Kon seizoenen niet laden.")
-    st.stop()
+        selected_season = st.sidebar.selectbox("Seizoen:", seasons_list, index=idx, key="sb_season")
+    except Exception as e:
+        st.error("Kon seizoenen niet laden.")
+        st.stop()
+
+    # B. Competitie (Optioneel)
+    iter_query = """
+        SELECT id, "competitionName" 
+        FROM public.iterations 
+        WHERE season = %s 
+        ORDER BY "competitionName"
+    """
+    df_iters = run_query(iter_query, params=(selected_season,))
 
-# B. Competitie (Optioneel)
-iter_query = """
-    SELECT id, "competitionName" 
-    FROM public.iterations 
-    WHERE season = %s 
-    ORDER BY "competitionName"
-"""
-df_iters = run_query(iter_query, params=(selected_season,))
-
-if df_iters.empty:
-    st.warning("Geen competities gevonden voor dit seizoen.")
-    st.stop()
+    if df_iters.empty:
+        st.warning("Geen competities gevonden voor dit seizoen.")
+        st.stop()
 
-# Opties: "Alle Competities" + specifieke competities
-comp_options = ["Alle Competities"] + df_iters['competitionName'].tolist()
-selected_comp_name = st.sidebar.selectbox("Competitie:", comp_options)
+    # Opties: "Alle Competities" + specifieke competities
+    comp_options = ["Alle Competities"] + df_iters['competitionName'].tolist()
+    selected_comp_name = st.sidebar.selectbox("Competitie:", comp_options)
 
-# C. Bepaal welke IDs we ophalen
-if selected_comp_name == "Alle Competities":
-    target_ids = df_iters['id'].tolist() # Alles van dit seizoen
-    st.sidebar.caption(f"Data van {len(target_ids)} competities.")
-else:
-    target_ids = df_iters[df_iters['competitionName'] == selected_comp_name]['id'].tolist()
+    # C. Bepaal welke IDs we ophalen
+    if selected_comp_name == "Alle Competities":
+        target_ids = df_iters['id'].tolist() # Alles van dit seizoen
+        st.sidebar.caption(f"Data van {len(target_ids)} competities.")
+    else:
+        target_ids = df_iters[df_iters['competitionName'] == selected_comp_name]['id'].tolist()
+
+    target_ids_tuple = tuple(str(x) for x in target_ids)
 
-target_ids_tuple = tuple(str(x) for x in target_ids)
-st.sidebar.divider()
+    # D. Competitiesterkte (voorberekend): maakt scores uit verschillende competities vergelijkbaar
+    adjust_league = st.sidebar.checkbox("⚖️ Corrigeer voor competitiesterkte", value=False, disabled=not strength_map(),
+                                        help="Telt de geschatte sterkte van de competitie op bij de KVK profielscores.")
+    merge_season = st.sidebar.checkbox("👤 Eén rij per speler (seizoensaggregaat)", value=selected_comp_name == "Alle Competities",
+                                       help="Spelers met meerdere iteraties in dit seizoen worden samengevoegd tot één minuten-gewogen profiel.")
+    st.sidebar.divider()
 
 # -----------------------------------------------------------------------------
 # 3. DATA OPHALEN
 # -----------------------------------------------------------------------------
-@st.cache_data
-def get_analysis_data(ids_tuple):
-    # We joinen iterations om de competitienaam te hebben
-    query = """
-        SELECT 
-            p.commonname as "Naam", 
-            sq.name as "Team", 
-            i."competitionName" as "Competitie",
-            a.* FROM analysis.final_impect_scores a
-        JOIN public.players p ON a."playerId" = p.id
-        LEFT JOIN public.squads sq ON a."squadId" = sq.id
-        JOIN public.iterations i ON a."iterationId" = i.id
-        WHERE a."iterationId" IN %s
-    """
-    return run_query(query, params=(ids_tuple,))
+# Eerst enkel de opties voor de filters (posities, teams); de rijen zelf worden pas
+# opgehaald met de filters als predicaat en enkel de gekozen assen als scorekolommen
+df_opts = cube_frame(cube, cube_sel, []) if multi_season else filter_options(target_ids_tuple)
 
-df = get_analysis_data(target_ids_tuple)
-
-if df.empty:
+if df_opts.empty:
     st.warning("Geen data gevonden.")
     st.stop()
 
 # -----------------------------------------------------------------------------
 # 4. GRAFIEK INSTELLINGEN
 # -----------------------------------------------------------------------------
-# Filter kolommen (geen IDs of tekst)
-exclude_cols = ['playerId', 'squadId', 'iterationId', 'Naam', 'Team', 'Competitie', 'position', 'birthdate']
-numeric_cols = [c for c in df.columns if c not in exclude_cols and pd.api.types.is_numeric_dtype(df[c])]
-numeric_cols.sort()
+# Scorekolommen uit het schema (of de cube): geen data nodig om de lijst te tonen
+numeric_cols = cube['columns'].tolist() if multi_season else score_columns()
+if not numeric_cols:
+    st.warning("Geen scorekolommen gevonden.")
+    st.stop()
 
 # We verdelen de ruimte nu in 3 kolommen i.p.v. 4
 c1, c2, c3 = st.columns(3)
@@ -102,18 +137,40 @@ with c1:
 
 with c2:
     st.markdown("##### 🕵️ Filter Positie")
-    if 'position' in df.columns:
-        positions = ["Alle"] + sorted(df['position'].dropna().unique().tolist())
-        sel_pos = st.selectbox("Kies positie:", positions)
-        if sel_pos != "Alle":
-            df = df[df['position'] == sel_pos]
+    positions = ["Alle"] + sorted(df_opts['position'].dropna().unique().tolist())
+    sel_pos = st.selectbox("Kies positie:", positions)
 
 with c3:
     st.markdown("##### 🛡️ Filter Teams")
-    all_teams = sorted(df['Team'].dropna().unique().tolist())
+    all_teams = sorted(df_opts['Team'].dropna().unique().tolist())
     sel_teams = st.multiselect("Specifieke teams (leeg = alles):", all_teams)
-    if sel_teams:
-        df = df[df['Team'].isin(sel_teams)]
+
+# Enkel de gekozen assen ophalen (elke kolom apart gecachet, of uit de cube)
+axis_cols = list(dict.fromkeys([x_axis, y_axis]))
+if use_delta:
+    df = season_delta(cube, cube_sel, axis_cols, season_from, season_to)
+    x_axis, y_axis = f"Δ {x_axis}", f"Δ {y_axis}"
+elif multi_season:
+    df = cube_frame(cube, cube_sel, axis_cols)
+else:
+    # Positie en teams als predicaat naar de database (gecachet op de genormaliseerde filters)
+    filters = normalise_filters({
+        'iterations': target_ids_tuple,
+        'positions': [sel_pos] if sel_pos != "Alle" else None,
+        'squads': df_opts.loc[df_opts['Team'].isin(sel_teams), 'squadId'].tolist(),
+    })
+    df = discover_frame(filters, axis_cols)
+
+# Cube: filteren in het geheugen
+if multi_season:
+    if sel_pos != "Alle": df = df[df['position'] == sel_pos]
+    if sel_teams: df = df[df['Team'].isin(sel_teams)]
+
+kvk_cols = [c for c in axis_cols if c in KVK_PROFILES and not use_delta]
+if merge_season:
+    df = merge_season_scores(df, kvk_cols, season=selected_season, adjust=adjust_league)
+elif adjust_league:
+    df = adjust_scores(df, kvk_cols)
 
 # -----------------------------------------------------------------------------
 # 5. VISUALISATIE
@@ -125,32 +182,32 @@ if not df.empty:
     chart_title = f"{x_axis} vs {y_axis} | {selected_season}"
     if selected_comp_name != "Alle Competities":
         chart_title += f" ({selected_comp_name})"
-
-    fig = px.scatter(
-        df, 
-        x=x_axis, 
-        y=y_axis, 
-        color='Team',  # Standaard altijd kleuren op Team
-        hover_data=['Naam', 'Team', 'Competitie', 'position'], 
-        title=chart_title,
-        height=700,
-        template="plotly_white",
-        text='Naam' if len(df) < 50 else None # Namen tonen bij kleine selecties
-    )
-    
-    # Styling
-    fig.update_traces(
-        marker=dict(size=12, line=dict(width=1, color='DarkSlateGrey')),
-        textposition='top center'
-    )
-    
+    if adjust_league:
+        chart_title += " | competitie-gecorrigeerd"
+
+    # Percentiel binnen positie & competitie in de hover (uit de voorberekende cube, geen extra queries)
+    df = df.copy()
+    pct_cols = []
+    for axis_col in dict.fromkeys([x_axis, y_axis]):
+        if axis_col in KVK_PROFILES:
+            pct_col = f"{axis_col} (pct)"
+            df[pct_col] = np.nan
+            for it, idx in df.groupby('iterationId').groups.items():
+                df.loc[idx, pct_col] = get_percentiles_bulk(it, df.loc[idx, 'playerId'], axis_col, build_missing=False)
+            pct_cols.append(pct_col)
+
+    render_mode = st.radio("Weergave", RENDER_MODES, horizontal=True, key="disc_render",
+                           help=f"Automatisch: vanaf {WEBGL_THRESHOLD} spelers WebGL met één trace; boven {MAX_POINTS} een steekproef.")
+    fig, n_shown = scatter_figure(df, x_axis, y_axis, chart_title, pct_cols, mode=render_mode, color=color_by)
+    if n_shown < len(df):
+        st.caption(f"{n_shown} van {len(df)} spelers getoond (steekproef of zonder waarde).")
     st.plotly_chart(fig, use_container_width=True)
 
     # -------------------------------------------------------------------------
     # 6. DETAIL TABEL
     # -------------------------------------------------------------------------
     with st.expander("📄 Bekijk bron data van selectie"):
-        show_cols = ['Naam', 'Team', 'position', 'Competitie', x_axis, y_axis]
+        show_cols = list(dict.fromkeys(['Naam', 'Team', 'position', 'Competitie'] + (['Seizoen'] if multi_season else []) + [x_axis, y_axis]))
         st.dataframe(
             df[show_cols].sort_values(by=x_axis, ascending=False),
             use_container_width=True
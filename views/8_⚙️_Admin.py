@@ -1,6 +1,15 @@
 import streamlit as st
 import pandas as pd
 from utils import run_query, init_connection
+from crosswalk import refresh_crosswalk, load_crosswalk
+from percentiles import refresh_cubes
+from discover_data import refresh_discover_cube
+from age_curves import fit_curves, curves_info
+from league_strength import fit_strength, strength_info
+from season_profiles import refresh_season_profiles
+from event_store import refresh_event_store
+from lineups import refresh_lineups
+from season_events import refresh_season_blocks
 
 st.set_page_config(page_title="Admin Panel", page_icon="⚙️", layout="wide")
 
@@ -48,7 +57,7 @@ def execute_command(query, params=None):
 # -----------------------------------------------------------------------------
 # 3. TABS
 # -----------------------------------------------------------------------------
-tab1, tab2 = st.tabs(["👤 Gebruikers Beheer", "🎯 Shortlists Beheer"])
+tab1, tab2, tab3 = st.tabs(["👤 Gebruikers Beheer", "🎯 Shortlists Beheer", "🧮 Data Onderhoud"])
 
 # =============================================================================
 # TAB 1: GEBRUIKERS (TABEL: scouting.gebruikers)
@@ -159,3 +168,119 @@ with tab2:
             st.info("Geen shortlists gevonden.")
     except Exception as e:
         st.error(f"Fout bij laden shortlists: {e}")
+
+# =============================================================================
+# TAB 3: DATA ONDERHOUD (BATCH JOBS)
+# =============================================================================
+with tab3:
+    st.header("🔗 Speler ID Crosswalk")
+    st.caption("Koppelt Impect ID's aan SkillCorner ID's en legacy namen (scouting.player_id_crosswalk). Enkel nieuwe of gewijzigde spelers worden geschreven.")
+
+    maps = load_crosswalk()
+    c1, c2 = st.columns(2)
+    c1.metric("SkillCorner koppelingen", len(maps["skillcorner"]))
+    c2.metric("Legacy namen", len(maps["legacy"]))
+
+    if st.button("🔄 Crosswalk Bijwerken"):
+        with st.spinner("Crosswalk bijwerken..."):
+            res = refresh_crosswalk()
+        if res is not None:
+            st.success(f"Klaar: {res['spelers']} spelers en {res['legacy']} legacy koppelingen bijgewerkt.")
+
+    st.divider()
+    st.header("📊 Percentiel Cube")
+    st.caption("Percentielen en positie-gemiddelden per iteratie voor alle metrieken, KPIs en KVK profielen. Enkel iteraties met gewijzigde data worden herberekend.")
+
+    if st.button("🔄 Percentielen Bijwerken"):
+        bar = st.progress(0.0, text="Fingerprints controleren...")
+        def on_progress(i, total, it):
+            bar.progress(i / max(total, 1), text=f"Iteratie {it} ({i + 1}/{total})")
+        done = refresh_cubes(progress=on_progress)
+        bar.progress(1.0, text="Klaar")
+        st.success(f"{len(done)} iteratie(s) herberekend." if done else "Alles was al up-to-date.")
+
+    st.divider()
+    st.header("🗂️ Discover Cube")
+    st.caption("Alle scorekolommen van alle iteraties als compacte float32 arrays, voor de seizoensoverschrijdende modus van Discover. Enkel iteraties met gewijzigde data worden opnieuw opgehaald.")
+
+    if st.button("🔄 Discover Cube Bijwerken"):
+        bar = st.progress(0.0, text="Fingerprints controleren...")
+        def on_cube_progress(i, total):
+            bar.progress(i / max(total, 1), text=f"Iteraties {i + 1}-{min(i + 10, total)} van {total}")
+        done = refresh_discover_cube(progress=on_cube_progress)
+        bar.progress(1.0, text="Klaar")
+        st.success(f"{len(done)} iteratie(s) opgehaald." if done else "Alles was al up-to-date.")
+
+    st.divider()
+    st.header("📈 Leeftijdscurves")
+    st.caption("Verwachte evolutie van KVK profielen en metrieken per positie en leeftijd, gefit op alle spelers met meerdere seizoenen. Gebruikt voor de projecties (+1/+2 seizoenen).")
+
+    info = curves_info()
+    if info: st.write(f"Laatste fit: **{info.get('fitted_at', '-')}** ({info.get('observations', 0):,} seizoensovergangen)")
+
+    if st.button("🔄 Curves Fitten"):
+        status = st.empty()
+        n_pos, n_items, n_obs = fit_curves(progress=lambda msg: status.info(msg))
+        status.empty()
+        st.success(f"Klaar: {n_items} items voor {n_pos} posities ({n_obs:,} seizoensovergangen).")
+
+    st.divider()
+    st.header("⚖️ Competitiesterkte")
+    st.caption("Sterkte-coëfficiënt per iteratie, geschat uit spelers die in meerdere competities voorkomen. Gebruikt voor de competitie-gecorrigeerde modus in Discover, Vergelijkbare Spelers en Profiellijsten.")
+
+    info = strength_info()
+    if info: st.write(f"Laatste fit: **{info.get('fitted_at', '-')}** ({info.get('pairs', 0):,} vergelijkingen)")
+
+    if st.button("🔄 Sterkte Berekenen"):
+        status = st.empty()
+        n_its, n_pairs = fit_strength(progress=lambda msg: status.info(msg))
+        status.empty()
+        st.success(f"Klaar: {n_its} iteraties op basis van {n_pairs:,} vergelijkingen.")
+
+    st.divider()
+    st.header("👤 Seizoensaggregaten")
+    st.caption("Eén minuten-gewogen profiel (KVK, metrieken, KPIs) per speler per seizoen, voor spelers die in meerdere iteraties voorkomen. Enkel seizoenen met gewijzigde data worden herberekend.")
+
+    if st.button("🔄 Seizoensaggregaten Bijwerken"):
+        bar = st.progress(0.0, text="Fingerprints controleren...")
+        def on_season_progress(i, total, season):
+            bar.progress(i / max(total, 1), text=f"Seizoen {season} ({i + 1}/{total})")
+        done = refresh_season_profiles(progress=on_season_progress)
+        bar.progress(1.0, text="Klaar")
+        st.success(f"{len(done)} seizoen(en) herberekend." if done else "Alles was al up-to-date.")
+
+    st.divider()
+    st.header("🏟️ Event Store")
+    st.caption("Events per wedstrijd als lokaal Feather bestand (memory-mapped gelezen door Wedstrijden en de seizoensanalyses). Enkel wedstrijden die nog niet gematerialiseerd zijn worden uit Postgres gehaald.")
+
+    if st.button("🔄 Event Store Aanvullen"):
+        bar = st.progress(0.0, text="Gespeelde wedstrijden ophalen...")
+        def on_match_progress(i, total):
+            bar.progress(i / max(total, 1), text=f"Wedstrijden {i + 1}-{min(i + 20, total)} van {total}")
+        n_new = refresh_event_store(progress=on_match_progress)
+        bar.progress(1.0, text="Klaar")
+        st.success(f"{n_new} nieuwe wedstrijd(en) gematerialiseerd." if n_new else "Alles was al up-to-date.")
+
+    st.divider()
+    st.header("👥 Opstellingen")
+    st.caption("Lineup JSON van elke wedstrijd als genormaliseerde tabel (speler, rugnummer, basis/bank, positie, coach) met speelminuten uit de wissels. Per competitie worden enkel nieuwe wedstrijden verwerkt; de seizoensaggregaten gebruiken deze minuten als gewicht.")
+
+    if st.button("🔄 Opstellingen Bijwerken"):
+        bar = st.progress(0.0, text="Gespeelde wedstrijden ophalen...")
+        def on_lineup_progress(i, total, it):
+            bar.progress(i / max(total, 1), text=f"Iteratie {it} ({i + 1}/{total})")
+        n_new = refresh_lineups(progress=on_lineup_progress)
+        bar.progress(1.0, text="Klaar")
+        st.success(f"{n_new} nieuwe wedstrijd(en) verwerkt." if n_new else "Alles was al up-to-date.")
+
+    st.divider()
+    st.header("🗺️ Seizoensblokken")
+    st.caption("Leaderboards, passnetwerken, pressing en zonegrids (16x12 rooster per speler en ploeg) voor alle competities. Elke nieuwe wedstrijd wordt één keer geladen en aan alle blokken toegevoegd die hem nog missen.")
+
+    if st.button("🔄 Seizoensblokken Bijwerken"):
+        bar = st.progress(0.0, text="Gespeelde wedstrijden ophalen...")
+        def on_grid_progress(i, total, it):
+            bar.progress(i / max(total, 1), text=f"Iteratie {it} ({i + 1}/{total})")
+        n_new = refresh_season_blocks(progress=on_grid_progress)
+        bar.progress(1.0, text="Klaar")
+        st.success(f"{n_new} nieuwe wedstrijd(en) verwerkt." if n_new else "Alles was al up-to-date.")
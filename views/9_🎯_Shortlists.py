@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 from utils import run_query, init_connection
+from dossier_export import export_dossiers_zip
 
 st.set_page_config(page_title="Shortlist Manager", page_icon="🎯", layout="wide")
 
@@ -104,7 +105,7 @@ with c2:
 st.divider()
 
 if selected_list_id:
-    tab1, tab2 = st.tabs(["➕ Speler Toevoegen", "📋 Lijst Bekijken & Bewerken"])
+    tab1, tab2, tab3 = st.tabs(["➕ Speler Toevoegen", "📋 Lijst Bekijken & Bewerken", "📄 PDF Export"])
 
     # LIJST MET POSITIES (Gebruikt in beide tabs)
     pos_options = ["GK","RCB","LCB", "RB", "LB", "DM", "CM", "ACM", "RW", "LW", "FW"]
@@ -295,3 +296,41 @@ if selected_list_id:
                 )
         else:
             st.info("Deze lijst is nog leeg.")
+
+    # =========================================================================
+    # TAB 3: PDF EXPORT (SERVER-SIDE, HELE LIJST IN ÉÉN ZIP)
+    # =========================================================================
+    with tab3:
+        st.subheader(f"📄 Dossiers exporteren: {selected_list_pure_name}")
+        st.caption("Genereert per speler een PDF dossier (profiel, metrieken, KPIs, fysiek, rapporten, intelligence) en bundelt alles in één zip.")
+
+        q_exp = """
+            SELECT CAST(e.player_id AS TEXT) as player_id, COALESCE(p.commonname, e.custom_naam) as naam
+            FROM scouting.shortlist_entries e
+            LEFT JOIN public.players p ON CAST(e.player_id AS TEXT) = CAST(p.id AS TEXT)
+            WHERE e.shortlist_id = %s AND e.player_id IS NOT NULL
+        """
+        df_exp = run_query(q_exp, (selected_list_id,))
+
+        if not df_exp.empty:
+            # Sleutel = player_id (namen zijn niet uniek); dubbele namen krijgen hun ID erbij
+            exp_names = dict(zip(df_exp['player_id'], df_exp['naam'].fillna('Onbekend')))
+            dup_names = {n for n, c in pd.Series(list(exp_names.values())).value_counts().items() if c > 1}
+            fmt_exp = lambda pid: f"{exp_names[pid]} ({pid})" if exp_names[pid] in dup_names else exp_names[pid]
+            sel_exp = st.multiselect("Spelers:", list(exp_names), default=list(exp_names), format_func=fmt_exp)
+
+            if st.button(f"📄 Genereer {len(sel_exp)} PDF's", disabled=not sel_exp):
+                bar = st.progress(0.0, text="Data ophalen...")
+                def on_progress(done, total, name):
+                    bar.progress(done / max(total, 1), text=f"{done}/{total} klaar ({name})")
+                zip_bytes, failed = export_dossiers_zip(sel_exp, progress=on_progress)
+                st.session_state.export_zip = (selected_list_id, zip_bytes)
+                if failed: st.warning("Niet geëxporteerd: " + ", ".join(failed))
+
+            if st.session_state.get("export_zip") and st.session_state.export_zip[0] == selected_list_id:
+                st.download_button(
+                    "⬇️ Download zip", data=st.session_state.export_zip[1],
+                    file_name=f"dossiers_{selected_list_pure_name}.zip".replace(" ", "_"), mime="application/zip"
+                )
+        else:
+            st.info("Geen spelers uit de database op deze lijst (handmatige namen worden niet geëxporteerd).")
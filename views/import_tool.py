@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
-from utils import run_query, init_connection
+from utils import run_query, run_uncached_query, init_connection
+from crosswalk import add_legacy_name
 import datetime
 
 st.set_page_config(page_title="Legacy Data Import", page_icon="🧠", layout="wide")
@@ -30,17 +31,6 @@ def normalize_text(text):
     if not isinstance(text, str): return ""
     return "".join(text.lower().split())
 
-def run_uncached_query(query, params=None):
-    """Voert query uit ZONDER cache (voor live checks)."""
-    conn = init_connection()
-    try:
-        return pd.read_sql(query, conn, params=params)
-    except Exception as e:
-        st.error(f"SQL Error: {e}")
-        return pd.DataFrame()
-    finally:
-        conn.close()
-
 # --- GEHEUGEN FUNCTIES ---
 def load_name_memory():
     try:
@@ -60,6 +50,8 @@ def save_new_mapping(legacy_name, speler_id):
                 ON CONFLICT (legacy_name) DO UPDATE SET speler_id = EXCLUDED.speler_id;
             """
             cur.execute(query, (legacy_name, speler_id))
+            # Crosswalk meteen mee bijwerken (geen volledige rebuild nodig)
+            add_legacy_name(cur, legacy_name, speler_id)
             conn.commit()
             st.session_state.name_memory[legacy_name] = speler_id
     except Exception as e:
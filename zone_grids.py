@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+import plotly.graph_objects as go
+from store import store_path, save_arrays, load_arrays, read_manifest, write_manifest, file_version
+from match_engine import update_season_blocks, NON_BALL_ACTIONS
+from pressing import DEFENSIVE_ACTIONS
+from pitch import add_pitch, pitch_layout, HALF_LENGTH, HALF_WIDTH
+
+# -----------------------------------------------------------------------------
+# ZONEGRIDS PER SPELER EN PER PLOEG (PER ITERATIE)
+# -----------------------------------------------------------------------------
+# Per entiteit (level 'team' | 'player', entityId) en actiegroep een rooster van
+# GRID_Y x GRID_X vakken op het 105x68 veld met: aantal acties, geslaagde acties en
+# som van de gegenereerde xT. Eén numpy.histogramdd over (entiteit, groep, y, x) per
+# batch wedstrijden; nieuwe wedstrijden worden bij de bestaande roosters opgeteld.
+# Bestand: zone_grids/<iteratie>/grids.npz (level, entity, groups, matches, counts, success, xt).
+# 'matches' zit in hetzelfde bestand als de tellingen: een wedstrijd die al is
+# opgeteld (bv. na een onderbroken run vóór het manifest) telt nooit twee keer.
+
+GRID_X, GRID_Y = 16, 12
+ACTION_GROUPS = ['PASS', 'SHOT', 'DRIBBLE', 'DEFENSIVE', 'RECEPTION', 'OTHER']
+X_EDGES = np.linspace(-HALF_LENGTH, HALF_LENGTH, GRID_X + 1)
+Y_EDGES = np.linspace(-HALF_WIDTH, HALF_WIDTH, GRID_Y + 1)
+
+def _files(iteration_id):
+    return store_path("zone_grids", str(iteration_id), "grids.npz"), store_path("zone_grids", str(iteration_id), "manifest.json")
+
+def action_group(actions):
+    a = pd.Series(actions, dtype=object).astype(str)
+    return np.select(
+        [a.str.contains('PASS'), a.isin(['SHOT', 'GOAL']), a.str.contains('DRIBBLE'), a.isin(DEFENSIVE_ACTIONS), a.str.contains('RECEPTION')],
+        [0, 1, 2, 3, 4], default=5)
+
+# -----------------------------------------------------------------------------
+# 1. OPBOUWEN (INCREMENTEEL)
+# -----------------------------------------------------------------------------
+def _entity_rows(df):
+    """Verwerkte events -> lange frame (level, entity, group, x, y, ok, xt): elke actie telt voor ploeg en speler."""
+    ball = ~df['action_clean'].isin(NON_BALL_ACTIONS) & df['squadId_clean'].notna() & df['x_start'].notna() & df['y_start'].notna()
+    d = df[ball]
+    base = dict(group=action_group(d['action_clean']), x=d['x_start'].to_numpy(dtype=float), y=d['y_start'].to_numpy(dtype=float),
+                ok=(d['result_clean'] == 'SUCCESS').to_numpy(dtype=float), xt=d['xT_Generated_Player'].to_numpy(dtype=float))
+    team = pd.DataFrame({'level': 'team', 'entity': d['squadId_clean'].astype(str).to_numpy(), **base})
+    pid = pd.to_numeric(d['player_id_raw'], errors='coerce')
+    player = pd.DataFrame({'level': 'player', 'entity': pid.astype('Int64').astype(str).to_numpy(), **base})[pid.notna().to_numpy()]
+    return pd.concat([team, player], ignore_index=True)
+
+def grids_from_rows(rows, keys):
+    """Lange frame -> (counts, success, xt) met vorm (entiteiten, groepen, GRID_Y, GRID_X) voor de gegeven keys."""
+    key_index = pd.MultiIndex.from_tuples(keys, names=['level', 'entity'])
+    codes = key_index.get_indexer(pd.MultiIndex.from_arrays([rows['level'], rows['entity']]))
+    sample = np.column_stack([codes, rows['group'], rows['y'], rows['x']])
+    bins = [np.arange(len(keys) + 1) - 0.5, np.arange(len(ACTION_GROUPS) + 1) - 0.5, Y_EDGES, X_EDGES]
+    out = []
+    for w in (None, rows['ok'].to_numpy(), np.nan_to_num(rows['xt'].to_numpy())):
+        h, _ = np.histogramdd(sample, bins=bins, weights=w)
+        out.append(h.astype('float32'))
+    return out
+
+def grids_processed(iteration_id):
+    """matchIds die al in de roosters zitten."""
+    return set(read_manifest(_files(iteration_id)[1]).get("matches", []))
+
+def add_grid_matches(iteration_id, prepared):
+    """Telt de roosters van verwerkte events ({matchId: events}) op. Geeft het aantal wedstrijden terug."""
+    f_grids, f_manifest = _files(iteration_id)
+    data = load_arrays(f_grids)
+    counted = set(data['matches'].tolist()) if data and 'matches' in data else grids_processed(iteration_id)
+    new = {str(m): df for m, df in prepared.items() if str(m) not in counted}
+    if new:
+        _add_grids(f_grids, data, new, sorted(counted | set(new)))
+    write_manifest(f_manifest, {"matches": sorted(grids_processed(iteration_id) | set(prepared))})
+    return len(prepared)
+
+def _add_grids(f_grids, data, prepared, matches):
+    """Telt de roosters van nieuwe wedstrijden op bij de bestaande en schrijft ze samen met de matchIds weg."""
+    rows = pd.concat([_entity_rows(df) for df in prepared.values()], ignore_index=True)
+    old_keys = list(zip(data['level'], data['entity'])) if data else []
+    known = set(old_keys)
+    keys = old_keys + [k for k in dict.fromkeys(zip(rows['level'], rows['entity'])) if k not in known]
+    counts, success, xt = grids_from_rows(rows, keys)
+    if data:
+        n_old = len(old_keys)
+        counts[:n_old] += data['counts']; success[:n_old] += data['success']; xt[:n_old] += data['xt']
+    save_arrays(f_grids, level=np.array([k[0] for k in keys]), entity=np.array([k[1] for k in keys]),
+                groups=np.array(ACTION_GROUPS), matches=np.array(matches, dtype=str), counts=counts, success=success, xt=xt)
+
+def update_zone_grids(iteration_id, progress=None):
+    """Telt de roosters van nog niet verwerkte gespeelde wedstrijden op. Geeft het aantal nieuwe wedstrijden terug."""
+    return update_season_blocks(iteration_id, [(grids_processed, add_grid_matches)], progress)[0]
+
+# -----------------------------------------------------------------------------
+# 2. SERVING
+# -----------------------------------------------------------------------------
+@st.cache_resource(max_entries=16)
+def _load(path, version):
+    data = load_arrays(path)
+    data['index'] = {k: i for i, k in enumerate(zip(data['level'].tolist(), data['entity'].tolist()))}
+    return data
+
+def zone_grid(iteration_id, level, entity_id):
+    """{'counts', 'success', 'xt'} (groepen x GRID_Y x GRID_X) van één speler/ploeg, of None."""
+    path, _ = _files(iteration_id)
+    if not file_version(path): return None
+    data = _load(path, file_version(path))
+    i = data['index'].get((level, str(entity_id)))
+    if i is None: return None
+    return {'groups': data['groups'].tolist(), 'counts': data['counts'][i], 'success': data['success'][i], 'xt': data['xt'][i]}
+
+def grid_values(grid, groups, metric):
+    """Eén rooster voor de gekozen actiegroepen: 'Acties', 'Succes %' of 'xT'."""
+    sel = [grid['groups'].index(g) for g in groups if g in grid['groups']]
+    counts = grid['counts'][sel].sum(axis=0)
+    if metric == 'Succes %':
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(counts > 0, grid['success'][sel].sum(axis=0) / counts * 100, np.nan)
+    if metric == 'xT':
+        return np.where(counts > 0, grid['xt'][sel].sum(axis=0), np.nan)
+    return np.where(counts > 0, counts, np.nan)
+
+def zone_figure(values, metric, height=450):
+    """Rooster als heatmap op het veld (aanval naar rechts)."""
+    xc, yc = (X_EDGES[:-1] + X_EDGES[1:]) / 2, (Y_EDGES[:-1] + Y_EDGES[1:]) / 2
+    scale = 'RdYlGn' if metric != 'Acties' else 'Hot'
+    fig = add_pitch(go.Figure())
+    fig.add_trace(go.Heatmap(x=xc, y=yc, z=values, colorscale=scale, reversescale=metric == 'Acties', opacity=0.75,
+                             hovertemplate=f"{metric}: %{{z:.2f}}<extra></extra>", showscale=True))
+    return pitch_layout(fig, height=height)